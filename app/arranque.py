@@ -0,0 +1,103 @@
+import logging
+from contextlib import AsyncExitStack, ExitStack
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.config.database import SessionLocal, async_engine, create_database, engine
+from app.config.settings import settings
+from app.migrations import pendientes, version_actual
+from app.cache.etag import versiones_actuales
+from app.services.categoria_services import CategoriaService
+from app.services.estadisticas_service import EstadisticasService, VERSION_LIBROS, VERSION_CATEGORIAS
+
+logger = logging.getLogger(__name__)
+
+
+def preparar_esquema() -> None:
+    """
+    Con DATABASE_AUTO_MIGRATE aplica las migraciones; si no, solo verifica que
+    el esquema esté al día y falla con una indicación de cómo actualizarlo
+    """
+    if settings.DATABASE_AUTO_MIGRATE:
+        create_database()
+        return
+    faltantes = pendientes(engine)
+    if faltantes:
+        raise RuntimeError(
+            f"El esquema está en la versión {version_actual(engine)} y faltan las migraciones "
+            f"{[m.version for m in faltantes]}: ejecutar 'python -m app.cli migrate' "
+            "o arrancar con DATABASE_AUTO_MIGRATE=true"
+        )
+
+
+def _conexiones_a_abrir(engine) -> int:
+    # No se abren conexiones de overflow: se cerrarían al devolverlas
+    tamano = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    return max(1, min(settings.DB_POOL_WARMUP, tamano))
+
+
+def precalentar_pool() -> None:
+    """
+    Abre DB_POOL_WARMUP conexiones a la vez para que queden en el pool y los
+    primeros requests no paguen el handshake
+    """
+    with ExitStack() as pila:
+        for _ in range(_conexiones_a_abrir(engine)):
+            pila.enter_context(engine.connect()).execute(text("SELECT 1"))
+
+
+async def precalentar_pool_async() -> None:
+    if async_engine is None:
+        return
+    try:
+        async with AsyncExitStack() as pila:
+            for _ in range(_conexiones_a_abrir(async_engine.sync_engine)):
+                conn = await pila.enter_async_context(async_engine.connect())
+                await conn.execute(text("SELECT 1"))
+    except OperationalError as exc:
+        logger.warning("No se pudo precalentar el pool async: %s", exc)
+
+
+def sembrar_estadisticas() -> None:
+    """
+    Materializa las estadísticas del dashboard si la base no las tiene todavía
+    """
+    db = SessionLocal()
+    try:
+        if EstadisticasService.sembrar(db):
+            logger.info("Estadísticas del dashboard materializadas")
+    finally:
+        db.close()
+
+
+def precargar_caches() -> None:
+    """
+    Versiones de los ETag y primera página de categorías
+    """
+    versiones_actuales([VERSION_LIBROS, VERSION_CATEGORIAS])
+    db = SessionLocal()
+    try:
+        CategoriaService.get_categorias(db)
+        CategoriaService.get_categorias_with_count(db)
+    finally:
+        db.close()
+
+
+def inicializar() -> None:
+    """
+    Inicialización bloqueante del lifespan. Si la base no responde se arranca igual
+    (los requests fallarán hasta que vuelva); un esquema desactualizado sí detiene el arranque.
+    """
+    try:
+        preparar_esquema()
+        precalentar_pool()
+    except OperationalError as exc:
+        logger.warning("Base de datos no disponible al arrancar, se omite la inicialización: %s", exc)
+        return
+    try:
+        sembrar_estadisticas()
+    except Exception:
+        logger.exception("No se pudieron materializar las estadísticas")
+    try:
+        precargar_caches()
+    except Exception:
+        logger.exception("No se pudieron precargar las caches")
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Hashable
+from app.cache.lru import TTLLRUCache
+
+_AUSENTE = object()
+
+
+class BackendCache(ABC):
+    """
+    Almacén de la cache de servicios. Solo guarda y lee: la invalidación la da la clave,
+    que incluye las versiones de los recursos leídas de la base (ver cacheado).
+    """
+    nombre = "base"
+
+    @abstractmethod
+    def get(self, clave: str, default: Any = None) -> Any:
+        """
+        Valor guardado en la clave, o default si no existe o ya venció
+        """
+
+    @abstractmethod
+    def set(self, clave: str, valor: Any, ttl: float) -> None:
+        """
+        Guarda el valor durante ttl segundos
+        """
+
+
+class MemoriaBackend(BackendCache):
+    """
+    LRU+TTL dentro del proceso. Los valores se guardan tal cual: quien los lee no debe
+    modificarlos. Con varios workers cada uno tiene su cache, pero todos arman las claves
+    con las mismas versiones de la base.
+    """
+    nombre = "memoria"
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._datos = TTLLRUCache(maxsize, ttl)
+
+    def get(self, clave: str, default: Any = None) -> Any:
+        return self._datos.get(clave, default)
+
+    def set(self, clave: str, valor: Any, ttl: float) -> None:
+        self._datos.set(clave, valor, ttl)
+
+
+class ArchivoBackend(BackendCache):
+    """
+    Un archivo por entrada en un directorio local, compartido por los workers del host.
+    Las escrituras son atómicas (archivo temporal + os.replace), así que no hace falta
+    bloquear. Las entradas se leen con pickle: el directorio tiene que ser del usuario
+    del proceso y no poder escribirlo nadie más, si no se rechaza al iniciar.
+    """
+    nombre = "archivo"
+    PURGAR_CADA = 500
+
+    def __init__(self, directorio: str, ttl: float):
+        self.directorio = directorio
+        self.ttl = ttl
+        self._escrituras = 0
+        os.makedirs(directorio, mode=0o700, exist_ok=True)
+        estado = os.stat(directorio)
+        if hasattr(os, "getuid") and (estado.st_uid != os.getuid() or estado.st_mode & 0o077):
+            raise RuntimeError(
+                f"SERVICE_CACHE_DIR={directorio} debe pertenecer al usuario del proceso y tener permisos 700"
+            )
+
+    def _ruta(self, clave: Hashable) -> str:
+        return os.path.join(self.directorio, hashlib.sha1(str(clave).encode()).hexdigest())
+
+    def _escribir(self, ruta: str, datos: bytes) -> None:
+        descriptor, temporal = tempfile.mkstemp(dir=self.directorio, prefix=".tmp-")
+        try:
+            with os.fdopen(descriptor, "wb") as archivo:
+                archivo.write(datos)
+            os.replace(temporal, ruta)
+        except BaseException:
+            os.unlink(temporal)
+            raise
+
+    def get(self, clave: str, default: Any = None) -> Any:
+        try:
+            with open(self._ruta(clave), "rb") as archivo:
+                expira, valor = pickle.load(archivo)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+        return valor if expira > time.time() else default
+
+    def set(self, clave: str, valor: Any, ttl: float) -> None:
+        self._escribir(self._ruta(clave), pickle.dumps((time.time() + ttl, valor), pickle.HIGHEST_PROTOCOL))
+        self._escrituras += 1
+        if self._escrituras % self.PURGAR_CADA == 0:
+            self._purgar()
+
+    def _purgar(self) -> None:
+        """
+        Borra las entradas que ya vencieron (las de versiones viejas no se vuelven a leer)
+        """
+        limite = time.time() - self.ttl
+        with os.scandir(self.directorio) as entradas:
+            for entrada in entradas:
+                try:
+                    if entrada.stat().st_mtime < limite:
+                        os.unlink(entrada.path)
+                except OSError:
+                    pass
+
+
+class RedisBackend(BackendCache):
+    """
+    Sobre cualquier cliente con la interfaz de redis-py (get y set con px)
+    """
+    nombre = "redis"
+
+    def __init__(self, cliente: Any, prefijo: str = "biblioteca:cache:"):
+        self.cliente = cliente
+        self.prefijo = prefijo
+
+    @classmethod
+    def desde_url(cls, url: str) -> "RedisBackend":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SERVICE_CACHE_BACKEND=redis requiere el paquete redis")
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, clave: str, default: Any = None) -> Any:
+        datos = self.cliente.get(self.prefijo + clave)
+        return default if datos is None else pickle.loads(datos)
+
+    def set(self, clave: str, valor: Any, ttl: float) -> None:
+        self.cliente.set(self.prefijo + clave, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL), px=max(1, int(ttl * 1000)))
@@ -0,0 +1,117 @@
+import hashlib
+from typing import Dict, Iterable, Optional, Sequence, Set, Union
+from fastapi import Depends, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.cache.lru import TTLLRUCache
+from app.config.database import engine, get_db, run_db
+from app.config.replicas import RoutingSession, en_replica
+from app.config.settings import settings
+from app.models.estadisticas import Estadistica
+
+DbSession = Union[Session, AsyncSession]
+
+#Versión de cada recurso (filas "version_*" de estadisticas) por copia de la base:
+#(None, clave) la de la primaria, (índice de réplica, clave) la de cada réplica.
+#Las escrituras de este proceso invalidan la de la primaria al confirmar; las de otros
+#workers y lo que aplican las réplicas se ven al vencer el TTL.
+#La usan los ETag y las claves de la cache de servicios, así que ambos cambian juntos.
+versiones_cache = TTLLRUCache(64, settings.ETAG_VERSION_TTL_SECONDS)
+
+
+class NoModificado(Exception):
+    """
+    Se lanza desde la dependencia cuando el cliente ya tiene la representación vigente;
+    el handler registrado en main responde 304 sin ejecutar el endpoint.
+    """
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+
+
+def invalidar_versiones(claves: Iterable[str]) -> None:
+    for clave in claves:
+        versiones_cache.delete((None, clave))
+
+
+def _origen(db: Optional[Session]) -> Optional[int]:
+    """
+    Réplica de la que lee la sesión, o None si lee de la primaria
+    """
+    replica = db.replica_de_lectura() if isinstance(db, RoutingSession) else None
+    return None if replica is None else db.replicas.indice(replica)
+
+
+def _leer_versiones(claves: Sequence[str], db: Optional[Session] = None) -> Dict[str, int]:
+    consulta = select(Estadistica.clave, Estadistica.valor).where(Estadistica.clave.in_(claves))
+    if db is not None:
+        filas = dict(db.execute(consulta).all())
+    else:
+        with engine.connect() as conn:
+            filas = dict(conn.execute(consulta).all())
+    return {clave: filas.get(clave, 0) for clave in claves}
+
+
+def versiones_actuales(claves: Sequence[str], db: Optional[Session] = None) -> Dict[str, int]:
+    """
+    Versiones de los recursos; lee de la base solo las que no están en versiones_cache.
+    Con db la lectura usa la conexión de la sesión (dentro de run_sync de una AsyncSession
+    no bloquea el event loop) y la copia de la base de la que lee: la primaria o su réplica.
+    Sin db, la primaria.
+    """
+    origen = _origen(db)
+    versiones = {clave: versiones_cache.get((origen, clave)) for clave in claves}
+    faltantes = [clave for clave, version in versiones.items() if version is None]
+    if faltantes:
+        for clave, version in _leer_versiones(faltantes, db).items():
+            versiones_cache.set((origen, clave), version)
+            versiones[clave] = version
+    return versiones
+
+
+def _versiones_de_lectura(db: Session, claves: Sequence[str]) -> Dict[str, int]:
+    return versiones_actuales(claves, db)
+
+
+async def obtener_versiones(db: DbSession, claves: Sequence[str]) -> Dict[str, int]:
+    """
+    Versiones según la copia de la base de la que leerán los métodos @solo_lectura
+    del request con esta sesión
+    """
+    leer = en_replica(_versiones_de_lectura)
+    sesion = db.sync_session if isinstance(db, AsyncSession) else db
+    origen = en_replica(_origen)(sesion)
+    versiones = {clave: versiones_cache.get((origen, clave)) for clave in claves}
+    if any(version is None for version in versiones.values()):
+        return await run_db(db, leer, claves)
+    return versiones
+
+
+def _etags_pedidos(if_none_match: Optional[str]) -> Set[str]:
+    if not if_none_match:
+        return set()
+    # If-None-Match usa comparación débil: W/"x" equivale a "x"
+    return {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+
+
+def etag_condicional(*claves: str, cache_control: str = "private, no-cache"):
+    """
+    Dependencia para GET de solo lectura: calcula un ETag fuerte a partir de la URL y de
+    las versiones de los recursos indicados. Si coincide con If-None-Match corta el
+    request con 304 antes de tocar el ORM; si no, agrega ETag y Cache-Control.
+    Las versiones se leen con la sesión del request, de la misma réplica que el cuerpo:
+    una réplica atrasada da un ETag viejo junto con el cuerpo viejo, nunca uno nuevo.
+    """
+    async def dependencia(request: Request, response: Response, db: Session = Depends(get_db)) -> str:
+        versiones = await obtener_versiones(db, claves)
+        firma = "|".join([request.url.path, request.url.query, *(f"{c}={versiones[c]}" for c in claves)])
+        etag = '"' + hashlib.sha1(firma.encode()).hexdigest()[:20] + '"'
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+
+        pedidos = _etags_pedidos(request.headers.get("if-none-match"))
+        if etag in pedidos or "*" in pedidos:
+            raise NoModificado(headers)
+        response.headers.update(headers)
+        return etag
+
+    return dependencia
@@ -0,0 +1,125 @@
+import functools
+import inspect
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+from app.cache.backends import _AUSENTE, ArchivoBackend, BackendCache, MemoriaBackend, RedisBackend
+from app.cache.etag import versiones_actuales
+from app.config.settings import settings
+from app.config.replicas import en_primaria
+
+logger = logging.getLogger(__name__)
+
+_backend: Optional[BackendCache] = None
+_backend_iniciado = False
+_lock = threading.Lock()
+
+
+def get_cache_backend() -> Optional[BackendCache]:
+    """
+    Backend configurado en SERVICE_CACHE_BACKEND (memoria, archivo, redis o ninguno)
+    """
+    global _backend, _backend_iniciado
+    if not _backend_iniciado:
+        with _lock:
+            if not _backend_iniciado:
+                tipo = settings.SERVICE_CACHE_BACKEND
+                ttl = settings.SERVICE_CACHE_TTL_SECONDS
+                if tipo == "memoria":
+                    _backend = MemoriaBackend(settings.SERVICE_CACHE_SIZE, ttl)
+                elif tipo == "archivo":
+                    _backend = ArchivoBackend(settings.SERVICE_CACHE_DIR, ttl)
+                elif tipo == "redis":
+                    _backend = RedisBackend.desde_url(settings.SERVICE_CACHE_REDIS_URL)
+                elif tipo != "ninguno":
+                    raise ValueError(f"SERVICE_CACHE_BACKEND desconocido: {tipo}")
+                _backend_iniciado = True
+    return _backend
+
+
+class _Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.errores = 0
+
+    def registrar(self, funcion: str, acierto: bool) -> None:
+        with self._lock:
+            (self.hits if acierto else self.misses)[funcion] += 1
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                "backend": settings.SERVICE_CACHE_BACKEND,
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+                "errores": self.errores,
+                "por_funcion": {
+                    funcion: {"hits": self.hits[funcion], "misses": self.misses[funcion]}
+                    for funcion in sorted(set(self.hits) | set(self.misses))
+                },
+            }
+
+
+metricas = _Metricas()
+
+
+def estadisticas_cache() -> Dict[str, Any]:
+    return metricas.resumen()
+
+
+def cacheado(*tags: str, ttl: Optional[float] = None) -> Callable:
+    """
+    Cachea el resultado de un método de servicio (db, *args) según sus argumentos y
+    la versión de sus etiquetas. Las etiquetas son claves de versión de estadisticas
+    (VERSION_LIBROS, VERSION_CATEGORIAS): la clave se arma con las mismas versiones que
+    el ETag, así que una escritura en cualquier worker cambia ambos a la vez.
+    El resultado debe ser de datos planos (dict, list, Pagina...), nunca objetos ORM
+    ligados a una sesión. Los fallos del backend no rompen el request: se consulta la base.
+    """
+    def decorador(func: Callable) -> Callable:
+        nombre = func.__qualname__
+        firma = inspect.signature(func)
+
+        @functools.wraps(func)
+        def envoltura(db, *args, **kwargs):
+            backend = get_cache_backend()
+            if backend is None:
+                return func(db, *args, **kwargs)
+
+            argumentos = firma.bind(db, *args, **kwargs)
+            argumentos.apply_defaults()
+            parametros = list(argumentos.arguments.items())[1:]
+            try:
+                # Por la sesión del request (en modo async, sobre su conexión async) y en la
+                # primaria, de donde sale lo que se guarda
+                with en_primaria(db):
+                    versiones = versiones_actuales(tags, db)
+                clave = f"{nombre}:{parametros!r}:{[versiones[tag] for tag in tags]}"
+                valor = backend.get(clave, _AUSENTE)
+            except Exception:
+                metricas.errores += 1
+                logger.exception("Error leyendo la cache de %s", nombre)
+                return func(db, *args, **kwargs)
+
+            if valor is not _AUSENTE:
+                metricas.registrar(nombre, True)
+                return valor
+
+            metricas.registrar(nombre, False)
+            # Lo que se guarda no puede venir de una réplica atrasada
+            with en_primaria(db):
+                valor = func(db, *args, **kwargs)
+            try:
+                backend.set(clave, valor, settings.SERVICE_CACHE_TTL_SECONDS if ttl is None else ttl)
+            except Exception:
+                metricas.errores += 1
+                logger.exception("Error guardando en la cache de %s", nombre)
+            return valor
+
+        return envoltura
+    return decorador
@@ -0,0 +1,48 @@
+import argparse
+import logging
+from app.config.database import engine
+
+
+def migrate(args: argparse.Namespace) -> None:
+    from app.migrations import migrar
+    aplicadas = migrar(engine)
+    print(f"Migraciones aplicadas: {aplicadas}" if aplicadas else "El esquema ya está al día")
+
+
+def version(args: argparse.Namespace) -> None:
+    from app.migrations import version_actual, pendientes
+    print(f"Versión del esquema: {version_actual(engine)}")
+    for migracion in pendientes(engine):
+        print(f"  pendiente {migracion.version}: {migracion.descripcion}")
+
+
+def reparar_disponibilidad(args: argparse.Namespace) -> None:
+    from app.config.database import SessionLocal
+    from app.services.libro_service import LibroService
+    db = SessionLocal()
+    try:
+        print(f"Libros corregidos: {LibroService.reparar_disponibilidad(db)}")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    """
+    Tareas de administración: python -m app.cli <comando>
+    """
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("migrate", help="Aplicar las migraciones pendientes").set_defaults(func=migrate)
+    comandos.add_parser("version", help="Mostrar la versión del esquema y las migraciones pendientes").set_defaults(func=version)
+    comandos.add_parser(
+        "reparar-disponibilidad",
+        help="Recalcular libros.prestamo_activo_id a partir de los préstamos activos"
+    ).set_defaults(func=reparar_disponibilidad)
+
+    logging.basicConfig(level=logging.INFO)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,167 @@
+import functools
+import time
+from typing import Any, Callable, TypeVar, Union
 from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .settings import settings
+from .executor import run_blocking
+from .replicas import Replicas, RoutingSession, RoutingSessionAsync
+from app.instrumentacion.pool import PoolAsyncInstrumentado, PoolInstrumentado, ping_si_ociosa, registrar_pool
+
+T = TypeVar("T")
+
+#Drivers async equivalentes a los síncronos
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite"}
+
+#Errores de MySQL que se resuelven reintentando la transacción (deadlock, lock wait timeout)
+MYSQL_ERRORES_TRANSITORIOS = {1213, 1205}
+
+def opciones_pool(url: str, poolclass: type) -> dict:
+    """
+    Parámetros del pool según Settings. SQLite no usa un pool de red: conserva el suyo
+    """
+    opciones = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "siempre",
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        opciones.update(
+            poolclass=poolclass,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return opciones
+
+def configurar_pool(engine, nombre: str = None) -> None:
+    registrar_pool(engine, nombre)
+    if settings.DB_POOL_PRE_PING == "ociosa":
+        ping_si_ociosa(engine, settings.DB_POOL_PING_IDLE_SECONDS)
 
 #Crea engine de la base de datos
-engine = create_engine(settings.DATABASE_URL,pool_pre_ping=True,pool_recycle=300, echo=settings.DEBUG)
+engine = create_engine(settings.DATABASE_URL, echo=settings.SQL_ECHO, **opciones_pool(settings.DATABASE_URL, PoolInstrumentado))
+configurar_pool(engine)
+
+def url_async(url: str) -> str:
+    """
+    La misma URL con el driver async equivalente
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def get_async_database_url() -> str:
+    """
+    URL del engine async: ASYNC_DATABASE_URL o DATABASE_URL con el driver async equivalente
+    """
+    return settings.ASYNC_DATABASE_URL or url_async(settings.DATABASE_URL)
+
+def _crear_replicas() -> Replicas:
+    sync = []
+    for indice, url in enumerate(settings.DATABASE_REPLICA_URLS):
+        replica = create_engine(url, echo=settings.SQL_ECHO, **opciones_pool(url, PoolInstrumentado))
+        configurar_pool(replica, f"sync-replica-{indice}")
+        sync.append(replica)
+    async_ = []
+    if settings.DATABASE_ASYNC:
+        for indice, url in enumerate(settings.DATABASE_REPLICA_URLS):
+            replica = create_async_engine(url_async(url), echo=settings.SQL_ECHO, **opciones_pool(url, PoolAsyncInstrumentado))
+            configurar_pool(replica.sync_engine, f"async-replica-{indice}")
+            async_.append(replica.sync_engine)
+    return Replicas(sync, async_)
+
+#Réplicas de lectura opcionales (DATABASE_REPLICA_URLS), ver app/config/replicas.py
+replicas = _crear_replicas() if settings.DATABASE_REPLICA_URLS else None
 
 #crea sessionlocal
-SessionLocal = sessionmaker(autocommit=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, bind=engine, class_=RoutingSession, replicas=replicas)
+
+#Engine async opcional (DATABASE_ASYNC); el síncrono se mantiene para el esquema y tareas batch
+async_engine = None
+AsyncSessionLocal = None
+if settings.DATABASE_ASYNC:
+    async_engine = create_async_engine(
+        get_async_database_url(),
+        echo=settings.SQL_ECHO,
+        **opciones_pool(get_async_database_url(), PoolAsyncInstrumentado)
+    )
+    configurar_pool(async_engine.sync_engine)
+    # Sin expirar al commit: tras salir de run_sync no se puede hacer lazy loading
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        expire_on_commit=False,
+        sync_session_class=RoutingSessionAsync,
+        replicas=replicas
+    )
 
 #clase base
 Base = declarative_base()
 
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+#Dependencia de sesión usada por los routers, según DATABASE_ASYNC
+get_db = get_async_db if settings.DATABASE_ASYNC else get_sync_db
+
+async def run_db(db: Union[Session, AsyncSession], func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Ejecuta una función síncrona que recibe la sesión como primer argumento.
+    Con AsyncSession corre sobre su conexión async; con Session, en el pool acotado.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: func(session, *args, **kwargs))
+    return await run_blocking(func, db, *args, **kwargs)
+
+def es_error_transitorio(exc: Exception) -> bool:
+    """
+    Indica si el error corresponde a un conflicto de bloqueos que conviene reintentar
+    """
+    if not isinstance(exc, OperationalError):
+        return False
+    codigo = exc.orig.args[0] if getattr(exc.orig, "args", None) else None
+    return codigo in MYSQL_ERRORES_TRANSITORIOS or "database is locked" in str(exc.orig)
+
+def con_reintentos(db: Session, func: Callable[..., T], *args: Any, intentos: int = None, **kwargs: Any) -> T:
+    """
+    Ejecuta func(db, ...) y, ante un error transitorio, hace rollback y la repite
+    con una espera creciente. func debe hacer su propio commit.
+    """
+    intentos = settings.LOAN_MAX_RETRIES if intentos is None else intentos
+    for intento in range(intentos + 1):
+        try:
+            return func(db, *args, **kwargs)
+        except OperationalError as exc:
+            db.rollback()
+            if intento == intentos or not es_error_transitorio(exc):
+                raise
+            time.sleep(0.01 * 2 ** intento)
+
+def reintentable(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Método de servicio func(db, ...) que se repite con con_reintentos. Lo llevan todos los
+    que escriben los contadores de estadisticas: esas filas las comparten todas las
+    escrituras y son las que más chocan bajo carga.
+    """
+    @functools.wraps(func)
+    def envoltura(db: Session, *args: Any, **kwargs: Any) -> T:
+        return con_reintentos(db, func, *args, **kwargs)
+    return envoltura
+
 def create_database():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """
+    Crea el esquema o aplica las migraciones pendientes (ver app/migrations)
+    """
+    from app.migrations import migrar
+    migrar(engine)
@@ -0,0 +1,26 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+from .settings import settings
+
+T = TypeVar("T")
+
+#Pool acotado para el trabajo bloqueante (Session síncrona de SQLAlchemy y bcrypt)
+executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_EXECUTOR_WORKERS,
+    thread_name_prefix="bloqueante"
+)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Ejecuta func en el pool acotado sin bloquear el event loop.
+    Se copia el contexto para que las contextvars del request lleguen al hilo.
+    """
+    loop = asyncio.get_running_loop()
+    contexto = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor, functools.partial(contexto.run, func, *args, **kwargs)
+    )
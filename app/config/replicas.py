@@ -0,0 +1,217 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import random
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, TypeVar
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session
+from app.cache.lru import TTLLRUCache
+from .executor import run_blocking
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable)
+
+#Claves en Session.info
+SOLO_LECTURA = "solo_lectura"
+ESCRIBIO = "escribio"
+REPLICA = "replica"
+
+#Usuario autenticado del request (lo fija get_current_principal)
+usuario_actual: ContextVar[Optional[int]] = ContextVar("usuario_actual", default=None)
+
+#Usuarios que escribieron hace menos de REPLICA_STICKY_SECONDS: sus lecturas van a la primaria.
+#Es por proceso; con varios workers el margen debe cubrir el atraso de las réplicas.
+_escrituras_recientes = TTLLRUCache(10000, settings.REPLICA_STICKY_SECONDS)
+
+
+def fijar_primaria(usuario_id: Optional[int]) -> None:
+    if usuario_id is not None and settings.REPLICA_STICKY_SECONDS > 0:
+        _escrituras_recientes.set(usuario_id, True)
+
+
+def lectura_fijada() -> bool:
+    usuario_id = usuario_actual.get()
+    return usuario_id is not None and _escrituras_recientes.get(usuario_id) is not None
+
+
+class Replicas:
+    """
+    Engines de réplica con su estado de salud. `sync` son los engines síncronos
+    (también se usan para medir el atraso); `async_` los sync_engine de los engines
+    async equivalentes, en el mismo orden.
+    """
+    def __init__(self, sync: List[Engine], async_: Optional[List[Engine]] = None):
+        self.sync = sync
+        self.async_ = async_ or []
+        self._sanas = list(range(len(sync)))
+
+    def elegir(self, asincrona: bool = False) -> Optional[Engine]:
+        engines = self.async_ if asincrona else self.sync
+        sanas = self._sanas
+        return engines[random.choice(sanas)] if sanas and engines else None
+
+    def indice(self, engine: Engine) -> Optional[int]:
+        """
+        Posición de la réplica (la misma para su engine síncrono y el async)
+        """
+        for engines in (self.sync, self.async_):
+            if engine in engines:
+                return engines.index(engine)
+        return None
+
+    def revisar(self) -> None:
+        """
+        Mide el atraso de cada réplica y deja de usar las que superan REPLICA_MAX_LAG_SECONDS
+        o no responden
+        """
+        sanas = []
+        for indice, engine in enumerate(self.sync):
+            try:
+                atraso = medir_atraso(engine)
+            except Exception as exc:
+                logger.warning("Réplica %s no disponible: %s", engine.url.host or engine.url.database, exc)
+                continue
+            if atraso is not None and atraso <= settings.REPLICA_MAX_LAG_SECONDS:
+                sanas.append(indice)
+            else:
+                logger.warning("Réplica %s fuera de uso, atraso: %s", engine.url.host or engine.url.database, atraso)
+        self._sanas = sanas
+
+
+def medir_atraso(engine: Engine) -> Optional[float]:
+    """
+    Segundos de atraso de la réplica (None si no está replicando).
+    Fuera de MySQL no hay replicación que medir y se considera al día.
+    """
+    with engine.connect() as conn:
+        if conn.dialect.name != "mysql":
+            return 0.0
+        try:
+            estado = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+        except Exception:
+            # MySQL anterior a 8.0.22
+            conn.rollback()
+            estado = conn.execute(text("SHOW SLAVE STATUS")).mappings().first()
+    if estado is None:
+        return None
+    atraso = estado.get("Seconds_Behind_Source", estado.get("Seconds_Behind_Master"))
+    return None if atraso is None else float(atraso)
+
+
+async def vigilar_replicas(replicas: Replicas, intervalo: float) -> None:
+    """
+    Tarea de fondo: revisa el atraso de las réplicas cada `intervalo` segundos
+    """
+    while True:
+        try:
+            await run_blocking(replicas.revisar)
+        except Exception:
+            logger.exception("Error revisando réplicas")
+        await asyncio.sleep(intervalo)
+
+
+class RoutingSession(Session):
+    """
+    Session que manda a una réplica las lecturas hechas dentro de un método marcado
+    con @solo_lectura. Todo lo demás va a la primaria: escrituras, flush, SELECT ... FOR UPDATE,
+    cualquier lectura posterior a una escritura en la misma sesión y las de un usuario
+    que escribió hace poco (lectura de lo propio escrito). La réplica se elige una vez por
+    sesión: el ETag y el cuerpo de un request salen de la misma copia de la base.
+    """
+    asincrona = False
+
+    def __init__(self, *args, replicas: Optional[Replicas] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replica = self.replica_de_lectura(clause)
+        if replica is not None:
+            return replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+    def replica_de_lectura(self, clause=None) -> Optional[Engine]:
+        """
+        Réplica a la que iría la sentencia, o None si va a la primaria
+        """
+        if not self._leer_de_replica(clause):
+            return None
+        replica = self.info.get(REPLICA)
+        if replica is None:
+            replica = self.replicas.elegir(self.asincrona)
+            if replica is not None:
+                self.info[REPLICA] = replica
+        return replica
+
+    def _leer_de_replica(self, clause) -> bool:
+        if self.replicas is None or not self.info.get(SOLO_LECTURA) or self.info.get(ESCRIBIO) or self._flushing:
+            return False
+        if clause is not None and (getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None) is not None):
+            return False
+        return not lectura_fijada()
+
+
+class RoutingSessionAsync(RoutingSession):
+    """
+    Session síncrona detrás de AsyncSession: elige entre los engines async de las réplicas
+    """
+    asincrona = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _registrar_escritura(estado: ORMExecuteState) -> None:
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        estado.session.info[ESCRIBIO] = True
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _registrar_flush(session: Session, contexto) -> None:
+    session.info[ESCRIBIO] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _fijar_usuario(session: Session) -> None:
+    if session.info.get(ESCRIBIO):
+        fijar_primaria(usuario_actual.get())
+
+
+@contextlib.contextmanager
+def _lectura(db: Session, solo_lectura: bool) -> Iterator[None]:
+    anterior = db.info.get(SOLO_LECTURA)
+    db.info[SOLO_LECTURA] = solo_lectura
+    try:
+        yield
+    finally:
+        db.info[SOLO_LECTURA] = anterior
+
+
+def en_primaria(db: Session):
+    """
+    Fuerza la primaria dentro del bloque aunque el método sea de solo lectura
+    """
+    return _lectura(db, False)
+
+
+def solo_lectura(func: F) -> F:
+    """
+    Marca un método de servicio como apto para réplica. La marca se aplica al entrar por
+    el servicio async (los routers); las llamadas internas entre métodos no la activan.
+    """
+    func.solo_lectura = True
+    return func
+
+
+def en_replica(func: Callable) -> Callable:
+    """
+    Envuelve func(db, ...) para que sus lecturas puedan ir a una réplica
+    """
+    @functools.wraps(func)
+    def envoltura(db: Session, *args, **kwargs):
+        with _lectura(db, True):
+            return func(db, *args, **kwargs)
+    return envoltura
@@ -0,0 +1,163 @@
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+#Muestras de un recolector: (nombre, tipo, ayuda, [(etiquetas, valor)])
+Muestras = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+CONTENT_TYPE_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+#Límites por defecto de los histogramas de latencia, en segundos
+BUCKETS_LATENCIA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metricas: List["_Metrica"] = []
+_recolectores: List[Callable[[], Iterable[Muestras]]] = []
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_etiquetas(etiquetas: Dict[str, str]) -> str:
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in etiquetas.items()) + "}"
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        _metricas.append(self)
+
+    def _cabecera(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[tuple, float] = {}
+
+    def inc(self, *valores_etiquetas: str, cantidad: float = 1) -> None:
+        with self._lock:
+            self._valores[valores_etiquetas] = self._valores.get(valores_etiquetas, 0) + cantidad
+
+    def exportar(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return self._cabecera() + [
+            f"{self.nombre}{_formatear_etiquetas(dict(zip(self.etiquetas, clave)))} {valor}"
+            for clave, valor in valores
+        ]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (), buckets: Sequence[float] = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(buckets)
+        #Por combinación de etiquetas: [conteo por bucket (el último es +Inf), suma]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, valor: float, *valores_etiquetas: str) -> None:
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores_etiquetas)
+            if serie is None:
+                serie = self._series[valores_etiquetas] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def exportar(self) -> List[str]:
+        with self._lock:
+            series = sorted((clave, (list(conteos), suma)) for clave, (conteos, suma) in self._series.items())
+        lineas = self._cabecera()
+        for clave, (conteos, suma) in series:
+            etiquetas = dict(zip(self.etiquetas, clave))
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                lineas.append(f"{self.nombre}_bucket{_formatear_etiquetas({**etiquetas, 'le': le})} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_formatear_etiquetas(etiquetas)} {suma}")
+            lineas.append(f"{self.nombre}_count{_formatear_etiquetas(etiquetas)} {acumulado}")
+        return lineas
+
+
+def registrar_recolector(recolector: Callable[[], Iterable[Muestras]]) -> None:
+    """
+    Agrega una fuente de métricas que se lee al exportar (gauges de caches, pool, etc.)
+    """
+    _recolectores.append(recolector)
+
+
+def exportar_prometheus() -> str:
+    """
+    Todas las métricas en el formato de texto de Prometheus
+    """
+    lineas: List[str] = []
+    for metrica in _metricas:
+        lineas.extend(metrica.exportar())
+    for recolector in _recolectores:
+        for nombre, tipo, ayuda, muestras in recolector():
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            lineas.extend(f"{nombre}{_formatear_etiquetas(etiquetas)} {valor}" for etiquetas, valor in muestras)
+    return "\n".join(lineas) + "\n"
+
+
+#Métricas de la aplicación
+http_requests = Contador("biblioteca_http_requests_total", "Requests atendidos", ("metodo", "ruta", "estado"))
+http_duracion = Histograma("biblioteca_http_request_duration_seconds", "Duración de los requests", ("metodo", "ruta"))
+db_consultas = Contador("biblioteca_db_queries_total", "Sentencias SQL ejecutadas")
+db_duracion = Histograma("biblioteca_db_query_duration_seconds", "Duración de las sentencias SQL")
+db_consultas_lentas = Contador("biblioteca_db_slow_queries_total", "Sentencias que superaron SLOW_QUERY_MS")
+
+
+def _recolector_caches() -> Iterable[Muestras]:
+    from app.cache.etag import versiones_cache
+    from app.cache.servicios import estadisticas_cache
+    from app.security.principal import token_versions
+    from app.security.principal_cache import principal_cache
+
+    caches = {"usuarios": principal_cache, "token_versions": token_versions, "versiones_etag": versiones_cache}
+    estadisticas = {nombre: cache.stats() for nombre, cache in caches.items()}
+    servicios = estadisticas_cache()
+    estadisticas["servicios"] = {"hits": servicios["hits"], "misses": servicios["misses"]}
+
+    for campo in ("hits", "misses", "evictions"):
+        yield (
+            f"biblioteca_cache_{campo}_total",
+            "counter",
+            f"Caches en memoria: {campo}",
+            [({"cache": nombre}, datos[campo]) for nombre, datos in estadisticas.items() if campo in datos],
+        )
+    yield (
+        "biblioteca_cache_entries",
+        "gauge",
+        "Entradas actuales en cada cache",
+        [({"cache": nombre}, datos["size"]) for nombre, datos in estadisticas.items() if "size" in datos],
+    )
+    yield (
+        "biblioteca_service_cache_hits_total",
+        "counter",
+        "Aciertos de la cache de servicios por función",
+        [({"funcion": funcion}, datos["hits"]) for funcion, datos in servicios["por_funcion"].items()],
+    )
+    yield (
+        "biblioteca_service_cache_misses_total",
+        "counter",
+        "Fallos de la cache de servicios por función",
+        [({"funcion": funcion}, datos["misses"]) for funcion, datos in servicios["por_funcion"].items()],
+    )
+
+
+registrar_recolector(_recolector_caches)
@@ -0,0 +1,61 @@
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+from typing import Optional
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+#cProfile admite un solo perfil activo por proceso: los pedidos simultáneos no se perfilan
+_lock = threading.Lock()
+
+
+class Perfil:
+    """
+    Perfil cProfile de un request. Mide el hilo del event loop: el trabajo que corre
+    en el pool bloqueante queda fuera, pero su tiempo de base de datos sí aparece
+    en Server-Timing, y se mezcla lo que otras corutinas ejecuten en el loop mientras tanto.
+    """
+    def __init__(self):
+        self.id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        self._perfil = cProfile.Profile()
+        self._perfil.enable()
+
+    def terminar(self, descripcion: str) -> None:
+        try:
+            self._perfil.disable()
+        finally:
+            _lock.release()
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        ruta = os.path.join(settings.PROFILING_DIR, f"{self.id}.prof")
+        self._perfil.dump_stats(ruta)
+
+        resumen = io.StringIO()
+        pstats.Stats(self._perfil, stream=resumen).sort_stats("cumulative").print_stats(25)
+        logger.info("Perfil %s de %s guardado en %s\n%s", self.id, descripcion, ruta, resumen.getvalue())
+
+
+def iniciar_perfil(valor_header: Optional[str]) -> Optional[Perfil]:
+    """
+    Inicia un perfil si PROFILING_TOKEN está configurado y el header X-Profile lo trae
+    """
+    if not settings.PROFILING_TOKEN or not valor_header:
+        return None
+    if not hmac.compare_digest(valor_header.encode(), settings.PROFILING_TOKEN.encode()):
+        return None
+    if not _lock.acquire(blocking=False):
+        return None
+    try:
+        return Perfil()
+    except Exception:
+        _lock.release()
+        raise
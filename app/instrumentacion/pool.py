@@ -0,0 +1,95 @@
+import time
+from typing import Dict, Iterable
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.instrumentacion.metricas import Contador, Histograma, Muestras, registrar_recolector
+
+BUCKETS_CHECKOUT = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+pool_checkout = Histograma(
+    "biblioteca_db_pool_checkout_seconds",
+    "Espera para obtener una conexión del pool",
+    ("engine",),
+    buckets=BUCKETS_CHECKOUT,
+)
+pool_timeouts = Contador("biblioteca_db_pool_timeouts_total", "Checkouts que agotaron DB_POOL_TIMEOUT", ("engine",))
+pool_pings = Contador("biblioteca_db_pool_pings_total", "Pings de conexiones ociosas y su resultado", ("engine", "resultado"))
+
+#Pools instrumentados por nombre de engine, para los gauges de /metrics
+_pools: Dict[str, QueuePool] = {}
+
+
+class _MedicionCheckout:
+    """
+    Mide cuánto espera cada checkout (incluida la apertura de conexiones nuevas)
+    """
+    nombre_engine = "sync"
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_timeouts.inc(self.nombre_engine)
+            raise
+        finally:
+            pool_checkout.observe(time.perf_counter() - inicio, self.nombre_engine)
+
+
+class PoolInstrumentado(_MedicionCheckout, QueuePool):
+    pass
+
+
+class PoolAsyncInstrumentado(_MedicionCheckout, AsyncAdaptedQueuePool):
+    nombre_engine = "async"
+
+
+def registrar_pool(engine: Engine, nombre: str = None) -> None:
+    pool = engine.pool
+    if isinstance(pool, _MedicionCheckout):
+        if nombre:
+            pool.nombre_engine = nombre
+        _pools[pool.nombre_engine] = pool
+
+
+def ping_si_ociosa(engine: Engine, segundos: float) -> None:
+    """
+    Alternativa a pool_pre_ping: solo se comprueba la conexión si estuvo ociosa más de
+    `segundos`, en lugar de pagar un round trip en cada checkout
+    """
+    nombre = getattr(engine.pool, "nombre_engine", "sync")
+
+    @event.listens_for(engine, "checkin")
+    def _registrar_devolucion(conexion_dbapi, registro):
+        registro.info["devuelta_en"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _verificar(conexion_dbapi, registro, proxy):
+        devuelta_en = registro.info.get("devuelta_en")
+        if devuelta_en is None or time.monotonic() - devuelta_en < segundos:
+            return
+        try:
+            viva = engine.dialect.do_ping(conexion_dbapi)
+        except Exception:
+            viva = False
+        if not viva:
+            pool_pings.inc(nombre, "caida")
+            # El pool descarta la conexión y reintenta el checkout con una nueva
+            raise exc.DisconnectionError()
+        pool_pings.inc(nombre, "ok")
+
+
+def _recolector_pools() -> Iterable[Muestras]:
+    estados = dict(_pools)
+    medidas = (
+        ("biblioteca_db_pool_size", "Tamaño configurado del pool", lambda p: p.size()),
+        ("biblioteca_db_pool_checked_out", "Conexiones en uso", lambda p: p.checkedout()),
+        ("biblioteca_db_pool_checked_in", "Conexiones ociosas en el pool", lambda p: p.checkedin()),
+        ("biblioteca_db_pool_overflow", "Conexiones abiertas por encima del tamaño del pool", lambda p: max(0, p.overflow())),
+    )
+    for nombre, ayuda, medir in medidas:
+        yield nombre, "gauge", ayuda, [({"engine": engine}, medir(pool)) for engine, pool in estados.items()]
+
+
+registrar_recolector(_recolector_pools)
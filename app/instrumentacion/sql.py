@@ -0,0 +1,74 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config.settings import settings
+from app.instrumentacion.metricas import db_consultas, db_consultas_lentas, db_duracion
+
+logger = logging.getLogger(__name__)
+
+
+class EstadisticasRequest:
+    """
+    Acumula las sentencias SQL ejecutadas durante un request
+    """
+    __slots__ = ("consultas", "tiempo_db", "mas_lenta", "tiempo_mas_lenta")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.mas_lenta: Optional[str] = None
+        self.tiempo_mas_lenta = 0.0
+
+    def registrar(self, sentencia: str, duracion: float) -> None:
+        self.consultas += 1
+        self.tiempo_db += duracion
+        if duracion > self.tiempo_mas_lenta:
+            self.mas_lenta = sentencia
+            self.tiempo_mas_lenta = duracion
+
+
+#Estadísticas del request en curso (run_blocking copia el contexto a los hilos del pool)
+estadisticas_request: ContextVar[Optional[EstadisticasRequest]] = ContextVar("estadisticas_request", default=None)
+
+
+def _antes(conn, cursor, sentencia, parametros, contexto, executemany) -> None:
+    conn.info.setdefault("inicio_sentencias", []).append(time.perf_counter())
+
+
+def _despues(conn, cursor, sentencia, parametros, contexto, executemany) -> None:
+    inicios = conn.info.get("inicio_sentencias")
+    if not inicios:
+        return
+    duracion = time.perf_counter() - inicios.pop()
+    db_consultas.inc()
+    db_duracion.observe(duracion)
+
+    estadisticas = estadisticas_request.get()
+    if estadisticas is not None:
+        estadisticas.registrar(sentencia, duracion)
+
+    if duracion * 1000 >= settings.SLOW_QUERY_MS:
+        db_consultas_lentas.inc()
+        logger.warning("Consulta lenta (%.1f ms): %s", duracion * 1000, sentencia[:1000])
+
+
+def _error(contexto_excepcion) -> None:
+    # La sentencia falló: after_cursor_execute no se dispara, se descarta su inicio
+    conexion = contexto_excepcion.connection
+    inicios = conexion.info.get("inicio_sentencias") if conexion is not None else None
+    if inicios:
+        inicios.pop()
+
+
+def instrumentar_engine(engine: Engine) -> None:
+    """
+    Mide cada sentencia del engine (para un engine async, pasar engine.sync_engine)
+    """
+    if event.contains(engine, "before_cursor_execute", _antes):
+        return
+    event.listen(engine, "before_cursor_execute", _antes)
+    event.listen(engine, "after_cursor_execute", _despues)
+    event.listen(engine, "handle_error", _error)
@@ -1,43 +1,106 @@
-from app.config.database import get_db, create_database
+import asyncio
+from contextlib import asynccontextmanager
+from app.config.database import get_db, engine, async_engine, replicas
+from app.config.replicas import vigilar_replicas
+from app.config.executor import run_blocking
+from app.config.settings import settings
 from app.middleware import error_handler
-from fastapi import FastAPI, Depends
+from app.middleware.instrumentacion import InstrumentacionMiddleware
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.requests import Request
 from fastapi.exception_handlers import RequestValidationError
 from fastapi.exceptions import RequestValidationError
-from app.routers import libros, prestamos, categoria, usuario, auth, dashboard
+from app.routers import libros, prestamos, categoria, usuario, auth, dashboard, exportar, metricas
+from app.services.paginacion import NEXT_CURSOR_HEADER
+from app.services.serializacion import clase_respuesta_json
+from app.cache.etag import NoModificado
+from app.services.estadisticas_service import reconciliar_periodicamente
+from app.instrumentacion.sql import instrumentar_engine
+from app.arranque import inicializar, precalentar_pool_async
+from app.security import hashing
 
 
-create_database()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    #Esquema, pool y caches; importar la app no toca la base
+    await run_blocking(inicializar)
+    await precalentar_pool_async()
+    await run_blocking(hashing.iniciar)
 
-app = FastAPI(title="Gestion biblioteca", version="1.0.0")
+    tareas = []
+    #Reconciliación periódica de las estadísticas materializadas del dashboard
+    if settings.STATS_RECONCILE_INTERVAL_SECONDS > 0:
+        tareas.append(asyncio.create_task(reconciliar_periodicamente(settings.STATS_RECONCILE_INTERVAL_SECONDS)))
+    #Atraso de las réplicas de lectura
+    if replicas is not None and settings.REPLICA_LAG_CHECK_SECONDS > 0:
+        tareas.append(asyncio.create_task(vigilar_replicas(replicas, settings.REPLICA_LAG_CHECK_SECONDS)))
+    yield
+    for tarea in tareas:
+        tarea.cancel()
+    hashing.cerrar()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-
-@app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     return JSONResponse(
         status_code=422,
         content={"detail": exc.errors(), "body": exc.body}
     )
 
-app.add_middleware(error_handler.ErrorHandlerMiddleware)
-
-app.include_router(libros.router, tags=["Libros"])
-app.include_router(prestamos.router, tags=["Préstamos"])
-app.include_router(categoria.router, tags=["Categorias"])
-app.include_router(usuario.router, tags=["Usuarios"])
-app.include_router(auth.router, tags=["Autenticación"])
-app.include_router(dashboard.router, tags=["Dashboard"])
+async def no_modificado_handler(request: Request, exc: NoModificado):
+    return Response(status_code=304, headers=exc.headers)
 
-@app.get("/")
 def get_users(db = Depends(get_db)):
-    return {"message": "backend en funcionamiento"}
\ No newline at end of file
+    return {"message": "backend en funcionamiento"}
+
+
+def create_app() -> FastAPI:
+    """
+    Construye la aplicación; la inicialización que necesita la base corre en el lifespan
+    """
+    app = FastAPI(
+        title="Gestion biblioteca",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=clase_respuesta_json()
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing"],
+    )
+
+    app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    app.add_exception_handler(NoModificado, no_modificado_handler)
+
+    app.add_middleware(error_handler.ErrorHandlerMiddleware)
+
+    #Instrumentación por fuera del manejo de errores para medir también los 500
+    if settings.INSTRUMENTATION_ENABLED:
+        instrumentar_engine(engine)
+        if async_engine is not None:
+            instrumentar_engine(async_engine.sync_engine)
+        if replicas is not None:
+            for replica in replicas.sync + replicas.async_:
+                instrumentar_engine(replica)
+        app.add_middleware(InstrumentacionMiddleware)
+        app.include_router(metricas.router)
+
+    app.include_router(libros.router, tags=["Libros"])
+    app.include_router(prestamos.router, tags=["Préstamos"])
+    app.include_router(categoria.router, tags=["Categorias"])
+    app.include_router(usuario.router, tags=["Usuarios"])
+    app.include_router(auth.router, tags=["Autenticación"])
+    app.include_router(dashboard.router, tags=["Dashboard"])
+    app.include_router(exportar.router, tags=["Exportación"])
+
+    app.add_api_route("/", get_users, methods=["GET"])
+    return app
+
+
+app = create_app()
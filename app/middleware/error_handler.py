@@ -1,19 +1,39 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import FastAPI, Request, Response
 from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class ErrorHandlerMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: FastAPI):
-        super().__init__(app)
+class ErrorHandlerMiddleware:
+    """
+    Middleware ASGI puro: convierte las excepciones no controladas en un 500 JSON.
+    No envuelve el request ni la respuesta, así que las respuestas en streaming
+    pasan sin buffer. Si el error ocurre con la respuesta ya iniciada no se puede
+    cambiar el estado: se propaga para que el servidor corte la conexión.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        respuesta_iniciada = False
+
+        async def send_registrado(message: Message) -> None:
+            nonlocal respuesta_iniciada
+            if message["type"] == "http.response.start":
+                respuesta_iniciada = True
+            await send(message)
 
-    async def dispatch(self, request: Request, call_next) -> Response | JSONResponse:
         try:
-            return await call_next(request)
+            await self.app(scope, receive, send_registrado)
         except Exception as e:
-            return JSONResponse(
+            if respuesta_iniciada:
+                raise
+            respuesta = JSONResponse(
                 status_code=500,
                 content={
                     "detail": str(e),
                     "message": "Ha ocurrido un error",
                 }
-            )
\ No newline at end of file
+            )
+            await respuesta(scope, receive, send)
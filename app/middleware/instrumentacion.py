@@ -0,0 +1,59 @@
+import time
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config.settings import settings
+from app.instrumentacion.metricas import http_duracion, http_requests
+from app.instrumentacion.perfilador import PROFILE_HEADER, PROFILE_ID_HEADER, iniciar_perfil
+from app.instrumentacion.sql import EstadisticasRequest, estadisticas_request
+
+
+def _server_timing(estadisticas: EstadisticasRequest, duracion: float) -> str:
+    return (
+        f'db;dur={estadisticas.tiempo_db * 1000:.1f};desc="{estadisticas.consultas} consultas", '
+        f"db-max;dur={estadisticas.tiempo_mas_lenta * 1000:.1f}, "
+        f"app;dur={duracion * 1000:.1f}"
+    )
+
+
+class InstrumentacionMiddleware:
+    """
+    Middleware ASGI: mide cada request (tiempo total y SQL ejecutado), agrega
+    Server-Timing a la respuesta y alimenta las métricas de /metrics.
+    El tiempo de app se toma al enviar los headers; el cuerpo en streaming no se incluye.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estadisticas = EstadisticasRequest()
+        token = estadisticas_request.set(estadisticas)
+        perfil = iniciar_perfil(Headers(scope=scope).get(PROFILE_HEADER))
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def send_instrumentado(message: Message) -> None:
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+                headers = MutableHeaders(scope=message)
+                if settings.SERVER_TIMING_ENABLED:
+                    headers.append("Server-Timing", _server_timing(estadisticas, time.perf_counter() - inicio))
+                if perfil is not None:
+                    headers.append(PROFILE_ID_HEADER, perfil.id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_instrumentado)
+        finally:
+            duracion = time.perf_counter() - inicio
+            estadisticas_request.reset(token)
+            # Plantilla de la ruta (no la URL) para acotar la cantidad de series
+            ruta = getattr(scope.get("route"), "path", "sin_ruta")
+            http_requests.inc(scope["method"], ruta, str(estado))
+            http_duracion.observe(duracion, scope["method"], ruta)
+            if perfil is not None:
+                perfil.terminar(f'{scope["method"]} {scope["path"]}')
@@ -0,0 +1,71 @@
+import logging
+from datetime import datetime
+from typing import List
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.engine import Engine
+from app.config.database import Base
+from app.migrations.versiones import MIGRACIONES, Migracion
+
+logger = logging.getLogger(__name__)
+
+#Registro de migraciones aplicadas (fuera de Base para que create_all no la gestione)
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("descripcion", String(200), nullable=False),
+    Column("aplicada_en", DateTime, nullable=False),
+)
+
+
+def version_actual(engine: Engine) -> int:
+    """
+    Última versión aplicada (0 si la base no tiene registro de migraciones)
+    """
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_version.name):
+            return 0
+        return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def pendientes(engine: Engine) -> List[Migracion]:
+    actual = version_actual(engine)
+    return [m for m in MIGRACIONES if m.version > actual]
+
+
+def migrar(engine: Engine) -> List[int]:
+    """
+    Lleva el esquema a la última versión. Una base vacía se crea completa desde los
+    modelos y se marca al día; en las existentes se aplican las migraciones pendientes
+    y cada una se registra en schema_version en cuanto termina. Devuelve las versiones aplicadas.
+
+    En MySQL cada sentencia DDL confirma la transacción implícitamente, así que una migración
+    que falla a mitad puede quedar aplicada en parte y sin registrar. Por eso todos los pasos
+    comprueban el esquema antes de cambiarlo: volver a ejecutar migrar completa lo que falte.
+    """
+    with engine.begin() as conn:
+        base_vacia = not inspect(conn).has_table("libros")
+        schema_version.create(conn, checkfirst=True)
+
+    if base_vacia:
+        Base.metadata.create_all(bind=engine)
+        a_aplicar, ejecutar = MIGRACIONES, False
+    else:
+        a_aplicar, ejecutar = pendientes(engine), True
+
+    aplicadas = []
+    for migracion in a_aplicar:
+        with engine.begin() as conn:
+            if ejecutar:
+                logger.info("Aplicando migración %s: %s", migracion.version, migracion.descripcion)
+                migracion.aplicar(conn)
+            conn.execute(schema_version.insert().values(
+                version=migracion.version,
+                descripcion=migracion.descripcion,
+                aplicada_en=datetime.utcnow(),
+            ))
+        aplicadas.append(migracion.version)
+
+    #Tablas nuevas sin migración propia (no altera las existentes)
+    Base.metadata.create_all(bind=engine)
+    return aplicadas
@@ -0,0 +1,132 @@
+from typing import Callable, List, NamedTuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from app.models.usuario import Usuario
+from app.models.libros import Libro
+from app.models.categoria import Categoria
+from app.models.prestamo import Prestamo
+from app.models.estadisticas import Estadistica, EstadisticaCategoria
+from app.config.settings import settings
+
+
+class Migracion(NamedTuple):
+    version: int
+    descripcion: str
+    aplicar: Callable[[Connection], None]
+
+
+#Las bases creadas antes de llevar control de versiones pueden tener ya parte de
+#estos cambios (create_all), y en MySQL una migración interrumpida queda a medias
+#porque el DDL no es transaccional. Cada paso comprueba antes de crear y puede
+#repetirse sin efectos.
+
+def _tiene_columna(conn: Connection, tabla: str, columna: str) -> bool:
+    return any(c["name"] == columna for c in inspect(conn).get_columns(tabla))
+
+
+def _tiene_clave_foranea(conn: Connection, tabla: str, nombre: str) -> bool:
+    return any(fk["name"] == nombre for fk in inspect(conn).get_foreign_keys(tabla))
+
+
+def _crear_indices(conn: Connection, tabla, *nombres: str) -> None:
+    """
+    Crea los índices declarados en el modelo que falten en la base
+    """
+    existentes = {i["name"] for i in inspect(conn).get_indexes(tabla.name)}
+    for indice in tabla.indexes:
+        if indice.name in nombres and indice.name not in existentes:
+            indice.create(conn)
+
+
+def _token_version(conn: Connection) -> None:
+    if not _tiene_columna(conn, "usuarios", "token_version"):
+        conn.execute(text("ALTER TABLE usuarios ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
+
+
+def _indices_fulltext(conn: Connection) -> None:
+    if conn.dialect.name != "mysql":
+        return
+    _crear_indices(conn, Libro.__table__, "ft_libros_titulo_autor", "ft_libros_titulo", "ft_libros_autor")
+    _crear_indices(conn, Categoria.__table__, "ft_categorias_nombre")
+
+
+def _tablas_estadisticas(conn: Connection) -> None:
+    Estadistica.__table__.create(conn, checkfirst=True)
+    EstadisticaCategoria.__table__.create(conn, checkfirst=True)
+
+
+def _prestamo_activo_unico(conn: Connection) -> None:
+    duplicados = conn.execute(text(
+        "SELECT libro_id FROM prestamos WHERE fecha_devolucion IS NULL "
+        "GROUP BY libro_id HAVING COUNT(*) > 1"
+    )).scalars().all()
+    if duplicados:
+        raise RuntimeError(
+            f"Libros con más de un préstamo activo, cerrar los sobrantes antes de migrar: {duplicados}"
+        )
+    if not _tiene_columna(conn, "prestamos", "libro_activo_id"):
+        # SQLite solo admite agregar columnas generadas VIRTUAL
+        almacenamiento = "STORED" if conn.dialect.name == "mysql" else "VIRTUAL"
+        conn.execute(text(
+            "ALTER TABLE prestamos ADD COLUMN libro_activo_id INTEGER "
+            f"GENERATED ALWAYS AS (CASE WHEN fecha_devolucion IS NULL THEN libro_id END) {almacenamiento}"
+        ))
+    _crear_indices(conn, Prestamo.__table__, "ux_prestamos_libro_activo")
+
+
+def _indices_prestamos(conn: Connection) -> None:
+    _crear_indices(
+        conn,
+        Prestamo.__table__,
+        "ix_prestamos_libro_devolucion",
+        "ix_prestamos_usuario_devolucion",
+        "ix_prestamos_usuario_fecha",
+    )
+
+
+def _libro_prestamo_activo(conn: Connection) -> None:
+    if not _tiene_columna(conn, "libros", "prestamo_activo_id"):
+        conn.execute(text("ALTER TABLE libros ADD COLUMN prestamo_activo_id INTEGER NULL"))
+    # Aparte de la columna: en MySQL el ALTER anterior ya quedó confirmado aunque este falle.
+    # SQLite no permite agregar claves foráneas a una tabla existente
+    if conn.dialect.name == "mysql" and not _tiene_clave_foranea(conn, "libros", "fk_libros_prestamo_activo"):
+        conn.execute(text(
+            "ALTER TABLE libros ADD CONSTRAINT fk_libros_prestamo_activo "
+            "FOREIGN KEY (prestamo_activo_id) REFERENCES prestamos (id) ON DELETE SET NULL"
+        ))
+    _crear_indices(conn, Libro.__table__, "ix_libros_disponibles")
+    conn.execute(text(
+        "UPDATE libros SET prestamo_activo_id = ("
+        "SELECT p.id FROM prestamos p WHERE p.libro_id = libros.id AND p.fecha_devolucion IS NULL)"
+    ))
+
+
+def _colacion_busqueda(conn: Connection) -> None:
+    """
+    Columnas con índice FULLTEXT a SEARCH_MYSQL_COLLATION, para que la búsqueda en MySQL
+    ignore acentos y mayúsculas igual que el motor en memoria
+    """
+    if conn.dialect.name != "mysql":
+        return
+    compilador = conn.dialect.type_compiler_instance
+    for columna in (Libro.__table__.c.titulo, Libro.__table__.c.autor, Categoria.__table__.c.nombre):
+        actual = conn.execute(text(
+            "SELECT COLLATION_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla AND COLUMN_NAME = :columna"
+        ), {"tabla": columna.table.name, "columna": columna.name}).scalar()
+        if actual != settings.SEARCH_MYSQL_COLLATION:
+            conn.execute(text(
+                f"ALTER TABLE {columna.table.name} MODIFY {columna.name} {compilador.process(columna.type)} NOT NULL"
+            ))
+
+
+#Orden de aplicación; las versiones nuevas se agregan al final
+MIGRACIONES: List[Migracion] = [
+    Migracion(1, "usuarios.token_version", _token_version),
+    Migracion(2, "índices FULLTEXT de libros y categorías", _indices_fulltext),
+    Migracion(3, "tablas de estadísticas materializadas", _tablas_estadisticas),
+    Migracion(4, "prestamos.libro_activo_id con índice único", _prestamo_activo_unico),
+    Migracion(5, "índices compuestos de prestamos", _indices_prestamos),
+    Migracion(6, "libros.prestamo_activo_id con carga inicial", _libro_prestamo_activo),
+    Migracion(7, "colación sin acentos en las columnas de búsqueda", _colacion_busqueda),
+]
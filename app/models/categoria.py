@@ -1,13 +1,31 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index
+from sqlalchemy.dialects.mysql import VARCHAR
 from sqlalchemy.orm import relationship
 from app.config.database import Base
+from app.config.settings import settings
+
+
+def texto_buscable(longitud: int):
+    """
+    Columna de texto con índice FULLTEXT: en MySQL usa una colación sin acentos ni
+    mayúsculas, que es la que normaliza la búsqueda (ver app/search/mysql.py)
+    """
+    return String(longitud).with_variant(
+        VARCHAR(longitud, charset="utf8mb4", collation=settings.SEARCH_MYSQL_COLLATION), "mysql"
+    )
+
 
 class Categoria(Base):
     __tablename__ = "categorias"
 
     id= Column(Integer, primary_key=True, autoincrement=True)
-    nombre = Column(String(50), nullable=False, unique=True)
+    nombre = Column(texto_buscable(50), nullable=False, unique=True)
     descripcion = Column(String(255), nullable=True)
 
+    # Índice FULLTEXT para la búsqueda por categoría (solo MySQL)
+    __table_args__ = (
+        Index("ft_categorias_nombre", "nombre", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
     # Relaciones
     libros = relationship("Libro", back_populates="categoria")
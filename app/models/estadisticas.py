@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.config.database import Base
+
+class Estadistica(Base):
+    """
+    Contadores globales mantenidos de forma incremental por los servicios
+    """
+    __tablename__ = "estadisticas"
+
+    clave = Column(String(50), primary_key=True)
+    valor = Column(Integer, nullable=False, default=0)
+
+class EstadisticaCategoria(Base):
+    """
+    Cantidad de préstamos (históricos) de los libros de cada categoría
+    """
+    __tablename__ = "estadisticas_categoria"
+
+    categoria_id = Column(Integer, ForeignKey("categorias.id"), primary_key=True)
+    prestamos = Column(Integer, nullable=False, default=0, index=True)
@@ -1,17 +1,37 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.config.database import Base
+from app.models.categoria import texto_buscable
 
 class Libro(Base):
     __tablename__ = "libros"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    titulo = Column(String(100), nullable=False)
-    autor = Column(String(100), nullable=False)
+    titulo = Column(texto_buscable(100), nullable=False)
+    autor = Column(texto_buscable(100), nullable=False)
     isbn = Column(String(20), unique=True, nullable=False)
     editorial = Column(String(200), nullable=False)
     categoria_id = Column(Integer, ForeignKey("categorias.id"), nullable=False)
+    # Préstamo activo del libro (NULL si está disponible); lo mantienen create_prestamo y devolver_libro
+    prestamo_activo_id = Column(
+        Integer,
+        ForeignKey("prestamos.id", use_alter=True, name="fk_libros_prestamo_activo", ondelete="SET NULL"),
+        nullable=True
+    )
+
+    # Índices FULLTEXT para la búsqueda del catálogo (solo MySQL, ver app/search/mysql.py)
+    __table_args__ = (
+        Index("ft_libros_titulo_autor", "titulo", "autor", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+        Index("ft_libros_titulo", "titulo", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+        Index("ft_libros_autor", "autor", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+        # Libros disponibles en orden de id sin recorrer prestamos
+        Index("ix_libros_disponibles", "prestamo_activo_id", "id"),
+    )
 
     # Relaciones
     categoria = relationship("Categoria", back_populates="libros")
-    prestamos = relationship("Prestamo", back_populates="libro")
\ No newline at end of file
+    prestamos = relationship("Prestamo", back_populates="libro", foreign_keys="Prestamo.libro_id")
+
+    @property
+    def disponible(self) -> bool:
+        return self.prestamo_activo_id is None
\ No newline at end of file
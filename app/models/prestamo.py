@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Computed, Index
 from sqlalchemy.orm import relationship
 from app.config.database import Base
 from datetime import datetime
@@ -11,9 +11,20 @@ class Prestamo(Base):
     usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
     fecha_prestamo = Column(DateTime, default=datetime.utcnow, nullable=False)
     fecha_devolucion = Column(DateTime, nullable=True)
+    # libro_id mientras el préstamo está activo, NULL al devolverse: el índice único
+    # garantiza en la base un solo préstamo activo por libro
+    libro_activo_id = Column(Integer, Computed("CASE WHEN fecha_devolucion IS NULL THEN libro_id END", persisted=True))
+
+    __table_args__ = (
+        Index("ux_prestamos_libro_activo", "libro_activo_id", unique=True),
+        # Accesos frecuentes: disponibilidad por libro, activos por usuario e historial por fecha
+        Index("ix_prestamos_libro_devolucion", "libro_id", "fecha_devolucion"),
+        Index("ix_prestamos_usuario_devolucion", "usuario_id", "fecha_devolucion"),
+        Index("ix_prestamos_usuario_fecha", "usuario_id", "fecha_prestamo", "id"),
+    )
 
     # Relaciones
-    libro = relationship("Libro", back_populates="prestamos")
+    libro = relationship("Libro", back_populates="prestamos", foreign_keys=[libro_id])
     usuario = relationship("Usuario", back_populates="prestamos")
 
     @property
@@ -15,6 +15,8 @@ class Usuario(Base):
     email = Column(String(100), unique=True, nullable=False)
     password = Column(String(100), nullable=False)
     rol = Column(Enum(RolEnum), default=RolEnum.CLIENTE, nullable=False)
+    # Se incrementa al cambiar rol o email para invalidar los tokens emitidos antes
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     # Relaciones
     prestamos = relationship("Prestamo", back_populates="usuario")
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Request, status
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 
 from app.config.database import get_db
 from app.schemas.usuario import UsuarioCreate, UsuarioLogin, Token, UsuarioResponse
-from app.services.auth_service import AuthService
+from app.services.async_services import AsyncAuthService
+from app.security.limitador import get_limitador_login
 
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
 security = HTTPBearer()
@@ -17,17 +18,25 @@ async def register(
     """
     Registrar nuevo usuario
     """
-    user = AuthService.register_user(db, user_data)
+    user = await AsyncAuthService.register_user(db, user_data)
     return user
 
 @router.post("/login", response_model=Token)
 async def login(
     login_data: UsuarioLogin,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Iniciar sesión y obtener token JWT
     """
-    user = AuthService.authenticate_user(db, login_data)
-    token_data = AuthService.create_user_token(user)
+    # Con un proxy delante, uvicorn --proxy-headers para que request.client sea el cliente real
+    limitador = get_limitador_login()
+    if limitador is not None:
+        await limitador.admitir(request.client.host if request.client else None, login_data.email)
+    
+    user = await AsyncAuthService.authenticate_user(db, login_data)
+    if limitador is not None:
+        await limitador.registrar_exito(login_data.email)
+    token_data = AsyncAuthService.create_user_token(user)
     return token_data
\ No newline at end of file
@@ -1,34 +1,51 @@
-from fastapi import APIRouter, Depends, status, Query
+from fastapi import APIRouter, Depends, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List
 from app.config.database import get_db
-from app.models.usuario import Usuario
 from app.schemas.categoria import CategoriaCreate, CategoriaUpdate, CategoriaResponse, CategoriaContarLibros
-from app.services.categoria_services import CategoriaService
-from app.security.dependencies import get_current_user, get_current_bibliotecario
+from app.services.async_services import AsyncCategoriaService
+from app.services.paginacion import PaginacionParams, aplicar_cursor
+from app.security.principal import Principal
+from app.cache.etag import etag_condicional
+from app.config.settings import settings
+from app.services.estadisticas_service import VERSION_CATEGORIAS
+from app.security.dependencies import get_current_principal, get_current_bibliotecario
 
 router = APIRouter(prefix="/categorias", tags=["Categorias"])
 
+#Las categorías cambian poco: se pueden reutilizar unos segundos sin revalidar
+CACHE_CATEGORIAS = etag_condicional(
+    VERSION_CATEGORIAS,
+    cache_control=f"private, max-age={settings.CATEGORIAS_MAX_AGE_SECONDS}, must-revalidate"
+)
+
 @router.get("/", response_model=List[CategoriaResponse],status_code=status.HTTP_200_OK)
 async def get_categorias(
-    current_user: Usuario = Depends(get_current_user),
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
+    etag: str = Depends(CACHE_CATEGORIAS),
     db: Session = Depends(get_db)
 ):
     """
     Obtener lista de categorías
     """
-    categorias = CategoriaService.get_categorias(db)
-    return categorias
+    pagina = await AsyncCategoriaService.get_categorias(db, paginacion.cursor, paginacion.limit)
+    return aplicar_cursor(response, pagina)
 
 @router.get("/con-conteo", response_model=List[CategoriaContarLibros],status_code=status.HTTP_200_OK)
 async def get_categorias_with_count(
-    current_user: Usuario = Depends(get_current_user),
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
+    etag: str = Depends(CACHE_CATEGORIAS),
     db: Session = Depends(get_db)
 ):
     """
     Obtener categorías con conteo de libros
     """
-    categorias = CategoriaService.get_categorias_with_count(db)
+    pagina = await AsyncCategoriaService.get_categorias_with_count(db, paginacion.cursor, paginacion.limit)
+    categorias = aplicar_cursor(response, pagina)
     return [
         CategoriaContarLibros(
             id=cat["id"],
@@ -42,48 +59,49 @@ async def get_categorias_with_count(
 @router.get("/{categoria_id}", response_model=CategoriaResponse,status_code=status.HTTP_200_OK)
 async def get_categoria_by_id(
     categoria_id: int,
-    current_user: Usuario = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
+    etag: str = Depends(CACHE_CATEGORIAS),
     db: Session = Depends(get_db)
 ):
     """
     Obtener categoría por ID
     """
-    categoria = CategoriaService.get_categoria_by_id(db, categoria_id)
+    categoria = await AsyncCategoriaService.get_categoria_by_id(db, categoria_id)
     return categoria
 
 @router.post("/", response_model=CategoriaResponse, status_code=status.HTTP_201_CREATED)
 async def create_categoria(
     categoria_data: CategoriaCreate,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Crear nueva categoría (solo bibliotecarios)
     """
-    categoria = CategoriaService.create_categoria(db, categoria_data)
+    categoria = await AsyncCategoriaService.create_categoria(db, categoria_data)
     return categoria
 
 @router.put("/{categoria_id}", response_model=CategoriaResponse)
 async def update_categoria(
     categoria_id: int,
     categoria_data: CategoriaUpdate,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Actualizar categoría (solo bibliotecarios)
     """
-    categoria = CategoriaService.update_categoria(db, categoria_id, categoria_data)
+    categoria = await AsyncCategoriaService.update_categoria(db, categoria_id, categoria_data)
     return categoria
 
 @router.delete("/{categoria_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_categoria(
     categoria_id: int,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Eliminar categoría (solo bibliotecarios)
     """
-    CategoriaService.delete_categoria(db, categoria_id)
+    await AsyncCategoriaService.delete_categoria(db, categoria_id)
     return None
\ No newline at end of file
@@ -3,15 +3,15 @@ from sqlalchemy.orm import Session
 
 import datetime
 from app.config.database import get_db
-from app.models.usuario import Usuario
-from app.services.prestamos_services import PrestamoService
+from app.services.async_services import AsyncPrestamoService
+from app.security.principal import Principal
 from app.security.dependencies import get_current_bibliotecario
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 @router.get("/estadisticas")
 async def get_estadisticas_dashboard(
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
@@ -22,7 +22,7 @@ async def get_estadisticas_dashboard(
     número de usuarios registrados
     categoría de libros más popular (mayor cantidad de libros prestados)
     """
-    estadisticas = PrestamoService.get_estadisticas_dashboard(db)
+    estadisticas = await AsyncPrestamoService.get_estadisticas_dashboard(db)
     
     return {
         "estadisticas": estadisticas,
@@ -31,13 +31,13 @@ async def get_estadisticas_dashboard(
 
 @router.get("/resumen")
 async def get_resumen_dashboard(
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Obtener resumen detallado para el dashboard
     """
-    estadisticas = PrestamoService.get_estadisticas_dashboard(db)
+    estadisticas = await AsyncPrestamoService.get_estadisticas_dashboard(db)
     
     # Formatear la respuesta con más detalles
     return {
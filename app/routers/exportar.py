@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, Query
+
+from app.services.libro_service import LibroService
+from app.services.usuario_services import UsuarioService
+from app.services.prestamos_services import PrestamoService
+from app.services.streaming import stream_exportacion
+from app.security.principal import Principal
+from app.security.dependencies import get_current_bibliotecario
+
+router = APIRouter(prefix="/exportar", tags=["Exportación"])
+
+FORMATO = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson (una fila JSON por línea) o csv")
+
+@router.get("/libros")
+async def exportar_libros(
+    formato: str = FORMATO,
+    current_user: Principal = Depends(get_current_bibliotecario)
+):
+    """
+    Exportar el catálogo completo (solo bibliotecarios)
+    """
+    return stream_exportacion(LibroService.exportar_libros, formato, "libros")
+
+@router.get("/usuarios")
+async def exportar_usuarios(
+    formato: str = FORMATO,
+    current_user: Principal = Depends(get_current_bibliotecario)
+):
+    """
+    Exportar los usuarios registrados (solo bibliotecarios)
+    """
+    return stream_exportacion(UsuarioService.exportar_usuarios, formato, "usuarios")
+
+@router.get("/prestamos")
+async def exportar_prestamos(
+    formato: str = FORMATO,
+    activos: bool = Query(False, description="Solo préstamos sin devolver"),
+    current_user: Principal = Depends(get_current_bibliotecario)
+):
+    """
+    Exportar el historial de préstamos (solo bibliotecarios)
+    """
+    return stream_exportacion(
+        lambda db: PrestamoService.exportar_prestamos(db, activos),
+        formato,
+        "prestamos_activos" if activos else "prestamos"
+    )
@@ -1,224 +1,184 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import json
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.config.database import get_db
-from app.models.usuario import Usuario
-from app.schemas.libros import LibroCreate, LibroUpdate, LibroResponse, LibroBusqueda
+from app.schemas.libros import LibroCreate, LibroUpdate, LibroResponse, LibroBusqueda, ReporteImportacion
+from app.services.async_services import AsyncLibroService
 from app.services.libro_service import LibroService
-from app.security.dependencies import get_current_user, get_current_bibliotecario
+from app.services.streaming import stream_ndjson
+from app.services.serializacion import libro_json, libros_json, respuesta_json
+from app.services.paginacion import PaginacionParams, aplicar_cursor
+from app.security.principal import Principal
+from app.cache.etag import etag_condicional
+from app.services.estadisticas_service import VERSION_LIBROS
+from app.security.dependencies import get_current_principal, get_current_bibliotecario
+from app.security.exceptions import importacion_invalida_exception
 
 router = APIRouter(prefix="/libros", tags=["Libros"])
 
+#La disponibilidad cambia con cada préstamo: el cliente guarda la respuesta pero revalida siempre
+CACHE_LIBROS = etag_condicional(VERSION_LIBROS, cache_control="private, no-cache")
+
 @router.get("/", response_model=List[LibroResponse])
 async def get_libros(
-    current_user: Usuario = Depends(get_current_user),
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
+    etag: str = Depends(CACHE_LIBROS),
     db: Session = Depends(get_db)
 ):
     """
     Obtener lista de todos los libros
     """
-    libros = LibroService.get_libros(db)
-    
-    libros_response = []
-    for libro in libros:
-        disponible = LibroService.verificar_disponibilidad(db, libro.id)
-        libro_dict = {
-            "id": libro.id,
-            "titulo": libro.titulo,
-            "autor": libro.autor,
-            "isbn": libro.isbn,
-            "editorial": libro.editorial,
-            "categoria_id": libro.categoria_id,
-            "disponible": disponible,
-            "categoria": libro.categoria
-        }
-        libros_response.append(libro_dict)
-    
-    return libros_response
+    pagina = await AsyncLibroService.get_libros(db, paginacion.cursor, paginacion.limit)
+    return respuesta_json(libros_json(aplicar_cursor(response, pagina)), response)
 
 @router.get("/disponibles", response_model=List[LibroResponse])
 async def get_libros_disponibles(
-    current_user: Usuario = Depends(get_current_user),
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
+    formato: str = Query("json", pattern="^(json|ndjson)$", description="ndjson transmite todos los disponibles, uno por línea"),
+    current_user: Principal = Depends(get_current_principal),
+    etag: str = Depends(CACHE_LIBROS),
     db: Session = Depends(get_db)
 ):
     """
     Obtener libros disponibles (sin préstamos activos)
     """
-    libros = LibroService.get_libros_disponibles(db)
+    if formato == "ndjson":
+        return stream_ndjson(
+            LibroService.iterar_libros_disponibles,
+            lambda libro: libro_json(libro).decode(),
+            response
+        )
     
-    libros_response = []
-    for libro in libros:
-        libro_dict = {
-            "id": libro.id,
-            "titulo": libro.titulo,
-            "autor": libro.autor,
-            "isbn": libro.isbn,
-            "editorial": libro.editorial,
-            "categoria_id": libro.categoria_id,
-            "disponible": True,
-            "categoria": libro.categoria
-        }
-        libros_response.append(libro_dict)
-    
-    return libros_response
+    pagina = await AsyncLibroService.get_libros_disponibles(db, paginacion.cursor, paginacion.limit)
+    return respuesta_json(libros_json(aplicar_cursor(response, pagina)), response)
 
 @router.post("/buscar", response_model=List[LibroResponse])
 async def buscar_libros(
     busqueda: LibroBusqueda,
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
     db: Session = Depends(get_db)
 ):
     """
     Buscar libros por título, autor o categoría
 
     """
-    libros = LibroService.buscar_libros(db, busqueda)
-    
-    libros_response = []
-    for libro in libros:
-        disponible = LibroService.verificar_disponibilidad(db, libro.id)
-        libro_dict = {
-            "id": libro.id,
-            "titulo": libro.titulo,
-            "autor": libro.autor,
-            "isbn": libro.isbn,
-            "editorial": libro.editorial,
-            "categoria_id": libro.categoria_id,
-            "disponible": disponible,
-            "categoria": libro.categoria
-        }
-        libros_response.append(libro_dict)
-    
-    return libros_response
+    pagina = await AsyncLibroService.buscar_libros(db, busqueda, paginacion.cursor, paginacion.limit)
+    return respuesta_json(libros_json(aplicar_cursor(response, pagina)), response)
 
 @router.get("/categoria/{categoria_id}", response_model=List[LibroResponse])
 async def get_libros_by_categoria(
     categoria_id: int,
-    current_user: Usuario = Depends(get_current_user),
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
+    etag: str = Depends(CACHE_LIBROS),
     db: Session = Depends(get_db)
 ):
     """
     Obtener libros de una categoría específica
     """
-    libros = LibroService.get_libros_by_categoria(db, categoria_id)
-    
-    libros_response = []
-    for libro in libros:
-        disponible = LibroService.verificar_disponibilidad(db, libro.id)
-        libro_dict = {
-            "id": libro.id,
-            "titulo": libro.titulo,
-            "autor": libro.autor,
-            "isbn": libro.isbn,
-            "editorial": libro.editorial,
-            "categoria_id": libro.categoria_id,
-            "disponible": disponible,
-            "categoria": libro.categoria
-        }
-        libros_response.append(libro_dict)
-    
-    return libros_response
+    pagina = await AsyncLibroService.get_libros_by_categoria(db, categoria_id, paginacion.cursor, paginacion.limit)
+    return respuesta_json(libros_json(aplicar_cursor(response, pagina)), response)
 
 @router.get("/{libro_id}", response_model=LibroResponse)
 async def get_libro_by_id(
     libro_id: int,
-    current_user: Usuario = Depends(get_current_user),
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    etag: str = Depends(CACHE_LIBROS),
     db: Session = Depends(get_db)
 ):
     """
     Obtener libro por ID
     """
-    libro = LibroService.get_libro_by_id(db, libro_id)
-    disponible = LibroService.verificar_disponibilidad(db, libro.id)
-    
-    libro_dict = {
-        "id": libro.id,
-        "titulo": libro.titulo,
-        "autor": libro.autor,
-        "isbn": libro.isbn,
-        "editorial": libro.editorial,
-        "categoria_id": libro.categoria_id,
-        "disponible": disponible,
-        "categoria": libro.categoria
-    }
-    
-    return libro_dict
+    libro = await AsyncLibroService.get_libro_response(db, libro_id)
+    return respuesta_json(libro_json(libro), response)
 
 @router.post("/", response_model=LibroResponse, status_code=status.HTTP_201_CREATED)
 async def create_libro(
     libro_data: LibroCreate,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Crear nuevo libro (solo bibliotecarios)
     """
-    libro = LibroService.create_libro(db, libro_data)
-    
-    libro_dict = {
-        "id": libro.id,
-        "titulo": libro.titulo,
-        "autor": libro.autor,
-        "isbn": libro.isbn,
-        "editorial": libro.editorial,
-        "categoria_id": libro.categoria_id,
-        "disponible": True,  # Nuevo libro siempre disponible
-        "categoria": libro.categoria
-    }
+    libro = await AsyncLibroService.create_libro(db, libro_data)
+    return respuesta_json(libro_json(libro), status_code=status.HTTP_201_CREATED)
+
+@router.post(
+    "/bulk",
+    response_model=ReporteImportacion,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": {"type": "array", "items": LibroCreate.model_json_schema()}},
+        "text/csv": {"schema": {"type": "string"}},
+    }}}
+)
+async def importar_libros(
+    request: Request,
+    current_user: Principal = Depends(get_current_bibliotecario),
+    db: Session = Depends(get_db)
+):
+    """
+    Importar libros en lote desde un array JSON o un CSV con encabezado (solo bibliotecarios)
+    """
+    contenido = await request.body()
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        filas = LibroService.leer_csv(contenido)
+    else:
+        try:
+            filas = json.loads(contenido)
+        except ValueError:
+            raise importacion_invalida_exception("JSON mal formado")
+        if not isinstance(filas, list):
+            raise importacion_invalida_exception("se esperaba un array de libros")
     
-    return libro_dict
+    return await AsyncLibroService.importar_libros(db, filas)
 
 @router.put("/{libro_id}", response_model=LibroResponse)
 async def update_libro(
     libro_id: int,
     libro_data: LibroUpdate,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Actualizar libro (solo bibliotecarios)
     """
-    libro = LibroService.update_libro(db, libro_id, libro_data)
-    disponible = LibroService.verificar_disponibilidad(db, libro.id)
-    
-    libro_dict = {
-        "id": libro.id,
-        "titulo": libro.titulo,
-        "autor": libro.autor,
-        "isbn": libro.isbn,
-        "editorial": libro.editorial,
-        "categoria_id": libro.categoria_id,
-        "disponible": disponible,
-        "categoria": libro.categoria
-    }
-    
-    return libro_dict
+    libro = await AsyncLibroService.update_libro(db, libro_id, libro_data)
+    return respuesta_json(libro_json(libro))
 
 @router.delete("/{libro_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_libro(
     libro_id: int,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Eliminar libro (solo bibliotecarios)
     """
-    LibroService.delete_libro(db, libro_id)
+    await AsyncLibroService.delete_libro(db, libro_id)
     return None
 
 @router.get("/{libro_id}/disponibilidad")
 async def verificar_disponibilidad_libro(
     libro_id: int,
-    current_user: Usuario = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
     Verificar disponibilidad de un libro específico
     """
     # Verificar que el libro existe
-    LibroService.get_libro_by_id(db, libro_id)
+    libro = await AsyncLibroService.get_libro_by_id(db, libro_id)
     
-    disponible = LibroService.verificar_disponibilidad(db, libro_id)
+    disponible = libro.disponible
     
     return {
         "libro_id": libro_id,
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from app.instrumentacion.metricas import CONTENT_TYPE_PROMETHEUS, exportar_prometheus
+
+router = APIRouter(tags=["Métricas"])
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """
+    Métricas en formato Prometheus (requests, SQL y caches)
+    """
+    return Response(exportar_prometheus(), media_type=CONTENT_TYPE_PROMETHEUS)
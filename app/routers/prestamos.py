@@ -1,95 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.config.database import get_db
-from app.models.usuario import Usuario
-from app.schemas.prestamo import PrestamoCreate, PrestamoResponse, PrestamoDevolucion, PrestamoHistorial
-from app.services.prestamos_services import PrestamoService
-from app.security.dependencies import get_current_user, get_current_bibliotecario
+from app.schemas.prestamo import (
+    PrestamoCreate, PrestamoResponse, PrestamoDevolucion, PrestamoHistorial,
+    PrestamoBulkCreate, PrestamoBulkDevolucion, ReporteCirculacion
+)
+from app.services.async_services import AsyncPrestamoService
+from app.services.paginacion import PaginacionParams, aplicar_cursor
+from app.security.principal import Principal
+from app.models.usuario import RolEnum
+from app.security.dependencies import get_current_principal, get_current_bibliotecario
 
 router = APIRouter(prefix="/prestamos", tags=["Préstamos"])
 
 @router.post("/", response_model=PrestamoResponse, status_code=status.HTTP_201_CREATED)
 async def create_prestamo(
     prestamo_data: PrestamoCreate,
-    current_user: Usuario = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
     Registrar nuevo préstamo
     """
     #El usuario_id se obtiene del token JWT del usuario actual
-    prestamo = PrestamoService.create_prestamo(db, prestamo_data, current_user.id)
+    prestamo = await AsyncPrestamoService.create_prestamo(db, prestamo_data, current_user.id)
     return prestamo
 
+@router.post("/bulk", response_model=ReporteCirculacion)
+async def create_prestamos_bulk(
+    prestamos_data: PrestamoBulkCreate,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Registrar varios préstamos en una sola operación (mostrador)
+    Los bibliotecarios pueden indicar el usuario que se lleva los libros
+    """
+    usuario_id = current_user.id
+    if prestamos_data.usuario_id is not None and prestamos_data.usuario_id != current_user.id:
+        if current_user.rol != RolEnum.BIBLIOTECARIO:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permisos para registrar préstamos a otro usuario"
+            )
+        usuario_id = prestamos_data.usuario_id
+    
+    return await AsyncPrestamoService.create_prestamos_bulk(db, prestamos_data.libro_ids, usuario_id)
+
 @router.get("/mis-prestamos/activos", response_model=List[PrestamoResponse])
 async def get_mis_prestamos_activos(
-    current_user: Usuario = Depends(get_current_user),
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
     Obtener préstamos activos del usuario actual
     """
     #Consulta requerida: 3. Obtener la lista de préstamos activos de un usuario
-    prestamos = PrestamoService.get_prestamos_activos_usuario(db, current_user.id)
-    return prestamos
+    pagina = await AsyncPrestamoService.get_prestamos_activos_usuario(
+        db, current_user.id, paginacion.cursor, paginacion.limit
+    )
+    return aplicar_cursor(response, pagina)
 
 @router.get("/mis-prestamos/historial", response_model=List[PrestamoResponse])
 async def get_mi_historial_prestamos(
-    current_user: Usuario = Depends(get_current_user),
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
     Obtener historial completo de préstamos del usuario actual
     """
     #Consulta requerida: 4.
-    prestamos = PrestamoService.get_historial_prestamos_usuario(
-        db, current_user.id
+    pagina = await AsyncPrestamoService.get_historial_prestamos_usuario(
+        db, current_user.id, paginacion.cursor, paginacion.limit
     )
-    return prestamos
+    return aplicar_cursor(response, pagina)
 
 @router.get("/usuario/{usuario_id}/activos", response_model=List[PrestamoResponse])
 async def get_prestamos_activos_usuario(
     usuario_id: int,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Obtener préstamos activos de un usuario específico (solo bibliotecarios)
     """
-    prestamos = PrestamoService.get_prestamos_activos_usuario(db, usuario_id)
-    return prestamos
+    pagina = await AsyncPrestamoService.get_prestamos_activos_usuario(
+        db, usuario_id, paginacion.cursor, paginacion.limit
+    )
+    return aplicar_cursor(response, pagina)
 
 @router.get("/usuario/{usuario_id}/historial", response_model=List[PrestamoResponse])
 async def get_historial_prestamos_usuario(
     usuario_id: int,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Obtener historial de préstamos de un usuario específico (solo bibliotecarios)
     """
-    prestamos = PrestamoService.get_historial_prestamos_usuario(
-        db, usuario_id
+    pagina = await AsyncPrestamoService.get_historial_prestamos_usuario(
+        db, usuario_id, paginacion.cursor, paginacion.limit
     )
-    return prestamos
+    return aplicar_cursor(response, pagina)
 
 @router.get("/activos", response_model=List[PrestamoResponse])
 async def get_todos_prestamos_activos(
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Obtener todos los préstamos activos del sistema (solo bibliotecarios)
     """
-    prestamos = PrestamoService.get_todos_prestamos_activos(db)
-    return prestamos
+    pagina = await AsyncPrestamoService.get_todos_prestamos_activos(db, paginacion.cursor, paginacion.limit)
+    return aplicar_cursor(response, pagina)
 
 @router.get("/{prestamo_id}", response_model=PrestamoResponse)
 async def get_prestamo_by_id(
     prestamo_id: int,
-    current_user: Usuario = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
@@ -97,7 +137,7 @@ async def get_prestamo_by_id(
     """
     #Los usuarios solo pueden ver sus propios préstamos
     #Los bibliotecarios pueden ver cualquier préstamo
-    prestamo = PrestamoService.get_prestamo_by_id(db, prestamo_id)
+    prestamo = await AsyncPrestamoService.get_prestamo_by_id(db, prestamo_id)
     
     # Verificar permisos: solo el dueño del préstamo o bibliotecarios
     if (current_user.rol.value != "bibliotecario" and 
@@ -112,7 +152,7 @@ async def get_prestamo_by_id(
 @router.patch("/{prestamo_id}/devolver", response_model=PrestamoResponse)
 async def devolver_libro(
     prestamo_id: int,
-    current_user: Usuario = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
@@ -123,13 +163,13 @@ async def devolver_libro(
     # Si es bibliotecario, puede devolver cualquier libro
     usuario_id = None if current_user.rol.value == "bibliotecario" else current_user.id
     
-    prestamo = PrestamoService.devolver_libro(db, prestamo_id, usuario_id)
+    prestamo = await AsyncPrestamoService.devolver_libro(db, prestamo_id, usuario_id)
     return prestamo
 
 @router.post("/devolver", response_model=PrestamoResponse)
 async def devolver_libro_por_data(
     devolucion_data: PrestamoDevolucion,
-    current_user: Usuario = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
@@ -138,20 +178,32 @@ async def devolver_libro_por_data(
     # Si es bibliotecario, puede devolver cualquier libro
     usuario_id = None if current_user.rol.value == "bibliotecario" else current_user.id
     
-    prestamo = PrestamoService.devolver_libro(db, devolucion_data.prestamo_id, usuario_id)
+    prestamo = await AsyncPrestamoService.devolver_libro(db, devolucion_data.prestamo_id, usuario_id)
     return prestamo
 
+@router.post("/devolver/bulk", response_model=ReporteCirculacion)
+async def devolver_libros_bulk(
+    devolucion_data: PrestamoBulkDevolucion,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Procesar varias devoluciones en una sola operación (mostrador)
+    """
+    # Si es bibliotecario, puede devolver cualquier libro
+    usuario_id = None if current_user.rol.value == "bibliotecario" else current_user.id
+    
+    return await AsyncPrestamoService.devolver_prestamos_bulk(db, devolucion_data.prestamo_ids, usuario_id)
+
 # Endpoint adicional para administración
 @router.delete("/{prestamo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_prestamo(
     prestamo_id: int,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Eliminar préstamo (solo bibliotecarios) - para casos excepcionales
     """
-    prestamo = PrestamoService.get_prestamo_by_id(db, prestamo_id)
-    db.delete(prestamo)
-    db.commit()
+    await AsyncPrestamoService.delete_prestamo(db, prestamo_id)
     return None
\ No newline at end of file
@@ -1,18 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.config.database import get_db
-from app.models.usuario import Usuario
 from app.schemas.usuario import UsuarioResponse, UsuarioUpdate
-from app.services.usuario_services import UsuarioService
-from app.security.dependencies import get_current_user, get_current_bibliotecario
+from app.services.async_services import AsyncUsuarioService
+from app.services.paginacion import PaginacionParams, aplicar_cursor
+from app.security.principal import Principal
+from app.security.principal_cache import UsuarioActual
+from app.security.dependencies import get_current_user, get_current_principal, get_current_bibliotecario
 
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])
 
 @router.get("/me", response_model=UsuarioResponse)
 async def get_current_user_info(
-    current_user: Usuario = Depends(get_current_user)
+    current_user: UsuarioActual = Depends(get_current_user)
 ):
     """
     Obtener información del usuario actual
@@ -22,59 +24,61 @@ async def get_current_user_info(
 @router.put("/me", response_model=UsuarioResponse)
 async def update_current_user(
     user_data: UsuarioUpdate,
-    current_user: Usuario = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """
     Actualizar información del usuario actual
     """
-    updated_user = UsuarioService.update_usuario(db, current_user.id, user_data)
+    updated_user = await AsyncUsuarioService.update_usuario(db, current_user.id, user_data)
     return updated_user
 
 @router.get("/", response_model=List[UsuarioResponse])
 async def get_usuarios(
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    response: Response,
+    paginacion: PaginacionParams = Depends(),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Obtener lista de usuarios (solo bibliotecarios)
     """
-    users = UsuarioService.get_usuarios(db)
-    return users
+    pagina = await AsyncUsuarioService.get_usuarios(db, paginacion.cursor, paginacion.limit)
+    return aplicar_cursor(response, pagina)
 
 @router.get("/{usuario_id}", response_model=UsuarioResponse)
 async def get_usuario_by_id(
     usuario_id: int,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Obtener usuario por ID (solo bibliotecarios)
     """
-    user = UsuarioService.get_usuario_by_id(db, usuario_id)
+    user = await AsyncUsuarioService.get_usuario_by_id(db, usuario_id)
     return user
 
 @router.put("/{usuario_id}", response_model=UsuarioResponse)
 async def update_usuario(
     usuario_id: int,
     user_data: UsuarioUpdate,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Actualizar usuario por ID (solo bibliotecarios)
     """
-    updated_user = UsuarioService.update_usuario(db, usuario_id, user_data)
+    updated_user = await AsyncUsuarioService.update_usuario(db, usuario_id, user_data)
     return updated_user
 
 @router.delete("/{usuario_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_usuario(
     usuario_id: int,
-    current_user: Usuario = Depends(get_current_bibliotecario),
+    current_user: Principal = Depends(get_current_bibliotecario),
     db: Session = Depends(get_db)
 ):
     """
     Eliminar usuario (solo bibliotecarios)
     """
-    UsuarioService.delete_usuario(db, usuario_id)
+    await AsyncUsuarioService.delete_usuario(db, usuario_id)
     return None
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from typing import List, Optional
 from .categoria import CategoriaResponse
 
 
@@ -56,6 +56,21 @@ class LibroResponse(LibroBase):
         orm_mode = True
 
 
+class ResultadoImportacion(BaseModel):
+    fila: int
+    estado: str  # creado, duplicado o error
+    isbn: Optional[str] = None
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ReporteImportacion(BaseModel):
+    creados: int
+    duplicados: int
+    errores: int
+    resultados: List[ResultadoImportacion]
+
+
 class LibroBusqueda(BaseModel):
     query: str
     tipo: Optional[str] = "todos"
\ No newline at end of file
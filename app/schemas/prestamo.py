@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional 
+from typing import List, Optional 
+from app.config.settings import settings
 from .libros import LibroResponse
 from .usuario import UsuarioResponse
 
@@ -33,4 +34,23 @@ class PrestamoHistorial(BaseModel):
     usuario_id: Optional[int] = None
     activos: bool = False
     page: int = 1
-    size: int = 10
\ No newline at end of file
+    size: int = 10
+
+class PrestamoBulkCreate(BaseModel):
+    libro_ids: List[int] = Field(min_length=1, max_length=settings.BULK_CIRCULACION_MAX_ITEMS)
+    #Solo bibliotecarios pueden prestar a otro usuario; por defecto es el del token
+    usuario_id: Optional[int] = None
+
+class PrestamoBulkDevolucion(BaseModel):
+    prestamo_ids: List[int] = Field(min_length=1, max_length=settings.BULK_CIRCULACION_MAX_ITEMS)
+
+class ResultadoCirculacion(BaseModel):
+    libro_id: Optional[int] = None
+    prestamo_id: Optional[int] = None
+    estado: str  # prestado, devuelto o error
+    error: Optional[str] = None
+
+class ReporteCirculacion(BaseModel):
+    exitosos: int
+    fallidos: int
+    resultados: List[ResultadoCirculacion]
@@ -0,0 +1,27 @@
+from typing import Optional
+from app.config.settings import settings
+from app.search.base import MotorBusqueda
+
+_motor: Optional[MotorBusqueda] = None
+
+
+def get_search_engine() -> MotorBusqueda:
+    """
+    Devuelve el motor de búsqueda configurado en SEARCH_BACKEND (auto, mysql o memoria)
+    """
+    global _motor
+    if _motor is None:
+        backend = settings.SEARCH_BACKEND
+        if backend == "auto":
+            from app.config.database import engine
+            backend = "mysql" if engine.dialect.name == "mysql" else "memoria"
+
+        if backend == "mysql":
+            from app.search.mysql import FullTextMySQL
+            _motor = FullTextMySQL()
+        elif backend == "memoria":
+            from app.search.memoria import IndiceInvertidoMemoria
+            _motor = IndiceInvertidoMemoria()
+        else:
+            raise ValueError(f"SEARCH_BACKEND desconocido: {backend}")
+    return _motor
@@ -0,0 +1,81 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.libros import Libro
+from app.models.categoria import Categoria
+from app.services.paginacion import Pagina, codificar_cursor, decodificar_valores
+from app.security.exceptions import cursor_invalido_exception
+
+#Campos en los que se puede buscar según LibroBusqueda.tipo
+CAMPOS_POR_TIPO = {
+    "titulo": ("titulo",),
+    "autor": ("autor",),
+    "categoria": ("categoria",),
+    "todos": ("titulo", "autor", "categoria"),
+}
+
+
+class MotorBusqueda(ABC):
+    """
+    Interfaz común de los motores de búsqueda del catálogo.
+
+    buscar devuelve una Pagina con los ids de libros ordenados por relevancia;
+    los ganchos de indexación los llaman los servicios después de cada escritura.
+
+    Todos los motores devuelven el mismo conjunto de libros para una consulta:
+    los términos salen de terminos_busqueda (sin acentos ni mayúsculas, ignorando los
+    cortos), cada término se busca como prefijo de una palabra y cada uno debe aparecer
+    en alguno de los campos del tipo pedido, no necesariamente todos en el mismo.
+    El orden por relevancia sí depende del motor.
+    """
+
+    @abstractmethod
+    def buscar(
+        self,
+        db: Session,
+        consulta: str,
+        tipo: str,
+        cursor: Optional[str],
+        limit: int
+    ) -> Pagina:
+        """
+        Página de ids de libros que coinciden con la consulta, por relevancia
+        """
+
+    def libro_actualizado(self, libro: Libro) -> None:
+        pass
+
+    def libro_eliminado(self, libro_id: int) -> None:
+        pass
+
+    def categoria_actualizada(self, categoria: Categoria) -> None:
+        pass
+
+    def categoria_eliminada(self, categoria_id: int) -> None:
+        pass
+
+
+def decodificar_cursor_ranking(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    """
+    Los resultados se ordenan por (score desc, id asc); el cursor guarda ese par
+    """
+    if not cursor:
+        return None
+    score, libro_id = decodificar_valores(cursor, 2)
+    if not isinstance(score, (int, float)) or not isinstance(libro_id, int):
+        raise cursor_invalido_exception()
+    return float(score), libro_id
+
+
+def paginar_ranking(resultados: List[Tuple[float, int]], cursor: Optional[str], limit: int) -> Pagina:
+    """
+    Pagina una lista de (score, libro_id) ya ordenada por relevancia
+    """
+    despues = decodificar_cursor_ranking(cursor)
+    if despues is not None:
+        score, libro_id = despues
+        resultados = [r for r in resultados if r[0] < score or (r[0] == score and r[1] > libro_id)]
+
+    pagina = resultados[:limit]
+    next_cursor = codificar_cursor(pagina[-1]) if len(resultados) > limit else None
+    return Pagina([libro_id for _, libro_id in pagina], next_cursor)
@@ -0,0 +1,179 @@
+import math
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy.orm import Session
+from app.models.libros import Libro
+from app.models.categoria import Categoria
+from app.search.base import MotorBusqueda, CAMPOS_POR_TIPO, paginar_ranking
+from app.search.normalizacion import terminos_busqueda, tokenizar
+from app.services.paginacion import Pagina
+
+
+class _Campo:
+    """
+    Índice invertido de un campo: término -> ids, con vocabulario ordenado para prefijos
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+        self.vocabulario: List[str] = []
+
+    def agregar(self, doc_id: int, tokens: Iterable[str]) -> None:
+        for token in tokens:
+            if token not in self.postings:
+                insort(self.vocabulario, token)
+            self.postings[token].add(doc_id)
+
+    def quitar(self, doc_id: int, tokens: Iterable[str]) -> None:
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(doc_id)
+            if not ids:
+                del self.postings[token]
+                self.vocabulario.pop(bisect_left(self.vocabulario, token))
+
+    def coincidencias(self, termino: str) -> Dict[int, float]:
+        """
+        Ids que contienen el término exacto (peso 1) o un término que empieza por él (peso 0.5)
+        """
+        resultado: Dict[int, float] = {}
+        i = bisect_left(self.vocabulario, termino)
+        while i < len(self.vocabulario) and self.vocabulario[i].startswith(termino):
+            token = self.vocabulario[i]
+            peso = 1.0 if token == termino else 0.5
+            for doc_id in self.postings[token]:
+                if resultado.get(doc_id, 0.0) < peso:
+                    resultado[doc_id] = peso
+            i += 1
+        return resultado
+
+
+class IndiceInvertidoMemoria(MotorBusqueda):
+    """
+    Motor de búsqueda en proceso para SQLite y pruebas.
+
+    El índice se construye desde la base de datos en la primera búsqueda y luego
+    se mantiene con los ganchos de escritura de los servicios. Cada proceso tiene
+    su propio índice, por lo que solo es adecuado con un único worker.
+    """
+
+    PESOS = {"titulo": 3.0, "autor": 2.0, "categoria": 1.0}
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cargado = False
+        self._campos = {"titulo": _Campo(), "autor": _Campo(), "categoria": _Campo()}
+        self._tokens_libro: Dict[int, Dict[str, Set[str]]] = {}
+        self._tokens_categoria: Dict[int, Set[str]] = {}
+        self._libros_categoria: Dict[int, Set[int]] = defaultdict(set)
+        self._categoria_libro: Dict[int, int] = {}
+
+    def _cargar(self, db: Session) -> None:
+        for categoria_id, nombre in db.query(Categoria.id, Categoria.nombre):
+            self._indexar_categoria(categoria_id, nombre)
+        for libro_id, titulo, autor, categoria_id in db.query(
+            Libro.id, Libro.titulo, Libro.autor, Libro.categoria_id
+        ).yield_per(1000):
+            self._indexar_libro(libro_id, titulo, autor, categoria_id)
+        self._cargado = True
+
+    def _indexar_libro(self, libro_id: int, titulo: str, autor: str, categoria_id: int) -> None:
+        self._quitar_libro(libro_id)
+        tokens = {"titulo": set(tokenizar(titulo)), "autor": set(tokenizar(autor))}
+        for campo, valores in tokens.items():
+            self._campos[campo].agregar(libro_id, valores)
+        self._tokens_libro[libro_id] = tokens
+        self._categoria_libro[libro_id] = categoria_id
+        self._libros_categoria[categoria_id].add(libro_id)
+
+    def _quitar_libro(self, libro_id: int) -> None:
+        tokens = self._tokens_libro.pop(libro_id, None)
+        if tokens is None:
+            return
+        for campo, valores in tokens.items():
+            self._campos[campo].quitar(libro_id, valores)
+        categoria_id = self._categoria_libro.pop(libro_id)
+        self._libros_categoria[categoria_id].discard(libro_id)
+
+    def _indexar_categoria(self, categoria_id: int, nombre: str) -> None:
+        anteriores = self._tokens_categoria.get(categoria_id, set())
+        self._campos["categoria"].quitar(categoria_id, anteriores)
+        tokens = set(tokenizar(nombre))
+        self._campos["categoria"].agregar(categoria_id, tokens)
+        self._tokens_categoria[categoria_id] = tokens
+
+    def _coincidencias_campo(self, campo: str, termino: str) -> Dict[int, float]:
+        coincidencias = self._campos[campo].coincidencias(termino)
+        if campo != "categoria":
+            return coincidencias
+        # En categoria el índice guarda ids de categoria: se expanden a sus libros
+        libros: Dict[int, float] = {}
+        for categoria_id, peso in coincidencias.items():
+            for libro_id in self._libros_categoria.get(categoria_id, ()):
+                libros[libro_id] = max(libros.get(libro_id, 0.0), peso)
+        return libros
+
+    def buscar(
+        self,
+        db: Session,
+        consulta: str,
+        tipo: str,
+        cursor: Optional[str],
+        limit: int
+    ) -> Pagina:
+        terminos = terminos_busqueda(consulta)
+        campos = CAMPOS_POR_TIPO.get(tipo, CAMPOS_POR_TIPO["todos"])
+
+        with self._lock:
+            if not self._cargado:
+                self._cargar(db)
+
+            total = max(len(self._tokens_libro), 1)
+            scores: Optional[Dict[int, float]] = None
+            for termino in terminos:
+                por_termino: Dict[int, float] = defaultdict(float)
+                for campo in campos:
+                    coincidencias = self._coincidencias_campo(campo, termino)
+                    if not coincidencias:
+                        continue
+                    idf = math.log(1 + total / len(coincidencias))
+                    for libro_id, peso in coincidencias.items():
+                        por_termino[libro_id] += self.PESOS[campo] * idf * peso
+                # Todos los términos deben aparecer en algún campo
+                if scores is None:
+                    scores = dict(por_termino)
+                else:
+                    scores = {i: s + por_termino[i] for i, s in scores.items() if i in por_termino}
+                if not scores:
+                    break
+
+        resultados = sorted(
+            ((round(score, 6), libro_id) for libro_id, score in (scores or {}).items()),
+            key=lambda r: (-r[0], r[1])
+        )
+        return paginar_ranking(resultados, cursor, limit)
+
+    def libro_actualizado(self, libro: Libro) -> None:
+        with self._lock:
+            if self._cargado:
+                self._indexar_libro(libro.id, libro.titulo, libro.autor, libro.categoria_id)
+
+    def libro_eliminado(self, libro_id: int) -> None:
+        with self._lock:
+            if self._cargado:
+                self._quitar_libro(libro_id)
+
+    def categoria_actualizada(self, categoria: Categoria) -> None:
+        with self._lock:
+            if self._cargado:
+                self._indexar_categoria(categoria.id, categoria.nombre)
+
+    def categoria_eliminada(self, categoria_id: int) -> None:
+        with self._lock:
+            if self._cargado:
+                self._campos["categoria"].quitar(categoria_id, self._tokens_categoria.pop(categoria_id, set()))
+                self._libros_categoria.pop(categoria_id, None)
@@ -0,0 +1,88 @@
+from typing import Optional
+from sqlalchemy import select, func, union_all, and_, or_, distinct, literal
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+from app.models.libros import Libro
+from app.models.categoria import Categoria
+from app.search.base import MotorBusqueda, CAMPOS_POR_TIPO, decodificar_cursor_ranking
+from app.search.normalizacion import terminos_busqueda
+from app.services.paginacion import Pagina, codificar_cursor
+
+
+class FullTextMySQL(MotorBusqueda):
+    """
+    Motor de búsqueda sobre los índices FULLTEXT de MySQL (ver modelos Libro y Categoria).
+
+    Cada término se busca por separado como prefijo en modo booleano (+termino*) y un
+    libro califica si coincidió con todos los términos, en cualquiera de los campos.
+    La insensibilidad a acentos la aporta la colación SEARCH_MYSQL_COLLATION de las
+    columnas (migración 7). Las stopwords de InnoDB se ignoran en MySQL pero no en
+    memoria: para resultados idénticos, innodb_ft_enable_stopword=OFF.
+    """
+
+    PESOS = {"titulo": 3.0, "autor": 2.0, "categoria": 1.0}
+
+    def _ramas(self, termino: str, indice: int, campos) -> list:
+        """
+        Una consulta por índice FULLTEXT para el término; un OR entre tablas impediría usarlos
+        """
+        booleana = f"+{termino}*"
+        ramas = []
+        if "titulo" in campos and "autor" in campos:
+            score = match(Libro.titulo, Libro.autor, against=booleana).in_boolean_mode()
+            ramas.append((select(Libro.id.label("id")), score, self.PESOS["titulo"]))
+        elif "titulo" in campos or "autor" in campos:
+            campo = "titulo" if "titulo" in campos else "autor"
+            score = match(getattr(Libro, campo), against=booleana).in_boolean_mode()
+            ramas.append((select(Libro.id.label("id")), score, self.PESOS[campo]))
+        if "categoria" in campos:
+            score = match(Categoria.nombre, against=booleana).in_boolean_mode()
+            ramas.append((
+                select(Libro.id.label("id")).join(Categoria, Categoria.id == Libro.categoria_id),
+                score,
+                self.PESOS["categoria"]
+            ))
+        return [
+            consulta.add_columns(literal(indice).label("termino"), (score * peso).label("score")).where(score > 0)
+            for consulta, score, peso in ramas
+        ]
+
+    def buscar(
+        self,
+        db: Session,
+        consulta: str,
+        tipo: str,
+        cursor: Optional[str],
+        limit: int
+    ) -> Pagina:
+        terminos = terminos_busqueda(consulta)
+        if not terminos:
+            return Pagina([])
+        campos = CAMPOS_POR_TIPO.get(tipo, CAMPOS_POR_TIPO["todos"])
+
+        ramas = [rama for indice, termino in enumerate(terminos) for rama in self._ramas(termino, indice, campos)]
+        coincidencias = union_all(*ramas).subquery() if len(ramas) > 1 else ramas[0].subquery()
+        ranking = select(
+            coincidencias.c.id,
+            func.round(func.sum(coincidencias.c.score), 6).label("score")
+        ).group_by(coincidencias.c.id).having(
+            func.count(distinct(coincidencias.c.termino)) == len(terminos)
+        ).subquery()
+
+        stmt = select(ranking.c.id, ranking.c.score)
+        despues = decodificar_cursor_ranking(cursor)
+        if despues is not None:
+            score_cursor, id_cursor = despues
+            stmt = stmt.where(or_(
+                ranking.c.score < score_cursor,
+                and_(ranking.c.score == score_cursor, ranking.c.id > id_cursor)
+            ))
+        filas = db.execute(
+            stmt.order_by(ranking.c.score.desc(), ranking.c.id.asc()).limit(limit + 1)
+        ).all()
+
+        pagina = filas[:limit]
+        next_cursor = None
+        if len(filas) > limit:
+            next_cursor = codificar_cursor([float(pagina[-1].score), pagina[-1].id])
+        return Pagina([fila.id for fila in pagina], next_cursor)
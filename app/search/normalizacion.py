@@ -0,0 +1,30 @@
+import re
+import unicodedata
+from typing import List
+from app.config.settings import settings
+
+_SEPARADORES = re.compile(r"[^0-9a-z]+")
+
+
+def normalizar(texto: str) -> str:
+    """
+    Pasa el texto a minúsculas y elimina acentos y diacríticos (canción -> cancion)
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_acentos.lower()
+
+
+def tokenizar(texto: str) -> List[str]:
+    """
+    Divide el texto normalizado en términos alfanuméricos
+    """
+    return [t for t in _SEPARADORES.split(normalizar(texto)) if t]
+
+
+def terminos_busqueda(consulta: str) -> List[str]:
+    """
+    Términos de una consulta, igual para todos los motores: normalizados, sin repetir
+    y sin los más cortos que SEARCH_MIN_TERM_LENGTH (MySQL no los indexa)
+    """
+    return list(dict.fromkeys(t for t in tokenizar(consulta) if len(t) >= settings.SEARCH_MIN_TERM_LENGTH))
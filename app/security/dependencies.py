@@ -1,42 +1,75 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.config.database import get_db
+from app.config.database import get_db, run_db
+from app.config.settings import settings
+from app.config.replicas import usuario_actual
 from app.models.usuario import Usuario, RolEnum
-from app.security.security import verify_token
+from app.security.security import decode_token
+from app.security.principal import Principal, version_cacheada, cargar_version
+from app.security.principal_cache import UsuarioActual, obtener_usuario_cacheado, cachear_usuario
 from typing import Optional
 
 security = HTTPBearer()
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> Usuario:
-    """
-    Se obtiene el usuaru actual desde el Token JWT
-    """
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="no se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    token = credentials.credentials
-    email = verify_token(token)
-    if email is None:
-        raise credentials_exception
-    
+def _get_usuario_por_email(db: Session, email: str) -> Optional[UsuarioActual]:
     user = db.query(Usuario).filter(Usuario.email == email).first()
+    return UsuarioActual.from_usuario(user) if user else None
+
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Se obtiene la identidad del request solo desde los claims del Token JWT.
+    La base de datos solo se consulta si la versión del token no está en cache.
+    """
+    claims = decode_token(credentials.credentials)
+    principal = Principal.from_claims(claims) if claims else None
+    if principal is None:
+        raise _credentials_exception()
+    
+    if settings.TOKEN_VERSION_CHECK:
+        vigente = version_cacheada(principal.id)
+        if vigente is None:
+            vigente = await run_db(db, cargar_version, principal.id)
+        if principal.token_version != vigente:
+            raise _credentials_exception()
+    
+    usuario_actual.set(principal.id)
+    return principal
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+) -> UsuarioActual:
+    """
+    Se obtiene el usuaru actual desde el Token JWT (primero desde la cache de usuarios).
+    Solo para handlers que necesitan datos que no viajan en el token, como el nombre.
+    """
+    user = obtener_usuario_cacheado(principal.email)
+    if user is not None:
+        return user
+    
+    user = await run_db(db, _get_usuario_por_email, principal.email)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
+    cachear_usuario(user)
     return user
 
 async def get_current_bibliotecario(
-    current_user: Usuario = Depends(get_current_user)
-) -> Usuario:
+    current_user: Principal = Depends(get_current_principal)
+) -> Principal:
     """
-    se verifica que el usuario actual sea un bibliotecario
+    se verifica que el usuario actual sea un bibliotecario (con el rol del token)
     """
     if current_user.rol != RolEnum.BIBLIOTECARIO:
         raise HTTPException(
@@ -91,4 +91,25 @@ def invalid_credentials_exception():
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Email o contraseña incorrectos",
         headers={"WWW-Authenticate": "Bearer"},
-    )
\ No newline at end of file
+    )
+
+
+def cursor_invalido_exception():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Cursor de paginación inválido"
+    )
+
+def importacion_invalida_exception(detalle: str):
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Archivo de importación inválido: {detalle}"
+    )
+
+
+def demasiados_intentos_exception(reintentar_en: int):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Demasiados intentos de inicio de sesión, intente más tarde",
+        headers={"Retry-After": str(reintentar_en)}
+    )
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+#Límites del costo calibrado: por debajo de 10 bcrypt deja de ser razonable
+RONDAS_MIN = 10
+RONDAS_MAX = 16
+RONDAS_POR_DEFECTO = 12
+
+_contexto: Optional[CryptContext] = None
+_rondas: Optional[int] = None
+_executor: Optional[Executor] = None
+_lock = threading.RLock()
+
+
+def crear_contexto(rondas: int) -> CryptContext:
+    """
+    El primer esquema de PASSWORD_SCHEMES se usa para hashes nuevos; los demás solo se
+    verifican. needs_update marca los de esquemas viejos y los de bcrypt con menos rondas.
+    """
+    opciones = {}
+    if "bcrypt" in settings.PASSWORD_SCHEMES:
+        opciones = {"bcrypt__default_rounds": rondas, "bcrypt__min_rounds": rondas}
+    return CryptContext(schemes=settings.PASSWORD_SCHEMES, deprecated="auto", **opciones)
+
+
+def calibrar_rondas(objetivo_ms: float) -> int:
+    """
+    Mayor costo de bcrypt cuyo hash entra en objetivo_ms en esta máquina
+    (cada ronda extra duplica el tiempo)
+    """
+    contexto = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=RONDAS_MIN)
+    muestras = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        contexto.hash("calibracion")
+        muestras.append((time.perf_counter() - inicio) * 1000)
+    rondas = RONDAS_MIN + math.floor(math.log2(objetivo_ms / min(muestras)))
+    return max(RONDAS_MIN, min(RONDAS_MAX, rondas))
+
+
+def _rondas_configuradas() -> int:
+    if settings.BCRYPT_ROUNDS:
+        return settings.BCRYPT_ROUNDS
+    if settings.BCRYPT_TARGET_MS:
+        rondas = calibrar_rondas(settings.BCRYPT_TARGET_MS)
+        logger.info("bcrypt calibrado a %s rondas para %.0f ms", rondas, settings.BCRYPT_TARGET_MS)
+        return rondas
+    return RONDAS_POR_DEFECTO
+
+
+def contexto() -> CryptContext:
+    global _contexto, _rondas
+    if _contexto is None:
+        with _lock:
+            if _contexto is None:
+                _rondas = _rondas_configuradas()
+                _contexto = crear_contexto(_rondas)
+    return _contexto
+
+
+def _iniciar_proceso(rondas: int) -> None:
+    global _contexto
+    _contexto = crear_contexto(rondas)
+
+
+def hashear(password: str) -> str:
+    return contexto().hash(password)
+
+
+def verificar_y_actualizar(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica la contraseña y, si el hash quedó viejo (esquema o costo), devuelve uno nuevo
+    """
+    return contexto().verify_and_update(password, hashed_password)
+
+
+def get_executor() -> Executor:
+    """
+    Pool propio para bcrypt, separado del de la base para que una ola de logins no
+    deje sin hilos a las consultas. bcrypt libera el GIL, así que los hilos alcanzan;
+    con procesos el costo se calcula una vez y se pasa a cada proceso.
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                workers = settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+                if settings.PASSWORD_HASH_EXECUTOR == "procesos":
+                    contexto()
+                    _executor = ProcessPoolExecutor(workers, initializer=_iniciar_proceso, initargs=(_rondas,))
+                else:
+                    _executor = ThreadPoolExecutor(workers, thread_name_prefix="hash")
+    return _executor
+
+
+async def hashear_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), hashear, password)
+
+
+async def verificar_async(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), verificar_y_actualizar, password, hashed_password)
+
+
+def iniciar() -> None:
+    """
+    Calibra el costo y crea el pool al arrancar, para no hacerlo en el primer login
+    """
+    contexto()
+    get_executor()
+
+
+def cerrar() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
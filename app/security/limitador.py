@@ -0,0 +1,198 @@
+import math
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Optional
+from app.cache.lru import TTLLRUCache
+from app.config.settings import settings
+from app.instrumentacion.metricas import Contador
+from app.security.exceptions import demasiados_intentos_exception
+
+login_rechazados = Contador("biblioteca_login_rejected_total", "Intentos de login rechazados por el limitador", ("motivo",))
+
+
+class BackendLimitador(ABC):
+    """
+    Almacén de ventanas deslizantes: eventos por clave dentro de la ventana y bloqueo vigente
+    """
+    @abstractmethod
+    async def registrar(self, clave: str, ahora: float, ventana: float) -> int:
+        """
+        Agrega un evento y devuelve cuántos hay dentro de la ventana
+        """
+
+    @abstractmethod
+    async def bloqueado_hasta(self, clave: str) -> float:
+        """
+        Fin del bloqueo de la clave (0 si no tiene)
+        """
+
+    @abstractmethod
+    async def bloquear(self, clave: str, hasta: float, ahora: float) -> None:
+        """
+        Bloquea la clave hasta el instante indicado
+        """
+
+    @abstractmethod
+    async def limpiar(self, clave: str) -> None:
+        """
+        Olvida los eventos y el bloqueo de la clave
+        """
+
+
+class _Ventana:
+    __slots__ = ("eventos", "bloqueado_hasta")
+
+    def __init__(self):
+        self.eventos = deque()
+        self.bloqueado_hasta = 0.0
+
+
+class MemoriaLimitador(BackendLimitador):
+    """
+    Por proceso. Las claves viven en una LRU acotada para que un barrido de IPs o
+    emails inventados no haga crecer la memoria sin límite.
+    """
+    def __init__(self, maxsize: int, ventana: float):
+        self._ventanas = TTLLRUCache(maxsize, ventana)
+
+    def _ventana(self, clave: str) -> _Ventana:
+        ventana = self._ventanas.get(clave)
+        if ventana is None:
+            ventana = _Ventana()
+            self._ventanas.set(clave, ventana)
+        return ventana
+
+    async def registrar(self, clave: str, ahora: float, ventana: float) -> int:
+        datos = self._ventana(clave)
+        datos.eventos.append(ahora)
+        while datos.eventos and datos.eventos[0] <= ahora - ventana:
+            datos.eventos.popleft()
+        self._ventanas.set(clave, datos, max(ventana, datos.bloqueado_hasta - ahora))
+        return len(datos.eventos)
+
+    async def bloqueado_hasta(self, clave: str) -> float:
+        datos = self._ventanas.get(clave)
+        return datos.bloqueado_hasta if datos else 0.0
+
+    async def bloquear(self, clave: str, hasta: float, ahora: float) -> None:
+        datos = self._ventana(clave)
+        datos.bloqueado_hasta = hasta
+        self._ventanas.set(clave, datos, max(settings.LOGIN_WINDOW_SECONDS, hasta - ahora))
+
+    async def limpiar(self, clave: str) -> None:
+        self._ventanas.delete(clave)
+
+
+class RedisLimitador(BackendLimitador):
+    """
+    Compartido entre workers: un sorted set por clave (score = instante del intento)
+    y una clave aparte con el fin del bloqueo
+    """
+    def __init__(self, cliente, prefijo: str = "biblioteca:login:"):
+        self.cliente = cliente
+        self.prefijo = prefijo
+
+    @classmethod
+    def desde_url(cls, url: str) -> "RedisLimitador":
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("LOGIN_LIMITER_BACKEND=redis requiere el paquete redis")
+        return cls(redis_asyncio.Redis.from_url(url))
+
+    async def registrar(self, clave: str, ahora: float, ventana: float) -> int:
+        clave = self.prefijo + clave
+        pipe = self.cliente.pipeline()
+        pipe.zremrangebyscore(clave, 0, ahora - ventana)
+        pipe.zadd(clave, {f"{ahora}:{uuid.uuid4().hex[:8]}": ahora})
+        pipe.zcard(clave)
+        pipe.pexpire(clave, int(ventana * 1000))
+        resultados = await pipe.execute()
+        return int(resultados[2])
+
+    async def bloqueado_hasta(self, clave: str) -> float:
+        valor = await self.cliente.get(f"{self.prefijo}{clave}:bloqueo")
+        return float(valor) if valor is not None else 0.0
+
+    async def bloquear(self, clave: str, hasta: float, ahora: float) -> None:
+        await self.cliente.set(f"{self.prefijo}{clave}:bloqueo", repr(hasta), px=max(1, int((hasta - ahora) * 1000)))
+
+    async def limpiar(self, clave: str) -> None:
+        await self.cliente.delete(self.prefijo + clave, f"{self.prefijo}{clave}:bloqueo")
+
+
+class LimitadorLogin:
+    """
+    Control de admisión del login. Por IP cuenta todos los intentos; por email, los que
+    no terminaron en un login correcto (que los limpia). El intento por email se reserva
+    al admitirlo, antes de verificar la contraseña: una ráfaga simultánea contra la misma
+    cuenta no pasa de LOGIN_MAX_FAILURES_EMAIL aunque ninguno haya fallado todavía.
+    Al llegar al límite la clave queda bloqueada un tiempo que se duplica con cada intento
+    de más dentro de la ventana. Los intentos rechazados no cuentan, para que un ataque
+    no extienda el bloqueo de la cuenta de otra persona indefinidamente.
+    """
+    def __init__(self, backend: BackendLimitador):
+        self.backend = backend
+
+    @staticmethod
+    def _espera(exceso: int) -> float:
+        return min(settings.LOGIN_BACKOFF_MAX_SECONDS, settings.LOGIN_BACKOFF_BASE_SECONDS * 2 ** exceso)
+
+    @staticmethod
+    def _rechazar(motivo: str, hasta: float, ahora: float):
+        login_rechazados.inc(motivo)
+        return demasiados_intentos_exception(max(1, math.ceil(hasta - ahora)))
+
+    async def admitir(self, ip: Optional[str], email: str) -> None:
+        """
+        Se llama antes de consultar la base o verificar la contraseña; lanza 429 si no se admite.
+        Si se admite, el intento ya cuenta para el email hasta que registrar_exito lo limpie.
+        """
+        ahora = time.time()
+        claves = {"email": f"email:{email.strip().lower()}"}
+        if ip:
+            claves["ip"] = f"ip:{ip}"
+        for motivo, clave in claves.items():
+            hasta = await self.backend.bloqueado_hasta(clave)
+            if hasta > ahora:
+                raise self._rechazar(motivo, hasta, ahora)
+
+        if ip:
+            intentos = await self.backend.registrar(claves["ip"], ahora, settings.LOGIN_WINDOW_SECONDS)
+            if intentos > settings.LOGIN_MAX_ATTEMPTS_IP:
+                hasta = ahora + self._espera(intentos - settings.LOGIN_MAX_ATTEMPTS_IP - 1)
+                await self.backend.bloquear(claves["ip"], hasta, ahora)
+                raise self._rechazar("ip", hasta, ahora)
+
+        # Registrar y bloquear van juntos, sin esperar a bcrypt: los intentos simultáneos
+        # que lleguen después del que alcanza el límite ya encuentran el bloqueo
+        intentos = await self.backend.registrar(claves["email"], ahora, settings.LOGIN_WINDOW_SECONDS)
+        if intentos >= settings.LOGIN_MAX_FAILURES_EMAIL:
+            hasta = ahora + self._espera(intentos - settings.LOGIN_MAX_FAILURES_EMAIL)
+            await self.backend.bloquear(claves["email"], hasta, ahora)
+
+    async def registrar_exito(self, email: str) -> None:
+        await self.backend.limpiar(f"email:{email.strip().lower()}")
+
+
+_limitador: Optional[LimitadorLogin] = None
+
+
+def get_limitador_login() -> Optional[LimitadorLogin]:
+    """
+    Limitador configurado en LOGIN_LIMITER_BACKEND (None si LOGIN_LIMITER_ENABLED es False)
+    """
+    global _limitador
+    if not settings.LOGIN_LIMITER_ENABLED:
+        return None
+    if _limitador is None:
+        if settings.LOGIN_LIMITER_BACKEND == "redis":
+            backend = RedisLimitador.desde_url(settings.LOGIN_LIMITER_REDIS_URL)
+        elif settings.LOGIN_LIMITER_BACKEND == "memoria":
+            backend = MemoriaLimitador(settings.LOGIN_LIMITER_SIZE, settings.LOGIN_WINDOW_SECONDS)
+        else:
+            raise ValueError(f"LOGIN_LIMITER_BACKEND desconocido: {settings.LOGIN_LIMITER_BACKEND}")
+        _limitador = LimitadorLogin(backend)
+    return _limitador
@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.cache.lru import TTLLRUCache
+from app.config.settings import settings
+from app.models.usuario import Usuario, RolEnum
+
+#Versión registrada para usuarios eliminados: ningún token la cumple
+VERSION_REVOCADA = -1
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Identidad del request construida solo a partir de los claims verificados del JWT
+    """
+    id: int
+    email: str
+    rol: RolEnum
+    token_version: int
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> Optional["Principal"]:
+        try:
+            return cls(
+                id=int(claims["uid"]),
+                email=str(claims["sub"]),
+                rol=RolEnum(claims["role"]),
+                token_version=int(claims["ver"]),
+            )
+        except (KeyError, TypeError, ValueError):
+            # Tokens emitidos antes de incluir uid/ver: se exige volver a iniciar sesión
+            return None
+
+
+#Versión vigente de token por id de usuario
+token_versions = TTLLRUCache(settings.TOKEN_VERSION_CACHE_SIZE, settings.TOKEN_VERSION_TTL_SECONDS)
+
+
+def version_cacheada(usuario_id: int) -> Optional[int]:
+    return token_versions.get(usuario_id)
+
+
+def cargar_version(db: Session, usuario_id: int) -> int:
+    """
+    Lee la versión vigente desde la base de datos y la deja en cache
+    """
+    version = db.query(Usuario.token_version).filter(Usuario.id == usuario_id).scalar()
+    version = VERSION_REVOCADA if version is None else version
+    token_versions.set(usuario_id, version)
+    return version
+
+
+def revocar_tokens(usuario_id: int, version_vigente: int = VERSION_REVOCADA) -> None:
+    """
+    Registra la nueva versión tras un cambio de rol/email o una baja. En los demás
+    workers el cambio se aplica cuando caduca su entrada (TOKEN_VERSION_TTL_SECONDS).
+    """
+    token_versions.set(usuario_id, version_vigente)
@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+from typing import Optional
+from app.cache.lru import TTLLRUCache
+from app.config.settings import settings
+from app.models.usuario import Usuario, RolEnum
+
+
+@dataclass(frozen=True)
+class UsuarioActual:
+    """
+    Datos del usuario autenticado que necesitan los handlers (sin sesión ORM asociada)
+    """
+    id: int
+    nombre: str
+    email: str
+    rol: RolEnum
+
+    @classmethod
+    def from_usuario(cls, usuario: Usuario) -> "UsuarioActual":
+        return cls(id=usuario.id, nombre=usuario.nombre, email=usuario.email, rol=usuario.rol)
+
+
+#Cache de usuarios autenticados indexada por el subject del token (email)
+principal_cache = TTLLRUCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def obtener_usuario_cacheado(email: str) -> Optional[UsuarioActual]:
+    if not settings.AUTH_CACHE_ENABLED:
+        return None
+    return principal_cache.get(email)
+
+
+def cachear_usuario(usuario: UsuarioActual) -> None:
+    if settings.AUTH_CACHE_ENABLED:
+        principal_cache.set(usuario.email, usuario)
+
+
+def invalidar_usuario(*emails: str) -> None:
+    """
+    Se llama al modificar o eliminar un usuario. Solo afecta a este proceso;
+    en los demás workers la entrada caduca por TTL.
+    """
+    for email in emails:
+        principal_cache.delete(email)
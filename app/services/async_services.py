@@ -0,0 +1,79 @@
+from typing import Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config.database import run_db
+from app.config.replicas import en_replica
+from app.models.usuario import Usuario
+from app.schemas.usuario import UsuarioCreate, UsuarioLogin
+from app.security.hashing import hashear_async, verificar_async
+from app.security.exceptions import invalid_credentials_exception
+from app.services.libro_service import LibroService
+from app.services.prestamos_services import PrestamoService
+from app.services.categoria_services import CategoriaService
+from app.services.usuario_services import UsuarioService
+from app.services.auth_service import AuthService
+
+DbSession = Union[Session, AsyncSession]
+
+
+def _metodo_async(metodo):
+    # Los métodos @solo_lectura pueden leer de una réplica cuando se llaman desde un router
+    ejecutar = en_replica(metodo) if getattr(metodo, "solo_lectura", False) else metodo
+
+    async def llamada(db: DbSession, *args, **kwargs):
+        return await run_db(db, ejecutar, *args, **kwargs)
+    llamada.__name__ = metodo.__name__
+    llamada.__doc__ = metodo.__doc__
+    return staticmethod(llamada)
+
+
+def servicio_async(servicio: type) -> type:
+    """
+    Crea la versión async de un servicio: cada método estático que recibe la sesión
+    pasa a ser una corutina que funciona tanto con Session como con AsyncSession
+    """
+    metodos = {
+        nombre: _metodo_async(atributo.__func__)
+        for nombre, atributo in vars(servicio).items()
+        if isinstance(atributo, staticmethod) and not nombre.startswith("_")
+    }
+    return type(f"Async{servicio.__name__}", (), metodos)
+
+
+AsyncLibroService = servicio_async(LibroService)
+AsyncPrestamoService = servicio_async(PrestamoService)
+AsyncCategoriaService = servicio_async(CategoriaService)
+AsyncUsuarioService = servicio_async(UsuarioService)
+
+
+class AsyncAuthService:
+    """
+    bcrypt no puede correr dentro de run_sync (bloquearía el event loop), por eso
+    el hash y la verificación van al pool de hashing y solo la persistencia usa la sesión
+    """
+
+    @staticmethod
+    async def register_user(db: DbSession, user_data: UsuarioCreate) -> Usuario:
+        """
+        Registra un nuevo usuario en la base de datos.
+        """
+        hashed_password = await hashear_async(user_data.password.get_secret_value())
+        return await run_db(db, AuthService.guardar_usuario, user_data, hashed_password)
+
+    @staticmethod
+    async def authenticate_user(db: DbSession, login_data: UsuarioLogin) -> Usuario:
+        """
+        Autentica al usuario si las credenciales son válidas.
+        """
+        user = await run_db(db, UsuarioService.get_usuario_by_email, login_data.email)
+        plain_password = login_data.password.get_secret_value()
+        if not user:
+            raise invalid_credentials_exception()
+        valido, nuevo_hash = await verificar_async(plain_password, user.password)
+        if not valido:
+            raise invalid_credentials_exception()
+        if nuevo_hash:
+            await run_db(db, AuthService.actualizar_hash, user.id, nuevo_hash)
+        return user
+
+    create_user_token = staticmethod(AuthService.create_user_token)
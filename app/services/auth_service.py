@@ -1,22 +1,26 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import update
 from sqlalchemy.exc import IntegrityError
 from app.models.usuario import Usuario
-from app.schemas.usuario import UsuarioCreate, UsuarioLogin
-from app.security.security import verify_password,get_password_hash,create_access_token
-from app.security.exceptions import invalid_credentials_exception, duplicate_email_exception
+from app.schemas.usuario import UsuarioCreate
+from app.security.security import create_access_token
+from app.security.exceptions import duplicate_email_exception
 from datetime import timedelta
 from app.config.settings import settings
+from app.config.database import reintentable
+from app.services.estadisticas_service import EstadisticasService, TOTAL_USUARIOS
 
 
 class AuthService:
     
     @staticmethod
-    def register_user(db: Session, user_data: UsuarioCreate) -> Usuario:
+    @reintentable
+    def guardar_usuario(db: Session, user_data: UsuarioCreate, hashed_password: str) -> Usuario:
         """
-        Registra un nuevo usuario en la base de datos.
+        Persiste un usuario nuevo con la contraseña ya hasheada (el hash lo calcula
+        AsyncAuthService en el pool de hashing).
         """
         try:
-            hashed_password = get_password_hash(user_data.password.get_secret_value())
             new_user = Usuario(
                 nombre=user_data.nombre,
                 email=user_data.email,
@@ -24,23 +28,22 @@ class AuthService:
                 rol=user_data.rol
             )
             db.add(new_user)
+            EstadisticasService.incrementar(db, TOTAL_USUARIOS)
             db.commit()
             db.refresh(new_user)
             return new_user
         except IntegrityError:
             db.rollback()
-            raise duplicate_email_exception
+            raise duplicate_email_exception()
         
     @staticmethod
-    def authenticate_user(db: Session, login_data: UsuarioLogin) -> str:
+    def actualizar_hash(db: Session, usuario_id: int, hashed_password: str) -> None:
         """
-        Autentica al usuario y devuelve un token JWT si las credenciales son válidas.
+        Guarda el hash recalculado al iniciar sesión (cambio de esquema o de costo).
+        No toca token_version: las sesiones abiertas siguen siendo válidas.
         """
-        user = db.query(Usuario).filter(Usuario.email == login_data.email).first()
-        plain_password = login_data.password.get_secret_value()
-        if not user or not verify_password(plain_password, user.password):
-            raise invalid_credentials_exception
-        return user
+        db.execute(update(Usuario).where(Usuario.id == usuario_id).values(password=hashed_password))
+        db.commit()
     
     @staticmethod
     def create_user_token(user: Usuario) -> dict:
@@ -49,7 +52,13 @@ class AuthService:
         """
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user.email, "role": user.rol.value}, expires_delta=access_token_expires
+            data={
+                "sub": user.email,
+                "uid": user.id,
+                "role": user.rol.value,
+                "ver": user.token_version or 0,
+            },
+            expires_delta=access_token_expires
         )
         return {
             "access_token": access_token,
@@ -1,16 +1,24 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 from app.models.categoria import Categoria
 from app.models.libros import Libro
 from app.schemas.categoria import CategoriaCreate, CategoriaUpdate
 from app.security.exceptions import categoria_not_found_exception, DuplicateResourceException
+from app.services.paginacion import Pagina, paginar
+from app.services.estadisticas_service import EstadisticasService, VERSION_LIBROS, VERSION_CATEGORIAS
+from app.search import get_search_engine
+from app.cache.servicios import cacheado
+from app.config.replicas import solo_lectura
+from app.config.settings import settings
+from app.config.database import reintentable
 
 
 class CategoriaService:
     
     @staticmethod
+    @solo_lectura
     def get_categoria_by_id(db: Session, categoria_id: int) -> Categoria:
         """
         Obtener categoría por ID
@@ -21,33 +29,53 @@ class CategoriaService:
         return categoria
     
     @staticmethod
-    def get_categorias(db: Session, skip: int = 0, limit: int = 100) -> List[Categoria]:
+    @solo_lectura
+    @cacheado(VERSION_CATEGORIAS)
+    def get_categorias(db: Session, cursor: Optional[str] = None, limit: int = settings.PAGE_SIZE_DEFAULT) -> Pagina:
         """
-        Obtener lista de categorías
+        Obtener lista de categorías paginada por cursor
         """
-        return db.query(Categoria).offset(skip).limit(limit).all()
+        pagina = paginar(db.query(Categoria), [Categoria.id], cursor, limit)
+        return Pagina(
+            [
+                {"id": categoria.id, "nombre": categoria.nombre, "descripcion": categoria.descripcion}
+                for categoria in pagina.items
+            ],
+            pagina.next_cursor
+        )
     
     @staticmethod
-    def get_categorias_with_count(db: Session) -> List[dict]:
+    @solo_lectura
+    @cacheado(VERSION_CATEGORIAS)
+    def get_categorias_with_count(
+        db: Session,
+        cursor: Optional[str] = None,
+        limit: int = settings.PAGE_SIZE_DEFAULT
+    ) -> Pagina:
         """
         Obtener categorías con conteo de libros
         """
-        result = db.query(
+        query = db.query(
             Categoria,
             func.count(Libro.id).label('libros_count')
-        ).outerjoin(Libro).group_by(Categoria.id).all()
+        ).outerjoin(Libro).group_by(Categoria.id)
+        pagina = paginar(query, [Categoria.id], cursor, limit, extraer=lambda fila: [fila[0].id])
         
-        return [
-            {
-                "id": categoria.id,
-                "nombre": categoria.nombre,
-                "descripcion": categoria.descripcion,
-                "libros_count": count
-            }
-            for categoria, count in result
-        ]
+        return Pagina(
+            [
+                {
+                    "id": categoria.id,
+                    "nombre": categoria.nombre,
+                    "descripcion": categoria.descripcion,
+                    "libros_count": count
+                }
+                for categoria, count in pagina.items
+            ],
+            pagina.next_cursor
+        )
     
     @staticmethod
+    @reintentable
     def create_categoria(db: Session, categoria_data: CategoriaCreate) -> Categoria:
         """
         Crear nueva categoría
@@ -62,11 +90,14 @@ class CategoriaService:
             descripcion=categoria_data.descripcion
         )
         db.add(db_categoria)
+        EstadisticasService.marcar_modificado(db, VERSION_LIBROS, VERSION_CATEGORIAS)
         db.commit()
         db.refresh(db_categoria)
+        get_search_engine().categoria_actualizada(db_categoria)
         return db_categoria
     
     @staticmethod
+    @reintentable
     def update_categoria(db: Session, categoria_id: int, categoria_data: CategoriaUpdate) -> Categoria:
         """
         Actualizar categoría existente
@@ -87,11 +118,14 @@ class CategoriaService:
         for field, value in update_data.items():
             setattr(categoria, field, value)
         
+        EstadisticasService.marcar_modificado(db, VERSION_LIBROS, VERSION_CATEGORIAS)
         db.commit()
         db.refresh(categoria)
+        get_search_engine().categoria_actualizada(categoria)
         return categoria
     
     @staticmethod
+    @reintentable
     def delete_categoria(db: Session, categoria_id: int) -> bool:
         """
         Eliminar categoría (solo si no tiene libros asociados)
@@ -103,6 +137,9 @@ class CategoriaService:
         if libros_count > 0:
             raise DuplicateResourceException("No se puede eliminar la categoría porque tiene libros asociados")
         
+        EstadisticasService.eliminar_categoria(db, categoria_id)
+        EstadisticasService.marcar_modificado(db, VERSION_LIBROS, VERSION_CATEGORIAS)
         db.delete(categoria)
         db.commit()
+        get_search_engine().categoria_eliminada(categoria_id)
         return True
\ No newline at end of file
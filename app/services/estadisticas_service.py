@@ -0,0 +1,239 @@
+import asyncio
+import logging
+from typing import Dict, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import event, func, update
+from sqlalchemy.dialects import mysql, sqlite
+from app.cache.etag import invalidar_versiones
+from app.config.database import SessionLocal
+from app.config.executor import run_blocking
+from app.models.estadisticas import Estadistica, EstadisticaCategoria
+from app.models.prestamo import Prestamo
+from app.models.libros import Libro
+from app.models.usuario import Usuario
+from app.models.categoria import Categoria
+
+logger = logging.getLogger(__name__)
+
+TOTAL_LIBROS = "total_libros"
+PRESTAMOS_ACTIVOS = "prestamos_activos"
+TOTAL_USUARIOS = "total_usuarios"
+CONTADORES = (TOTAL_LIBROS, PRESTAMOS_ACTIVOS, TOTAL_USUARIOS)
+
+#Versiones de recursos para los ETag: libros incluye disponibilidad y nombre de categoría,
+#categorias incluye la cantidad de libros de cada una
+VERSION_LIBROS = "version_libros"
+VERSION_CATEGORIAS = "version_categorias"
+
+
+def _upsert(db: Session, modelo, claves: dict, valores: dict, si_existe: dict) -> None:
+    """
+    INSERT que, si la fila ya existe (otro writer la creó al mismo tiempo), aplica si_existe.
+    MySQL usa ON DUPLICATE KEY UPDATE; SQLite, ON CONFLICT DO UPDATE.
+    """
+    if db.get_bind().dialect.name == "mysql":
+        sentencia = mysql.insert(modelo).values(**claves, **valores).on_duplicate_key_update(**si_existe)
+    else:
+        sentencia = sqlite.insert(modelo).values(**claves, **valores).on_conflict_do_update(
+            index_elements=list(claves), set_=si_existe
+        )
+    db.execute(sentencia)
+
+
+class EstadisticasService:
+    """
+    Estadísticas del dashboard materializadas. Los servicios de escritura las ajustan
+    dentro de su misma transacción (antes del commit) y reconciliar las recalcula
+    desde las tablas base para corregir cualquier desvío.
+    """
+
+    @staticmethod
+    def incrementar(db: Session, clave: str, delta: int = 1) -> None:
+        """
+        Suma delta a un contador con un UPDATE atómico (upsert si la fila todavía no existe)
+        """
+        actualizadas = db.execute(
+            update(Estadistica)
+            .where(Estadistica.clave == clave)
+            .values(valor=Estadistica.valor + delta)
+        ).rowcount
+        if not actualizadas:
+            _upsert(db, Estadistica, {"clave": clave}, {"valor": max(delta, 0)}, {"valor": Estadistica.valor + delta})
+
+    @staticmethod
+    def marcar_modificado(db: Session, *claves: str) -> None:
+        """
+        Incrementa las versiones de los recursos modificados en la transacción en curso;
+        la cache local de versiones se invalida cuando la transacción se confirma
+        """
+        for clave in claves:
+            EstadisticasService.incrementar(db, clave)
+        db.info.setdefault("versiones_modificadas", set()).update(claves)
+
+    @staticmethod
+    def incrementar_categoria(db: Session, categoria_id: int, delta: int = 1) -> None:
+        """
+        Suma delta a los préstamos de una categoría
+        """
+        if not delta:
+            return
+        actualizadas = db.execute(
+            update(EstadisticaCategoria)
+            .where(EstadisticaCategoria.categoria_id == categoria_id)
+            .values(prestamos=EstadisticaCategoria.prestamos + delta)
+        ).rowcount
+        if not actualizadas:
+            _upsert(
+                db, EstadisticaCategoria, {"categoria_id": categoria_id}, {"prestamos": max(delta, 0)},
+                {"prestamos": EstadisticaCategoria.prestamos + delta}
+            )
+
+    @staticmethod
+    def eliminar_categoria(db: Session, categoria_id: int) -> None:
+        """
+        Elimina el contador de una categoría que se va a borrar
+        """
+        db.query(EstadisticaCategoria).filter(
+            EstadisticaCategoria.categoria_id == categoria_id
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def get_estadisticas(db: Session) -> dict:
+        """
+        Leer las estadísticas materializadas (dos consultas por clave primaria/índice).
+        Solo lee: puede correr en una réplica o en una sesión de solo lectura.
+        """
+        contadores = dict(db.query(Estadistica.clave, Estadistica.valor).filter(
+            Estadistica.clave.in_(CONTADORES)
+        ).all())
+        if len(contadores) < len(CONTADORES):
+            # Todavía no se sembraron (ver sembrar): se calculan sin guardarlas
+            contadores, por_categoria = EstadisticasService._calcular(db)
+            return EstadisticasService._formatear(
+                contadores, EstadisticasService._categoria_popular(db, por_categoria)
+            )
+
+        categoria_popular = db.query(
+            Categoria.nombre,
+            EstadisticaCategoria.prestamos
+        ).join(
+            Categoria, Categoria.id == EstadisticaCategoria.categoria_id
+        ).filter(
+            EstadisticaCategoria.prestamos > 0
+        ).order_by(
+            EstadisticaCategoria.prestamos.desc(),
+            EstadisticaCategoria.categoria_id
+        ).first()
+
+        return EstadisticasService._formatear(contadores, categoria_popular)
+
+    @staticmethod
+    def _calcular(db: Session) -> Tuple[Dict[str, int], Dict[int, int]]:
+        """
+        Contadores globales y préstamos por categoría calculados desde las tablas base
+        """
+        contadores = {
+            TOTAL_LIBROS: db.query(Libro).count(),
+            PRESTAMOS_ACTIVOS: db.query(Prestamo).filter(Prestamo.fecha_devolucion.is_(None)).count(),
+            TOTAL_USUARIOS: db.query(Usuario).count(),
+        }
+        por_categoria = dict(db.query(
+            Libro.categoria_id,
+            func.count(Prestamo.id)
+        ).join(
+            Prestamo, Libro.id == Prestamo.libro_id
+        ).group_by(Libro.categoria_id).all())
+        return contadores, por_categoria
+
+    @staticmethod
+    def _categoria_popular(db: Session, por_categoria: Dict[int, int]):
+        if not por_categoria:
+            return None
+        categoria_id, prestamos = min(por_categoria.items(), key=lambda item: (-item[1], item[0]))
+        nombre = db.query(Categoria.nombre).filter(Categoria.id == categoria_id).scalar()
+        return nombre, prestamos
+
+    @staticmethod
+    def reconciliar(db: Session) -> dict:
+        """
+        Recalcular las estadísticas desde las tablas base y sobrescribir las materializadas.
+        Primero bloquea las filas de contadores (SELECT ... FOR UPDATE): un préstamo que
+        confirme antes queda en el recuento, y uno que confirme después espera al bloqueo
+        y suma sobre el valor ya corregido.
+        """
+        db.query(Estadistica.clave).filter(Estadistica.clave.in_(CONTADORES)).with_for_update().all()
+        existentes = db.query(EstadisticaCategoria.categoria_id).order_by(
+            EstadisticaCategoria.categoria_id
+        ).with_for_update().all()
+        contadores, por_categoria = EstadisticasService._calcular(db)
+
+        for clave, valor in contadores.items():
+            _upsert(db, Estadistica, {"clave": clave}, {"valor": valor}, {"valor": valor})
+        # Las filas se actualizan en su lugar, en orden de id como el resto de las escrituras
+        categorias = {categoria_id: 0 for categoria_id, in existentes}
+        categorias.update(por_categoria)
+        for categoria_id, prestamos in sorted(categorias.items()):
+            _upsert(
+                db, EstadisticaCategoria, {"categoria_id": categoria_id}, {"prestamos": prestamos},
+                {"prestamos": prestamos}
+            )
+        db.commit()
+
+        return EstadisticasService._formatear(contadores, EstadisticasService._categoria_popular(db, por_categoria))
+
+    @staticmethod
+    def sembrar(db: Session) -> bool:
+        """
+        Materializa las estadísticas si faltan (base nueva o recién migrada), para que
+        las lecturas no tengan que escribir. Se llama al arrancar; devuelve si sembró.
+        """
+        existentes = db.query(Estadistica.clave).filter(Estadistica.clave.in_(CONTADORES)).count()
+        if existentes == len(CONTADORES):
+            return False
+        # Si otro worker siembra al mismo tiempo, los upserts de reconciliar no chocan
+        EstadisticasService.reconciliar(db)
+        return True
+
+    @staticmethod
+    def _formatear(contadores: dict, categoria_popular) -> dict:
+        return {
+            "total_libros": contadores[TOTAL_LIBROS],
+            "prestamos_activos": contadores[PRESTAMOS_ACTIVOS],
+            "total_usuarios": contadores[TOTAL_USUARIOS],
+            "categoria_mas_popular": {
+                "nombre": categoria_popular[0] if categoria_popular else "N/A",
+                "prestamos": categoria_popular[1] if categoria_popular else 0
+            }
+        }
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar_versiones(session: Session) -> None:
+    claves = session.info.pop("versiones_modificadas", None)
+    if claves:
+        invalidar_versiones(claves)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_versiones(session: Session) -> None:
+    session.info.pop("versiones_modificadas", None)
+
+
+def _reconciliar_con_sesion_propia() -> None:
+    db = SessionLocal()
+    try:
+        EstadisticasService.reconciliar(db)
+    finally:
+        db.close()
+
+
+async def reconciliar_periodicamente(intervalo: float) -> None:
+    """
+    Tarea de fondo: reconcilia al arrancar y luego cada `intervalo` segundos
+    """
+    while True:
+        try:
+            await run_blocking(_reconciliar_con_sesion_propia)
+        except Exception:
+            logger.exception("Error reconciliando estadísticas")
+        await asyncio.sleep(intervalo)
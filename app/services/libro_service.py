@@ -1,78 +1,142 @@
-from sqlalchemy.orm import Session
+import csv
+import io
+from pydantic import ValidationError
+from sqlalchemy.orm import Session, Query, joinedload
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import or_, and_
-from typing import List, Optional
+from sqlalchemy import Boolean, insert, select, type_coerce, update
+from typing import Any, Iterator, List, Optional, Dict
 from app.models.libros import Libro
 from app.models.categoria import Categoria
 from app.models.prestamo import Prestamo
 from app.schemas.libros import LibroCreate, LibroUpdate, LibroBusqueda
+from app.services.paginacion import Pagina, paginar, recorrer
+from app.services.serializacion import LibroJSON, libro_a_dict
+from app.services.estadisticas_service import EstadisticasService, TOTAL_LIBROS, VERSION_LIBROS, VERSION_CATEGORIAS
+from app.search import get_search_engine
+from app.cache.servicios import cacheado
+from app.config.replicas import solo_lectura
+from app.config.settings import settings
+from app.config.database import reintentable
 from app.security.exceptions import (
     libro_not_found_exception, 
     categoria_not_found_exception,
-    duplicate_isbn_exception
+    duplicate_isbn_exception,
+    importacion_invalida_exception
 )
 
 
+def _isbn_duplicado(exc: IntegrityError) -> bool:
+    # MySQL: "Duplicate entry ... for key 'libros.isbn'"; SQLite: "UNIQUE constraint failed: libros.isbn"
+    return "isbn" in str(exc.orig).lower()
+
+
 class LibroService:
     
+    #Perfil de carga para LibroResponse (libro + categoria en la misma consulta)
+    PERFIL_LIBRO_RESPONSE = (joinedload(Libro.categoria),)
+    
     @staticmethod
     def get_libro_by_id(db: Session, libro_id: int) -> Libro:
         """
         Obtener libro por ID
         """
-        libro = db.query(Libro).filter(Libro.id == libro_id).first()
+        libro = db.query(Libro).options(*LibroService.PERFIL_LIBRO_RESPONSE).filter(Libro.id == libro_id).first()
         if not libro:
             raise libro_not_found_exception()
         return libro
     
     @staticmethod
-    def get_libros(db: Session, skip: int = 0, limit: int = 100) -> List[Libro]:
+    @solo_lectura
+    @cacheado(VERSION_LIBROS)
+    def get_libro_response(db: Session, libro_id: int) -> LibroJSON:
         """
-        Obtener lista de libros
+        Libro por ID como datos planos (formato de LibroResponse), cacheable entre requests
         """
-        return db.query(Libro).offset(skip).limit(limit).all()
+        return libro_a_dict(LibroService.get_libro_by_id(db, libro_id))
     
     @staticmethod
-    def get_libros_disponibles(db: Session) -> List[Libro]:
+    @solo_lectura
+    def get_libros(db: Session, cursor: Optional[str] = None, limit: int = settings.PAGE_SIZE_DEFAULT) -> Pagina:
         """
-        Obtener libros disponibles (sin préstamos activos)
+        Obtener lista de libros paginada por cursor
         """
-        # Subquery para obtener libros con préstamos activos
-        prestamos_activos = db.query(Prestamo.libro_id).filter(
-            Prestamo.fecha_devolucion.is_(None)
-        ).subquery()
-        
-        # Query principal excluyendo libros con préstamos activos
-        return db.query(Libro).filter(
-            ~Libro.id.in_(prestamos_activos)
-            )
+        query = db.query(Libro).options(*LibroService.PERFIL_LIBRO_RESPONSE)
+        return paginar(query, [Libro.id], cursor, limit)
+    
+    @staticmethod
+    def _query_libros_disponibles(db: Session):
+        # Filtro sobre ix_libros_disponibles; la categoría llega en el mismo JOIN
+        return db.query(Libro).options(*LibroService.PERFIL_LIBRO_RESPONSE).filter(
+            Libro.prestamo_activo_id.is_(None)
+        )
     
     @staticmethod
-    def buscar_libros(db: Session, busqueda: LibroBusqueda) -> List[Libro]:
+    @solo_lectura
+    def get_libros_disponibles(
+        db: Session,
+        cursor: Optional[str] = None,
+        limit: int = settings.PAGE_SIZE_DEFAULT
+    ) -> Pagina:
+        """
+        Obtener libros disponibles (sin préstamos activos) paginados por cursor
         """
-        Buscar libros por título, autor o categoría
+        return paginar(LibroService._query_libros_disponibles(db), [Libro.id], cursor, limit)
+    
+    @staticmethod
+    def iterar_libros_disponibles(db: Session) -> Iterator[Libro]:
         """
-        query = db.query(Libro).join(Categoria)
+        Recorrer todos los libros disponibles en lotes de STREAM_BATCH_SIZE
+        """
+        return recorrer(LibroService._query_libros_disponibles(db), [Libro.id], settings.STREAM_BATCH_SIZE)
+    
+    @staticmethod
+    def exportar_libros(db: Session) -> Query:
+        """
+        Consulta plana del catálogo para exportación (se recorre con yield_per)
+        """
+        return db.query(
+            Libro.id,
+            Libro.titulo,
+            Libro.autor,
+            Libro.isbn,
+            Libro.editorial,
+            Libro.categoria_id,
+            Categoria.nombre.label("categoria"),
+            type_coerce(Libro.prestamo_activo_id.is_(None), Boolean).label("disponible")
+        ).join(Categoria, Libro.categoria_id == Categoria.id).order_by(Libro.id)
+    
+    @staticmethod
+    @solo_lectura
+    def buscar_libros(
+        db: Session,
+        busqueda: LibroBusqueda,
+        cursor: Optional[str] = None,
+        limit: int = settings.PAGE_SIZE_DEFAULT
+    ) -> Pagina:
+        """
+        Buscar libros por título, autor o categoría, ordenados por relevancia
+        """
+        pagina = get_search_engine().buscar(db, busqueda.query, busqueda.tipo, cursor, limit)
+        if not pagina.items:
+            return pagina
         
-        if busqueda.tipo == "titulo":
-            query = query.filter(Libro.titulo.contains(busqueda.query))
-        elif busqueda.tipo == "autor":
-            query = query.filter(Libro.autor.contains(busqueda.query))
-        elif busqueda.tipo == "categoria":
-            query = query.filter(Categoria.nombre.contains(busqueda.query))
-        else:  # busqueda.tipo == "todos"
-            query = query.filter(
-                or_(
-                    Libro.titulo.contains(busqueda.query),
-                    Libro.autor.contains(busqueda.query),
-                    Categoria.nombre.contains(busqueda.query)
-                )
+        libros = {
+            libro.id: libro
+            for libro in db.query(Libro).options(*LibroService.PERFIL_LIBRO_RESPONSE).filter(
+                Libro.id.in_(pagina.items)
             )
-        
-        return query.all()
+        }
+        # Se respeta el orden de relevancia devuelto por el motor
+        return Pagina([libros[i] for i in pagina.items if i in libros], pagina.next_cursor)
     
     @staticmethod
-    def get_libros_by_categoria(db: Session, categoria_id: int) -> List[Libro]:
+    @solo_lectura
+    def get_libros_by_categoria(
+        db: Session,
+        categoria_id: int,
+        cursor: Optional[str] = None,
+        limit: int = settings.PAGE_SIZE_DEFAULT
+    ) -> Pagina:
         """
         Obtener libros por categoría
         """
@@ -81,9 +145,11 @@ class LibroService:
         if not categoria:
             raise categoria_not_found_exception()
         
-        return db.query(Libro).filter(Libro.categoria_id == categoria_id).all()
+        query = db.query(Libro).options(*LibroService.PERFIL_LIBRO_RESPONSE).filter(Libro.categoria_id == categoria_id)
+        return paginar(query, [Libro.id], cursor, limit)
     
     @staticmethod
+    @reintentable
     def create_libro(db: Session, libro_data: LibroCreate) -> Libro:
         """
         Crear nuevo libro
@@ -102,14 +168,138 @@ class LibroService:
                 categoria_id=libro_data.categoria_id
             )
             db.add(db_libro)
+            EstadisticasService.incrementar(db, TOTAL_LIBROS)
+            EstadisticasService.marcar_modificado(db, VERSION_LIBROS, VERSION_CATEGORIAS)
+            db.commit()
+            get_search_engine().libro_actualizado(db_libro)
+            return LibroService.get_libro_by_id(db, db_libro.id)
+        except IntegrityError as exc:
+            db.rollback()
+            if _isbn_duplicado(exc):
+                raise duplicate_isbn_exception()
+            raise
+    
+    @staticmethod
+    def leer_csv(contenido: bytes) -> List[Dict[str, Any]]:
+        """
+        Convertir un CSV con encabezado (titulo,autor,isbn,editorial,categoria_id) en filas
+        """
+        try:
+            texto = contenido.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise importacion_invalida_exception("el CSV debe estar en UTF-8")
+        lector = csv.DictReader(io.StringIO(texto))
+        if not lector.fieldnames:
+            raise importacion_invalida_exception("el CSV no tiene encabezado")
+        return [dict(fila) for fila in lector]
+    
+    @staticmethod
+    def importar_libros(db: Session, filas: List[Any]) -> dict:
+        """
+        Importar libros en lote. Valida cada fila con LibroCreate, resuelve las categorías
+        y los ISBN existentes con una consulta IN por lote e inserta con executemany en
+        transacciones de BULK_CHUNK_SIZE filas. Devuelve un resultado por fila.
+        """
+        if len(filas) > settings.BULK_MAX_ROWS:
+            raise importacion_invalida_exception(f"máximo {settings.BULK_MAX_ROWS} filas por pedido")
+        
+        resultados: List[Optional[dict]] = [None] * len(filas)
+        validos: Dict[str, tuple] = {}
+        for i, fila in enumerate(filas):
+            try:
+                libro = LibroCreate.model_validate(fila)
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                resultados[i] = {"fila": i, "estado": "error", "error": error}
+                continue
+            if libro.editorial is None:
+                resultados[i] = {"fila": i, "estado": "error", "isbn": libro.isbn, "error": "editorial: Field required"}
+                continue
+            if libro.isbn in validos:
+                resultados[i] = {"fila": i, "estado": "duplicado", "isbn": libro.isbn, "error": "ISBN repetido en el archivo"}
+                continue
+            validos[libro.isbn] = (i, libro)
+        
+        tamano = settings.BULK_CHUNK_SIZE
+        pendientes = list(validos.values())
+        for inicio in range(0, len(pendientes), tamano):
+            LibroService._importar_lote(db, pendientes[inicio:inicio + tamano], resultados)
+        
+        conteo = {"creado": 0, "duplicado": 0, "error": 0}
+        for resultado in resultados:
+            conteo[resultado["estado"]] += 1
+        return {
+            "creados": conteo["creado"],
+            "duplicados": conteo["duplicado"],
+            "errores": conteo["error"],
+            "resultados": resultados,
+        }
+    
+    @staticmethod
+    @reintentable
+    def _importar_lote(db: Session, lote: List[tuple], resultados: List[Optional[dict]]) -> None:
+        """
+        Inserta un lote de (fila, LibroCreate) ya validados en una sola transacción
+        """
+        categorias = {
+            categoria_id for (categoria_id,) in db.query(Categoria.id).filter(
+                Categoria.id.in_({libro.categoria_id for _, libro in lote})
+            )
+        }
+        existentes = {
+            isbn for (isbn,) in db.query(Libro.isbn).filter(Libro.isbn.in_([libro.isbn for _, libro in lote]))
+        }
+        
+        insertar = []
+        for i, libro in lote:
+            if libro.isbn in existentes:
+                resultados[i] = {"fila": i, "estado": "duplicado", "isbn": libro.isbn, "error": "Ya existe un libro con este ISBN"}
+            elif libro.categoria_id not in categorias:
+                resultados[i] = {"fila": i, "estado": "error", "isbn": libro.isbn, "error": "Categoría no encontrada"}
+            else:
+                insertar.append((i, libro))
+        if not insertar:
+            return
+        
+        try:
+            db.execute(insert(Libro), [libro.model_dump() for _, libro in insertar])
+            EstadisticasService.incrementar(db, TOTAL_LIBROS, len(insertar))
+            EstadisticasService.marcar_modificado(db, VERSION_LIBROS, VERSION_CATEGORIAS)
             db.commit()
-            db.refresh(db_libro)
-            return db_libro
         except IntegrityError:
+            # Otro proceso insertó alguno de estos ISBN entre la consulta y el INSERT:
+            # se repite el lote fila por fila para aislar los conflictos
             db.rollback()
-            raise duplicate_isbn_exception()
+            insertar = LibroService._importar_por_fila(db, insertar, resultados)
+        
+        motor = get_search_engine()
+        creados = db.query(Libro.id, Libro.titulo, Libro.autor, Libro.categoria_id, Libro.isbn).filter(
+            Libro.isbn.in_([libro.isbn for _, libro in insertar])
+        )
+        ids = {}
+        for creado in creados:
+            ids[creado.isbn] = creado.id
+            motor.libro_actualizado(creado)
+        for i, libro in insertar:
+            resultados[i] = {"fila": i, "estado": "creado", "isbn": libro.isbn, "id": ids.get(libro.isbn)}
+    
+    @staticmethod
+    def _importar_por_fila(db: Session, insertar: List[tuple], resultados: List[Optional[dict]]) -> List[tuple]:
+        creados = []
+        for i, libro in insertar:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(Libro), [libro.model_dump()])
+                creados.append((i, libro))
+            except IntegrityError:
+                resultados[i] = {"fila": i, "estado": "duplicado", "isbn": libro.isbn, "error": "Ya existe un libro con este ISBN"}
+        EstadisticasService.incrementar(db, TOTAL_LIBROS, len(creados))
+        EstadisticasService.marcar_modificado(db, VERSION_LIBROS, VERSION_CATEGORIAS)
+        db.commit()
+        return creados
     
     @staticmethod
+    @reintentable
     def update_libro(db: Session, libro_id: int, libro_data: LibroUpdate) -> Libro:
         """
         Actualizar libro existente
@@ -124,18 +314,30 @@ class LibroService:
             if not categoria:
                 raise categoria_not_found_exception()
         
+        categoria_anterior = libro.categoria_id
         for field, value in update_data.items():
             setattr(libro, field, value)
         
         try:
+            # Los préstamos del libro pasan a contar para la nueva categoría
+            if libro.categoria_id != categoria_anterior:
+                prestamos = db.query(Prestamo).filter(Prestamo.libro_id == libro_id).count()
+                # En orden de id, como el resto de las escrituras de estadisticas_categoria
+                deltas = {categoria_anterior: -prestamos, libro.categoria_id: prestamos}
+                for categoria_id, delta in sorted(deltas.items()):
+                    EstadisticasService.incrementar_categoria(db, categoria_id, delta)
+            EstadisticasService.marcar_modificado(db, VERSION_LIBROS, VERSION_CATEGORIAS)
             db.commit()
-            db.refresh(libro)
-            return libro
-        except IntegrityError:
+            get_search_engine().libro_actualizado(libro)
+            return LibroService.get_libro_by_id(db, libro_id)
+        except IntegrityError as exc:
             db.rollback()
-            raise duplicate_isbn_exception()
+            if _isbn_duplicado(exc):
+                raise duplicate_isbn_exception()
+            raise
     
     @staticmethod
+    @reintentable
     def delete_libro(db: Session, libro_id: int) -> bool:
         """
         Eliminar libro (solo si no tiene préstamos activos)
@@ -143,30 +345,37 @@ class LibroService:
         libro = LibroService.get_libro_by_id(db, libro_id)
         
         # Verificar si tiene préstamos activos
-        prestamo_activo = db.query(Prestamo).filter(
-            and_(
-                Prestamo.libro_id == libro_id,
-                Prestamo.fecha_devolucion.is_(None)
-            )
-        ).first()
-        
-        if prestamo_activo:
+        if not libro.disponible:
             raise Exception("No se puede eliminar el libro porque tiene un préstamo activo")
         
+        prestamos = db.query(Prestamo).filter(Prestamo.libro_id == libro_id).count()
+        EstadisticasService.incrementar(db, TOTAL_LIBROS, -1)
+        EstadisticasService.incrementar_categoria(db, libro.categoria_id, -prestamos)
+        EstadisticasService.marcar_modificado(db, VERSION_LIBROS, VERSION_CATEGORIAS)
         db.delete(libro)
         db.commit()
+        get_search_engine().libro_eliminado(libro_id)
         return True
     
     @staticmethod
-    def verificar_disponibilidad(db: Session, libro_id: int) -> bool:
+    @reintentable
+    def reparar_disponibilidad(db: Session) -> int:
         """
-        Verificar si un libro está disponible para préstamo
+        Recalcular libros.prestamo_activo_id desde prestamos y corregir los desvíos.
+        Devuelve la cantidad de libros corregidos.
         """
-        prestamo_activo = db.query(Prestamo).filter(
-            and_(
-                Prestamo.libro_id == libro_id,
-                Prestamo.fecha_devolucion.is_(None)
-            )
-        ).first()
+        prestamo_activo = select(Prestamo.id).where(
+            Prestamo.libro_id == Libro.id,
+            Prestamo.fecha_devolucion.is_(None)
+        ).scalar_subquery()
         
-        return prestamo_activo is None
\ No newline at end of file
+        corregidos = db.execute(
+            update(Libro)
+            .where(Libro.prestamo_activo_id.is_distinct_from(prestamo_activo))
+            .values(prestamo_activo_id=prestamo_activo)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if corregidos:
+            EstadisticasService.marcar_modificado(db, VERSION_LIBROS)
+        db.commit()
+        return corregidos
\ No newline at end of file
@@ -0,0 +1,141 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Sequence
+from fastapi import Query, Response
+from sqlalchemy import and_, or_, DateTime, Integer
+from sqlalchemy.orm import Query as OrmQuery
+from app.config.settings import settings
+from app.security.exceptions import cursor_invalido_exception
+
+#Header en el que se devuelve el cursor de la siguiente página
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Pagina(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str] = None
+
+
+class PaginacionParams:
+    """
+    Parámetros de paginación por cursor comunes a todos los listados
+    """
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Cursor devuelto en X-Next-Cursor por la página anterior"),
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    """
+    Codifica los valores de la clave de orden en un cursor opaco
+    """
+    serializables = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    raw = json.dumps(serializables, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decodificar_valores(cursor: str, cantidad: int) -> list:
+    """
+    Decodifica un cursor opaco validando que tenga la cantidad de valores esperada
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(raw)
+    except (ValueError, TypeError):
+        raise cursor_invalido_exception()
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        raise cursor_invalido_exception()
+    return valores
+
+
+def decodificar_cursor(cursor: str, columnas: Sequence) -> list:
+    """
+    Decodifica un cursor opaco validando que corresponda a las columnas de orden
+    """
+    valores = decodificar_valores(cursor, len(columnas))
+    try:
+        valores = [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) else v
+            for col, v in zip(columnas, valores)
+        ]
+    except (ValueError, TypeError):
+        raise cursor_invalido_exception()
+    # Un valor de otro tipo que la columna no falla en la consulta: devolvería otra página
+    for col, v in zip(columnas, valores):
+        if isinstance(col.type, Integer) and (not isinstance(v, int) or isinstance(v, bool)):
+            raise cursor_invalido_exception()
+    return valores
+
+
+def _condicion_keyset(columnas: Sequence, valores: Sequence, descendente: bool):
+    """
+    (c1, c2, ...) > (v1, v2, ...) expandido para que el motor pueda usar el índice
+    """
+    columna, valor = columnas[0], valores[0]
+    siguiente = columna < valor if descendente else columna > valor
+    if len(columnas) == 1:
+        return siguiente
+    return or_(
+        siguiente,
+        and_(columna == valor, _condicion_keyset(columnas[1:], valores[1:], descendente))
+    )
+
+
+def paginar(
+    query: OrmQuery,
+    columnas: Sequence,
+    cursor: Optional[str],
+    limit: int,
+    descendente: bool = False,
+    extraer: Optional[Callable[[Any], Sequence[Any]]] = None,
+) -> Pagina:
+    """
+    Pagina una consulta por keyset sobre las columnas indicadas (la última debe ser única)
+    """
+    limit = min(limit, settings.PAGE_SIZE_MAX)
+    if cursor:
+        valores = decodificar_cursor(cursor, columnas)
+        query = query.filter(_condicion_keyset(columnas, valores, descendente))
+
+    orden = [c.desc() if descendente else c.asc() for c in columnas]
+    filas = query.order_by(*orden).limit(limit + 1).all()
+    items = filas[:limit]
+
+    next_cursor = None
+    if len(filas) > limit:
+        ultimo = items[-1]
+        valores = extraer(ultimo) if extraer else [getattr(ultimo, c.key) for c in columnas]
+        next_cursor = codificar_cursor(valores)
+    return Pagina(items, next_cursor)
+
+
+def recorrer(
+    query: OrmQuery,
+    columnas: Sequence,
+    lote: int,
+    descendente: bool = False,
+) -> Iterator[Any]:
+    """
+    Recorre la consulta completa en páginas keyset de `lote` filas, con memoria acotada
+    """
+    cursor = None
+    while True:
+        pagina = paginar(query, columnas, cursor, lote, descendente)
+        yield from pagina.items
+        if pagina.next_cursor is None:
+            return
+        cursor = pagina.next_cursor
+
+
+def aplicar_cursor(response: Response, pagina: Pagina) -> List[Any]:
+    """
+    Publica el cursor de la siguiente página en la respuesta y devuelve los items
+    """
+    if pagina.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = pagina.next_cursor
+    return pagina.items
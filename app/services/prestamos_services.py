@@ -1,65 +1,127 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from typing import List
+from sqlalchemy.orm import Session, Query, joinedload
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from collections import Counter
+from typing import List, Optional
 from datetime import datetime
 from app.models.prestamo import Prestamo
 from app.models.libros import Libro
 from app.models.usuario import Usuario
-from app.models.categoria import Categoria
 from app.schemas.prestamo import PrestamoCreate
+from app.services.paginacion import Pagina, paginar
+from app.services.estadisticas_service import EstadisticasService, PRESTAMOS_ACTIVOS, VERSION_LIBROS
+from app.config.settings import settings
+from app.config.replicas import solo_lectura
+from app.config.database import reintentable
 from app.security.exceptions import prestamo_not_found_exception,libro_not_found_exception,libro_no_disponible_exception,usuario_not_found_exception
 
 
 class PrestamoService:
     
+    #Perfil de carga para PrestamoResponse (libro, libro.categoria y usuario en la misma consulta)
+    PERFIL_PRESTAMO_RESPONSE = (
+        joinedload(Prestamo.libro).joinedload(Libro.categoria),
+        joinedload(Prestamo.usuario),
+    )
+    
     @staticmethod
     def get_prestamo_by_id(db: Session, prestamo_id: int) -> Prestamo:
         """
         Obtener préstamo por ID
         """
-        prestamo = db.query(Prestamo).filter(Prestamo.id == prestamo_id).first()
+        prestamo = db.query(Prestamo).options(*PrestamoService.PERFIL_PRESTAMO_RESPONSE).filter(Prestamo.id == prestamo_id).first()
         if not prestamo:
             raise prestamo_not_found_exception()
         return prestamo
     
     @staticmethod
-    def get_prestamos_activos_usuario(db: Session, usuario_id: int) -> List[Prestamo]:
+    def get_prestamos_activos_usuario(
+        db: Session,
+        usuario_id: int,
+        cursor: Optional[str] = None,
+        limit: int = settings.PAGE_SIZE_DEFAULT
+    ) -> Pagina:
         """
         Obtener préstamos activos de un usuario
         """
-        return db.query(Prestamo).filter(
+        query = db.query(Prestamo).options(*PrestamoService.PERFIL_PRESTAMO_RESPONSE).filter(
             and_(
                 Prestamo.usuario_id == usuario_id,
                 Prestamo.fecha_devolucion.is_(None)
             )
-        ).all()
+        )
+        return paginar(query, [Prestamo.id], cursor, limit)
     
     @staticmethod
-    def get_historial_prestamos_usuario(db: Session, usuario_id: int) -> List[Prestamo]:
+    def get_historial_prestamos_usuario(
+        db: Session,
+        usuario_id: int,
+        cursor: Optional[str] = None,
+        limit: int = settings.PAGE_SIZE_DEFAULT
+    ) -> Pagina:
         """
-        Obtener historial completo de préstamos de un usuario
+        Obtener historial completo de préstamos de un usuario (más recientes primero)
         """
-        return db.query(Prestamo).filter(
+        query = db.query(Prestamo).options(*PrestamoService.PERFIL_PRESTAMO_RESPONSE).filter(
             Prestamo.usuario_id == usuario_id
-        ).order_by(Prestamo.fecha_prestamo.desc()).all()
+        )
+        return paginar(query, [Prestamo.fecha_prestamo, Prestamo.id], cursor, limit, descendente=True)
     
     @staticmethod
-    def get_todos_prestamos_activos(db: Session) -> List[Prestamo]:
+    def get_todos_prestamos_activos(
+        db: Session,
+        cursor: Optional[str] = None,
+        limit: int = settings.PAGE_SIZE_DEFAULT
+    ) -> Pagina:
         """
         Obtener todos los préstamos activos del sistema
         """
-        return db.query(Prestamo).filter(
+        query = db.query(Prestamo).options(*PrestamoService.PERFIL_PRESTAMO_RESPONSE).filter(
             Prestamo.fecha_devolucion.is_(None)
-        ).all()
+        )
+        return paginar(query, [Prestamo.id], cursor, limit)
     
     @staticmethod
+    def exportar_prestamos(db: Session, solo_activos: bool = False) -> Query:
+        """
+        Consulta plana del historial de préstamos para exportación
+        """
+        query = db.query(
+            Prestamo.id,
+            Prestamo.libro_id,
+            Libro.titulo.label("libro_titulo"),
+            Prestamo.usuario_id,
+            Usuario.email.label("usuario_email"),
+            Prestamo.fecha_prestamo,
+            Prestamo.fecha_devolucion
+        ).join(
+            Libro, Prestamo.libro_id == Libro.id
+        ).join(
+            Usuario, Prestamo.usuario_id == Usuario.id
+        )
+        if solo_activos:
+            query = query.filter(Prestamo.fecha_devolucion.is_(None))
+        return query.order_by(Prestamo.id)
+    
+    @staticmethod
+    @reintentable
     def create_prestamo(db: Session, prestamo_data: PrestamoCreate, usuario_id: int) -> Prestamo:
         """
-        Crear nuevo préstamo
+        Crear nuevo préstamo. Bloquea la fila del libro (SELECT ... FOR UPDATE) e inserta
+        el préstamo; el índice único sobre libro_activo_id rechaza un segundo préstamo
+        activo del mismo libro. Reintenta ante deadlocks o esperas de bloqueo agotadas.
         """
-        # Verificar que el libro existe
-        libro = db.query(Libro).filter(Libro.id == prestamo_data.libro_id).first()
+        # Verificar que el libro existe y bloquearlo hasta el commit
+        libro = db.query(Libro).filter(Libro.id == prestamo_data.libro_id).populate_existing().with_for_update(
+            skip_locked=settings.LOAN_LOCK_SKIP_LOCKED
+        ).first()
+        if libro and not libro.disponible:
+            raise libro_no_disponible_exception()
         if not libro:
+            # Con SKIP LOCKED un libro que otro préstamo tiene bloqueado no se devuelve
+            if settings.LOAN_LOCK_SKIP_LOCKED and db.query(Libro.id).filter(Libro.id == prestamo_data.libro_id).first():
+                db.rollback()
+                raise libro_no_disponible_exception()
             raise libro_not_found_exception()
         
         # Verificar que el usuario existe
@@ -67,17 +129,6 @@ class PrestamoService:
         if not usuario:
             raise usuario_not_found_exception()
         
-        # Verificar disponibilidad del libro
-        prestamo_activo = db.query(Prestamo).filter(
-            and_(
-                Prestamo.libro_id == prestamo_data.libro_id,
-                Prestamo.fecha_devolucion.is_(None)
-            )
-        ).first()
-        
-        if prestamo_activo:
-            raise libro_no_disponible_exception()
-        
         # Crear el préstamo
         db_prestamo = Prestamo(
             libro_id=prestamo_data.libro_id,
@@ -85,12 +136,23 @@ class PrestamoService:
             fecha_prestamo=datetime.utcnow()
         )
         
-        db.add(db_prestamo)
+        try:
+            db.add(db_prestamo)
+            db.flush()
+        except IntegrityError:
+            # El libro ya tiene un préstamo activo (ux_prestamos_libro_activo)
+            db.rollback()
+            raise libro_no_disponible_exception()
+        
+        libro.prestamo_activo_id = db_prestamo.id
+        EstadisticasService.incrementar(db, PRESTAMOS_ACTIVOS)
+        EstadisticasService.incrementar_categoria(db, libro.categoria_id)
+        EstadisticasService.marcar_modificado(db, VERSION_LIBROS)
         db.commit()
-        db.refresh(db_prestamo)
-        return db_prestamo
+        return PrestamoService.get_prestamo_by_id(db, db_prestamo.id)
     
     @staticmethod
+    @reintentable
     def devolver_libro(db: Session, prestamo_id: int, usuario_id: int = None) -> Prestamo:
         """
         Procesar devolución de libro
@@ -105,49 +167,186 @@ class PrestamoService:
         if usuario_id and prestamo.usuario_id != usuario_id:
             raise Exception("No tienes permisos para devolver este libro")
         
-        # Registrar fecha de devolución
-        prestamo.fecha_devolucion = datetime.utcnow()
+        # Registrar fecha de devolución solo si sigue activo (dos devoluciones simultáneas no cuentan doble)
+        devueltos = db.execute(
+            update(Prestamo)
+            .where(Prestamo.id == prestamo_id, Prestamo.fecha_devolucion.is_(None))
+            .values(fecha_devolucion=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not devueltos:
+            db.rollback()
+            raise Exception("Este préstamo ya fue devuelto")
+        PrestamoService._liberar_libro(db, prestamo)
+        EstadisticasService.incrementar(db, PRESTAMOS_ACTIVOS, -1)
+        EstadisticasService.marcar_modificado(db, VERSION_LIBROS)
         
         db.commit()
-        db.refresh(prestamo)
-        return prestamo
+        db.expire(prestamo)
+        return PrestamoService.get_prestamo_by_id(db, prestamo_id)
     
     @staticmethod
-    def get_estadisticas_dashboard(db: Session) -> dict:
+    @reintentable
+    def create_prestamos_bulk(db: Session, libro_ids: List[int], usuario_id: int) -> dict:
         """
-        Obtener estadísticas para el dashboard
+        Prestar varios libros a un usuario en una sola transacción. Bloquea todos los
+        libros en una consulta (en orden de id para evitar deadlocks), inserta los préstamos
+        posibles con un solo executemany, actualiza los libros con un UPDATE ... WHERE id IN
+        y confirma una sola vez. Devuelve el resultado de cada libro pedido.
         """
-        # Total de libros
-        total_libros = db.query(Libro).count()
+        if not db.query(Usuario.id).filter(Usuario.id == usuario_id).first():
+            raise usuario_not_found_exception()
         
-        # Préstamos activos
-        prestamos_activos = db.query(Prestamo).filter(
-            Prestamo.fecha_devolucion.is_(None)
-        ).count()
+        libros = {
+            libro.id: libro
+            for libro in db.query(Libro).filter(Libro.id.in_(set(libro_ids))).order_by(Libro.id)
+            .populate_existing().with_for_update()
+        }
         
-        # Total de usuarios
-        total_usuarios = db.query(Usuario).count()
+        resultados, a_prestar, vistos = [], [], set()
+        for libro_id in libro_ids:
+            libro = libros.get(libro_id)
+            if libro_id in vistos:
+                error = "Libro repetido en el pedido"
+            elif not libro:
+                error = "Libro no encontrado"
+            elif not libro.disponible:
+                error = "El libro no está disponible para préstamo"
+            else:
+                error = None
+                a_prestar.append(libro)
+            vistos.add(libro_id)
+            resultados.append({"libro_id": libro_id, "estado": "error" if error else "prestado", "error": error})
         
-        # Categoría más popular (más libros prestados)
-        categoria_popular = db.query(
-            Categoria.nombre,
-            func.count(Prestamo.id).label('prestamos_count')
-        ).join(
-            Libro, Categoria.id == Libro.categoria_id
-        ).join(
-            Prestamo, Libro.id == Prestamo.libro_id
-        ).group_by(
-            Categoria.id, Categoria.nombre
-        ).order_by(
-            func.count(Prestamo.id).desc()
-        ).first()
+        if a_prestar:
+            ahora = datetime.utcnow()
+            # INSERT de Core: el ORM haría un INSERT por fila para conocer cada id
+            nuevos = [{"libro_id": libro.id, "usuario_id": usuario_id, "fecha_prestamo": ahora} for libro in a_prestar]
+            try:
+                db.execute(insert(Prestamo), nuevos)
+            except IntegrityError:
+                db.rollback()
+                raise libro_no_disponible_exception()
+            
+            db.execute(
+                update(Libro)
+                .where(Libro.id.in_([libro.id for libro in a_prestar]))
+                .values(prestamo_activo_id=select(Prestamo.id).where(
+                    Prestamo.libro_id == Libro.id,
+                    Prestamo.fecha_devolucion.is_(None)
+                ).scalar_subquery())
+                .execution_options(synchronize_session=False)
+            )
+            EstadisticasService.incrementar(db, PRESTAMOS_ACTIVOS, len(nuevos))
+            # Las filas de cada categoría se bloquean en orden de id, igual que en cualquier otro pedido
+            for categoria_id, cantidad in sorted(Counter(libro.categoria_id for libro in a_prestar).items()):
+                EstadisticasService.incrementar_categoria(db, categoria_id, cantidad)
+            EstadisticasService.marcar_modificado(db, VERSION_LIBROS)
+            # Los ids de los préstamos nuevos, leídos en una consulta antes de liberar los bloqueos
+            prestamo_por_libro = dict(db.execute(
+                select(Libro.id, Libro.prestamo_activo_id).where(Libro.id.in_([libro.id for libro in a_prestar]))
+            ).all())
+            db.commit()
+            
+            for resultado in resultados:
+                if resultado["estado"] == "prestado":
+                    resultado["prestamo_id"] = prestamo_por_libro[resultado["libro_id"]]
+        
+        return PrestamoService._reporte_circulacion(resultados, "prestado")
+    
+    @staticmethod
+    @reintentable
+    def devolver_prestamos_bulk(db: Session, prestamo_ids: List[int], usuario_id: int = None) -> dict:
+        """
+        Procesar varias devoluciones en una sola transacción. Bloquea los préstamos en una
+        consulta, los cierra con un UPDATE ... WHERE id IN, libera sus libros con otro
+        y confirma una sola vez.
+        """
+        prestamos = {
+            fila.id: fila
+            for fila in db.query(Prestamo.id, Prestamo.libro_id, Prestamo.usuario_id, Prestamo.fecha_devolucion)
+            .filter(Prestamo.id.in_(set(prestamo_ids))).order_by(Prestamo.id).with_for_update()
+        }
+        
+        resultados, a_devolver, vistos = [], [], set()
+        for prestamo_id in prestamo_ids:
+            prestamo = prestamos.get(prestamo_id)
+            if prestamo_id in vistos:
+                error = "Préstamo repetido en el pedido"
+            elif not prestamo:
+                error = "Préstamo no encontrado"
+            elif prestamo.fecha_devolucion is not None:
+                error = "Este préstamo ya fue devuelto"
+            elif usuario_id and prestamo.usuario_id != usuario_id:
+                error = "No tienes permisos para devolver este libro"
+            else:
+                error = None
+                a_devolver.append(prestamo_id)
+            vistos.add(prestamo_id)
+            resultados.append({
+                "prestamo_id": prestamo_id,
+                "libro_id": prestamo.libro_id if prestamo else None,
+                "estado": "error" if error else "devuelto",
+                "error": error
+            })
         
-        return {
-            "total_libros": total_libros,
-            "prestamos_activos": prestamos_activos,
-            "total_usuarios": total_usuarios,
-            "categoria_mas_popular": {
-                "nombre": categoria_popular.nombre if categoria_popular else "N/A",
-                "prestamos": categoria_popular.prestamos_count if categoria_popular else 0
-            }
-        }
\ No newline at end of file
+        if a_devolver:
+            db.execute(
+                update(Prestamo)
+                .where(Prestamo.id.in_(a_devolver), Prestamo.fecha_devolucion.is_(None))
+                .values(fecha_devolucion=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.execute(
+                update(Libro)
+                .where(Libro.prestamo_activo_id.in_(a_devolver))
+                .values(prestamo_activo_id=None)
+                .execution_options(synchronize_session=False)
+            )
+            EstadisticasService.incrementar(db, PRESTAMOS_ACTIVOS, -len(a_devolver))
+            EstadisticasService.marcar_modificado(db, VERSION_LIBROS)
+            db.commit()
+        
+        return PrestamoService._reporte_circulacion(resultados, "devuelto")
+    
+    @staticmethod
+    def _reporte_circulacion(resultados: List[dict], estado_exitoso: str) -> dict:
+        exitosos = sum(1 for resultado in resultados if resultado["estado"] == estado_exitoso)
+        return {"exitosos": exitosos, "fallidos": len(resultados) - exitosos, "resultados": resultados}
+    
+    @staticmethod
+    def _liberar_libro(db: Session, prestamo: Prestamo) -> None:
+        """
+        Marca el libro como disponible si su préstamo activo era este
+        """
+        db.execute(
+            update(Libro)
+            .where(Libro.id == prestamo.libro_id, Libro.prestamo_activo_id == prestamo.id)
+            .values(prestamo_activo_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.expire(prestamo.libro)
+    
+    @staticmethod
+    @reintentable
+    def delete_prestamo(db: Session, prestamo_id: int) -> bool:
+        """
+        Eliminar préstamo (casos excepcionales de administración)
+        """
+        prestamo = PrestamoService.get_prestamo_by_id(db, prestamo_id)
+        if prestamo.fecha_devolucion is None:
+            PrestamoService._liberar_libro(db, prestamo)
+            EstadisticasService.incrementar(db, PRESTAMOS_ACTIVOS, -1)
+        EstadisticasService.incrementar_categoria(db, prestamo.libro.categoria_id, -1)
+        EstadisticasService.marcar_modificado(db, VERSION_LIBROS)
+        db.delete(prestamo)
+        db.commit()
+        return True
+    
+    @staticmethod
+    @solo_lectura
+    def get_estadisticas_dashboard(db: Session) -> dict:
+        """
+        Obtener estadísticas para el dashboard (leídas de las tablas materializadas)
+        """
+        return EstadisticasService.get_estadisticas(db)
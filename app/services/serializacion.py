@@ -0,0 +1,82 @@
+from typing import Any, Iterable, List, Optional, Type, Union
+from typing_extensions import TypedDict
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from app.config.settings import settings
+
+#Misma forma y orden de claves que LibroResponse, sin sus validadores de entrada:
+#los datos salen de la base, no hace falta volver a validarlos en cada respuesta.
+
+class CategoriaJSON(TypedDict):
+    nombre: str
+    descripcion: Optional[str]
+    id: int
+
+
+class LibroJSON(TypedDict):
+    titulo: str
+    autor: str
+    isbn: str
+    editorial: Optional[str]
+    categoria_id: int
+    id: int
+    disponible: bool
+    categoria: CategoriaJSON
+
+
+#Esquemas compilados una sola vez
+_adaptador_libro = TypeAdapter(LibroJSON)
+_adaptador_libros = TypeAdapter(List[LibroJSON])
+
+
+def libro_a_dict(libro: Any) -> LibroJSON:
+    """
+    Libro del ORM (con su categoría cargada) en el formato de LibroResponse
+    """
+    categoria = libro.categoria
+    return {
+        "titulo": libro.titulo,
+        "autor": libro.autor,
+        "isbn": libro.isbn,
+        "editorial": libro.editorial,
+        "categoria_id": libro.categoria_id,
+        "id": libro.id,
+        "disponible": libro.disponible,
+        "categoria": {"nombre": categoria.nombre, "descripcion": categoria.descripcion, "id": categoria.id},
+    }
+
+
+def libro_json(libro: Union[Any, LibroJSON]) -> bytes:
+    return _adaptador_libro.dump_json(libro if isinstance(libro, dict) else libro_a_dict(libro))
+
+
+def libros_json(libros: Iterable[Any]) -> bytes:
+    return _adaptador_libros.dump_json([libro_a_dict(libro) for libro in libros])
+
+
+def respuesta_json(contenido: bytes, response: Optional[Response] = None, status_code: int = 200) -> Response:
+    """
+    Respuesta con el JSON ya serializado. Conserva los headers que las dependencias
+    pusieron en `response` (cursor, ETag), que FastAPI no copia al devolver un Response.
+    """
+    respuesta = Response(content=contenido, status_code=status_code, media_type="application/json")
+    if response is not None:
+        respuesta.headers.raw.extend(response.headers.raw)
+    return respuesta
+
+
+def clase_respuesta_json() -> Type[Response]:
+    """
+    Clase por defecto para las respuestas JSON de la app (JSON_RESPONSE_CLASS)
+    """
+    if settings.JSON_RESPONSE_CLASS == "estandar":
+        return JSONResponse
+    try:
+        from fastapi.responses import ORJSONResponse
+        import orjson  # noqa: F401
+    except ImportError:
+        if settings.JSON_RESPONSE_CLASS == "orjson":
+            raise RuntimeError("JSON_RESPONSE_CLASS=orjson requiere el paquete orjson")
+        return JSONResponse
+    return ORJSONResponse
@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query, Session
+from app.config.database import SessionLocal
+from app.config.replicas import SOLO_LECTURA
+from app.config.settings import settings
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+
+
+def stream_ndjson(
+    consultar: Callable[[Session], Iterable[Any]],
+    serializar: Callable[[Any], str],
+    response: Optional[Response] = None
+) -> StreamingResponse:
+    """
+    Respuesta NDJSON generada fila a fila. Usa una sesión propia porque la de get_db
+    se cierra antes de que empiece a enviarse el cuerpo. Conserva los headers puestos
+    en `response` (ETag, Cache-Control), igual que respuesta_json.
+    """
+    def generar():
+        db = SessionLocal(info={SOLO_LECTURA: True})
+        try:
+            for fila in consultar(db):
+                yield serializar(fila) + "\n"
+        finally:
+            db.close()
+
+    respuesta = StreamingResponse(generar(), media_type=NDJSON_MEDIA_TYPE)
+    if response is not None:
+        respuesta.headers.raw.extend(response.headers.raw)
+    return respuesta
+
+
+def _valor(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, Enum):
+        return valor.value
+    return valor
+
+
+def _lineas_ndjson(columnas: List[str], filas: Iterable[tuple]) -> Iterator[str]:
+    for fila in filas:
+        yield json.dumps(dict(zip(columnas, map(_valor, fila))), ensure_ascii=False) + "\n"
+
+
+def _lineas_csv(columnas: List[str], filas: Iterable[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    for fila in filas:
+        escritor.writerow(map(_valor, fila))
+        # Se envía lo acumulado cada tanto para no hacer un write por fila
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_exportacion(consulta: Callable[[Session], Query], formato: str, nombre: str) -> StreamingResponse:
+    """
+    Exporta una consulta de columnas como NDJSON o CSV. Las filas se leen con un
+    cursor del lado del servidor (yield_per / stream_results), así que la memoria y
+    el tiempo hasta el primer byte no dependen del tamaño de la tabla.
+    """
+    def generar():
+        db = SessionLocal(info={SOLO_LECTURA: True})
+        try:
+            query = consulta(db)
+            columnas = [c["name"] for c in query.column_descriptions]
+            filas = query.yield_per(settings.STREAM_BATCH_SIZE)
+            lineas = _lineas_csv if formato == "csv" else _lineas_ndjson
+            yield from lineas(columnas, filas)
+        finally:
+            db.close()
+
+    extension, media_type = ("csv", CSV_MEDIA_TYPE) if formato == "csv" else ("ndjson", NDJSON_MEDIA_TYPE)
+    return StreamingResponse(
+        generar(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{extension}"'}
+    )
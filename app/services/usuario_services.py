@@ -1,10 +1,15 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, Query
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from app.models.usuario import Usuario
 from app.schemas.usuario import UsuarioCreate, UsuarioUpdate
-from app.security.security import get_password_hash
+from app.security.principal_cache import invalidar_usuario
+from app.security.principal import revocar_tokens
 from app.security.exceptions import usuario_not_found_exception, duplicate_email_exception
+from app.services.paginacion import Pagina, paginar
+from app.services.estadisticas_service import EstadisticasService, TOTAL_USUARIOS
+from app.config.settings import settings
+from app.config.database import reintentable
 
 
 
@@ -28,32 +33,18 @@ class UsuarioService:
         return db.query(Usuario).filter(Usuario.email == email).first()
     
     @staticmethod
-    def get_usuarios(db: Session) -> List[Usuario]:
+    def get_usuarios(db: Session, cursor: Optional[str] = None, limit: int = settings.PAGE_SIZE_DEFAULT) -> Pagina:
         """
-        Obtener lista de usuarios
+        Obtener lista de usuarios paginada por cursor
         """
-        return db.query(Usuario).all()
+        return paginar(db.query(Usuario), [Usuario.id], cursor, limit)
     
     @staticmethod
-    def create_usuario(db: Session, usuario_data: UsuarioCreate) -> Usuario:
+    def exportar_usuarios(db: Session) -> Query:
         """
-        Crear nuevo usuario
+        Consulta plana de usuarios para exportación (sin contraseñas)
         """
-        try:
-            hashed_password = get_password_hash(usuario_data.contraseña)
-            db_usuario = Usuario(
-                nombre=usuario_data.nombre,
-                email=usuario_data.email,
-                contraseña=hashed_password,
-                rol=usuario_data.rol
-            )
-            db.add(db_usuario)
-            db.commit()
-            db.refresh(db_usuario)
-            return db_usuario
-        except IntegrityError:
-            db.rollback()
-            raise duplicate_email_exception()
+        return db.query(Usuario.id, Usuario.nombre, Usuario.email, Usuario.rol).order_by(Usuario.id)
     
     @staticmethod
     def update_usuario(db: Session, usuario_id: int, usuario_data: UsuarioUpdate) -> Usuario:
@@ -61,25 +52,41 @@ class UsuarioService:
         Actualizar usuario existente
         """
         usuario = UsuarioService.get_usuario_by_id(db, usuario_id)
+        email_anterior = usuario.email
+        
+        rol_anterior = usuario.rol
         
         update_data = usuario_data.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(usuario, field, value)
         
+        # El rol y el email viajan en el token: si cambian, los tokens anteriores dejan de valer
+        revocar = usuario.rol != rol_anterior or usuario.email != email_anterior
+        if revocar:
+            usuario.token_version = (usuario.token_version or 0) + 1
+        
         try:
             db.commit()
             db.refresh(usuario)
+            invalidar_usuario(email_anterior, usuario.email)
+            if revocar:
+                revocar_tokens(usuario.id, usuario.token_version)
             return usuario
         except IntegrityError:
             db.rollback()
             raise duplicate_email_exception()
     
     @staticmethod
+    @reintentable
     def delete_usuario(db: Session, usuario_id: int) -> bool:
         """
         Eliminar usuario
         """
         usuario = UsuarioService.get_usuario_by_id(db, usuario_id)
+        email = usuario.email
         db.delete(usuario)
+        EstadisticasService.incrementar(db, TOTAL_USUARIOS, -1)
         db.commit()
+        invalidar_usuario(email)
+        revocar_tokens(usuario_id)
         return True
@@ -0,0 +1,58 @@
+"""
+Tiempo de arranque en procesos nuevos: importar app.main, correr el lifespan y
+atender el primer request. Cada repetición usa un intérprete limpio.
+
+    python -m benchmarks.arranque --repeticiones 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.entorno import preparar
+
+MEDICION = """
+import json, time
+inicio = time.perf_counter()
+from app.main import app
+importado = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as cliente:
+    iniciado = time.perf_counter()
+    assert cliente.get("/").status_code == 200
+    primero = time.perf_counter()
+print(json.dumps({
+    "import": importado - inicio,
+    "lifespan": iniciado - importado,
+    "primer_request": primero - iniciado,
+    "total": primero - inicio,
+}))
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    preparar()
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    medidas = []
+    for _ in range(args.repeticiones):
+        resultado = subprocess.run(
+            [sys.executable, "-c", MEDICION], cwd=raiz, env=os.environ.copy(), capture_output=True, text=True, check=True
+        )
+        medidas.append(json.loads(resultado.stdout.strip().splitlines()[-1]))
+
+    # La primera corrida crea el esquema (DATABASE_AUTO_MIGRATE): se informa aparte
+    print("primera corrida: " + ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in medidas[0].items()))
+    resto = medidas[1:] or medidas
+    for clave in medidas[0]:
+        valores = [m[clave] * 1000 for m in resto]
+        print(f"{clave:<15} mediana={statistics.median(valores):7.1f}ms  max={max(valores):7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+
+def preparar(**valores: str) -> str:
+    """
+    Fija el entorno de los benchmarks antes de importar app (la configuración se lee al importar).
+    Sin DATABASE_URL usa una base SQLite nueva en un directorio temporal.
+    """
+    directorio = tempfile.mkdtemp(prefix="biblioteca-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(directorio, 'biblioteca.db')}")
+    os.environ.setdefault("DATABASE_AUTO_MIGRATE", "true")
+    os.environ.setdefault("DEBUG", "false")
+    os.environ.setdefault("STATS_RECONCILE_INTERVAL_SECONDS", "0")
+    os.environ.setdefault("SERVICE_CACHE_DIR", os.path.join(directorio, "cache"))
+    os.environ.setdefault("PROFILING_DIR", os.path.join(directorio, "perfiles"))
+    os.environ.setdefault("LOGIN_MAX_ATTEMPTS_IP", "1000000")
+    for clave, valor in valores.items():
+        os.environ[clave] = valor
+    return directorio
@@ -0,0 +1,62 @@
+"""
+Logins por segundo y latencia con varios costos de bcrypt, con muchos logins
+simultáneos contra la app (pool de hashing de PASSWORD_HASH_EXECUTOR).
+
+    python -m benchmarks.login --rondas 10 11 12 --concurrencia 32 --logins 128
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.entorno import preparar
+
+preparar(LOGIN_LIMITER_ENABLED="false", INSTRUMENTATION_ENABLED="false")
+
+import httpx
+
+from app.main import app
+from app.security import hashing
+
+
+async def _login(cliente: httpx.AsyncClient, email: str, semaforo: asyncio.Semaphore) -> float:
+    async with semaforo:
+        inicio = time.perf_counter()
+        respuesta = await cliente.post("/auth/login", json={"email": email, "password": "secret1"})
+        assert respuesta.status_code == 200, respuesta.text
+        return time.perf_counter() - inicio
+
+
+async def _medir(cliente: httpx.AsyncClient, rondas: int, concurrencia: int, logins: int) -> None:
+    # El costo se cambia en caliente: el pool de hilos lee el contexto del módulo
+    hashing._contexto, hashing._rondas = hashing.crear_contexto(rondas), rondas
+    email = f"login{rondas}-{int(time.time() * 1000)}@biblioteca.com"
+    respuesta = await cliente.post("/auth/register", json={"nombre": "Bench", "email": email, "password": "secret1"})
+    assert respuesta.status_code == 201, respuesta.text
+
+    semaforo = asyncio.Semaphore(concurrencia)
+    inicio = time.perf_counter()
+    latencias = sorted(await asyncio.gather(*(_login(cliente, email, semaforo) for _ in range(logins))))
+    duracion = time.perf_counter() - inicio
+    p95 = latencias[int(len(latencias) * 0.95) - 1]
+    print(f"rondas={rondas:<3} {logins / duracion:7.1f} logins/s  "
+          f"mediana={statistics.median(latencias) * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rondas", type=int, nargs="+", default=[10, 11, 12])
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--logins", type=int, default=128)
+    args = parser.parse_args()
+
+    async with app.router.lifespan_context(app):
+        print(f"executor={hashing.get_executor().__class__.__name__}")
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            for rondas in args.rondas:
+                await _medir(cliente, rondas, args.concurrencia, args.logins)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
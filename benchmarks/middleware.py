@@ -0,0 +1,94 @@
+"""
+Requests por segundo en / y /libros/{id} con el manejador de errores ASGI puro frente
+a la versión anterior sobre BaseHTTPMiddleware (mismo contrato JSON).
+
+    python -m benchmarks.middleware --requests 2000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.entorno import preparar
+
+preparar(INSTRUMENTATION_ENABLED="false")
+
+import httpx
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.main import create_app
+from app.middleware.error_handler import ErrorHandlerMiddleware
+
+
+class ErrorHandlerAnterior(BaseHTTPMiddleware):
+    """
+    Implementación previa, solo como referencia de la medición
+    """
+    async def dispatch(self, request, call_next):
+        try:
+            return await call_next(request)
+        except Exception as e:
+            return JSONResponse(status_code=500, content={"detail": str(e), "message": "Ha ocurrido un error"})
+
+
+def _app(anterior: bool):
+    aplicacion = create_app()
+    if anterior:
+        for i, middleware in enumerate(aplicacion.user_middleware):
+            if middleware.cls is ErrorHandlerMiddleware:
+                aplicacion.user_middleware[i] = type(middleware)(ErrorHandlerAnterior)
+    return aplicacion
+
+
+async def _preparar_datos(cliente: httpx.AsyncClient) -> tuple:
+    sufijo = int(time.time() * 1000)
+    email = f"bench{sufijo}@biblioteca.com"
+    await cliente.post("/auth/register", json={"nombre": "Bench", "email": email, "password": "secret1", "rol": "bibliotecario"})
+    token = (await cliente.post("/auth/login", json={"email": email, "password": "secret1"})).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    categoria = (await cliente.post("/categorias/", json={"nombre": f"Bench {sufijo}"}, headers=headers)).json()["id"]
+    libro = (await cliente.post("/libros/", json={
+        "titulo": "Bench", "autor": "Autor", "isbn": str(sufijo)[-10:], "editorial": "Ed", "categoria_id": categoria
+    }, headers=headers)).json()["id"]
+    return libro, headers
+
+
+async def _medir(aplicacion, rutas, headers: dict, requests: int) -> dict:
+    resultados = {}
+    transporte = httpx.ASGITransport(app=aplicacion)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        for ruta in rutas:
+            for _ in range(50):
+                await cliente.get(ruta, headers=headers)
+            inicio = time.perf_counter()
+            for _ in range(requests):
+                respuesta = await cliente.get(ruta, headers=headers)
+                assert respuesta.status_code == 200, respuesta.text
+            resultados[ruta] = requests / (time.perf_counter() - inicio)
+    return resultados
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    actual = _app(anterior=False)
+    async with actual.router.lifespan_context(actual):
+        transporte = httpx.ASGITransport(app=actual)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            libro_id, headers = await _preparar_datos(cliente)
+        rutas = ["/", f"/libros/{libro_id}"]
+        medidas = {
+            "BaseHTTPMiddleware": await _medir(_app(anterior=True), rutas, headers, args.requests),
+            "ASGI puro": await _medir(actual, rutas, headers, args.requests),
+        }
+
+    for nombre, por_ruta in medidas.items():
+        print(nombre)
+        for ruta, rps in por_ruta.items():
+            print(f"  {ruta:<20} {rps:8.0f} req/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Estrés de préstamos: muchos hilos prestan y devuelven el mismo libro a la vez.
+Comprueba que nunca hay dos préstamos activos del libro y mide préstamos por segundo.
+
+    python -m benchmarks.prestamos_concurrentes --hilos 16 --segundos 10
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.entorno import preparar
+
+preparar()
+
+from fastapi import HTTPException
+
+from app.arranque import inicializar
+from app.config.database import SessionLocal
+from app.models.categoria import Categoria
+from app.models.libros import Libro
+from app.models.prestamo import Prestamo
+from app.models.usuario import Usuario
+from app.schemas.prestamo import PrestamoCreate
+from app.services.prestamos_services import PrestamoService
+
+
+def _datos(hilos: int):
+    db = SessionLocal()
+    try:
+        marca = int(time.time() * 1000)
+        categoria = Categoria(nombre=f"Estrés {marca}")
+        libro = Libro(titulo="Disputado", autor="Autor", isbn=str(marca)[-13:].rjust(13, "0"), editorial="Ed", categoria=categoria)
+        usuarios = [Usuario(nombre="Lector", email=f"lector{marca}-{i}@biblioteca.com", password="x") for i in range(hilos)]
+        db.add_all([categoria, libro, *usuarios])
+        db.commit()
+        return libro.id, [u.id for u in usuarios]
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hilos", type=int, default=16)
+    parser.add_argument("--segundos", type=float, default=10.0)
+    args = parser.parse_args()
+
+    inicializar()
+    libro_id, usuarios = _datos(args.hilos)
+    fin = time.perf_counter() + args.segundos
+    totales = {"prestamos": 0, "conflictos": 0, "errores": 0}
+    activos_simultaneos = []
+    candado = threading.Lock()
+
+    def trabajar(usuario_id: int) -> None:
+        db = SessionLocal()
+        cuenta = {"prestamos": 0, "conflictos": 0, "errores": 0}
+        try:
+            while time.perf_counter() < fin:
+                try:
+                    prestamo = PrestamoService.create_prestamo(db, PrestamoCreate(libro_id=libro_id), usuario_id)
+                except HTTPException as exc:
+                    cuenta["conflictos" if exc.status_code == 409 else "errores"] += 1
+                    continue
+                except Exception:
+                    db.rollback()
+                    cuenta["errores"] += 1
+                    continue
+                cuenta["prestamos"] += 1
+                activos = db.query(Prestamo).filter(
+                    Prestamo.libro_id == libro_id, Prestamo.fecha_devolucion.is_(None)
+                ).count()
+                activos_simultaneos.append(activos)
+                db.commit()
+                PrestamoService.devolver_libro(db, prestamo.id)
+        finally:
+            db.close()
+            with candado:
+                for clave, valor in cuenta.items():
+                    totales[clave] += valor
+
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=trabajar, args=(usuario_id,)) for usuario_id in usuarios]
+    for hilo in trabajadores:
+        hilo.start()
+    for hilo in trabajadores:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    print(f"hilos={args.hilos} duracion={duracion:.1f}s")
+    print(f"prestamos={totales['prestamos']} ({totales['prestamos'] / duracion:.1f}/s) "
+          f"conflictos_409={totales['conflictos']} errores={totales['errores']}")
+    print(f"maximo de prestamos activos del libro: {max(activos_simultaneos, default=0)}")
+    if max(activos_simultaneos, default=0) > 1:
+        raise SystemExit("Se detectaron préstamos activos duplicados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Costo por fila de serializar respuestas de 10k libros: el serializador directo
+(libros_json) frente a la validación de FastAPI con LibroResponse.
+
+    python -m benchmarks.serializacion --filas 10000
+"""
+import argparse
+import time
+from typing import List
+
+from benchmarks.entorno import preparar
+
+preparar()
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models.categoria import Categoria
+from app.models.libros import Libro
+from app.models import prestamo, usuario  # noqa: F401 (registra los mappers de las relaciones)
+from app.schemas.libros import LibroResponse
+from app.services.serializacion import clase_respuesta_json, libros_json
+
+
+def _libros(filas: int) -> List[Libro]:
+    # Objetos ORM sin sesión: se mide solo la serialización, no la consulta
+    categorias = [Categoria(id=i, nombre=f"Categoría {i}", descripcion="Descripción") for i in range(20)]
+    return [
+        Libro(
+            id=i, titulo=f"Libro {i}", autor="Autor", isbn=str(9780000000000 + i), editorial="Editorial",
+            categoria_id=i % 20, categoria=categorias[i % 20], prestamo_activo_id=None if i % 3 else i,
+        )
+        for i in range(filas)
+    ]
+
+
+def _medir(funcion, libros, repeticiones: int) -> float:
+    funcion(libros)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(libros)
+    return (time.perf_counter() - inicio) / repeticiones / len(libros) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    libros = _libros(args.filas)
+    adaptador = TypeAdapter(List[LibroResponse])
+    respuesta = clase_respuesta_json()
+
+    def fastapi_response_model(filas):
+        # Lo que hace FastAPI con response_model: validar, volcar y codificar
+        validados = adaptador.validate_python([LibroResponse.model_validate(f, from_attributes=True) for f in filas])
+        return respuesta(content=jsonable_encoder(validados)).body
+
+    casos = {
+        "response_model": fastapi_response_model,
+        "libros_json": libros_json,
+    }
+    for nombre, funcion in casos.items():
+        print(f"{nombre:<16} {_medir(funcion, libros, args.repeticiones):6.2f} µs/fila")
+
+
+if __name__ == "__main__":
+    main()
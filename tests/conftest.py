@@ -0,0 +1,137 @@
+import itertools
+import os
+import tempfile
+
+#La configuración se lee al importar app: el entorno de pruebas se fija antes.
+#DATABASE_URL puede apuntar a otra base (MySQL) desde el entorno.
+_directorio = tempfile.mkdtemp(prefix="biblioteca-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_directorio, 'biblioteca.db')}")
+os.environ.setdefault("DATABASE_AUTO_MIGRATE", "true")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("BCRYPT_ROUNDS", "5")
+os.environ.setdefault("STATS_RECONCILE_INTERVAL_SECONDS", "0")
+os.environ.setdefault("SERVICE_CACHE_DIR", os.path.join(_directorio, "cache"))
+os.environ.setdefault("PROFILING_DIR", os.path.join(_directorio, "perfiles"))
+#Los tests inician sesión muchas veces desde la misma IP; el límite se prueba aparte
+os.environ.setdefault("LOGIN_MAX_ATTEMPTS_IP", "1000000")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+
+from app.config.database import SessionLocal, engine
+
+PASSWORD = "secret1"
+
+_secuencia = itertools.count(1)
+
+
+def unico(prefijo: str) -> str:
+    """
+    Valor distinto en cada llamada: los tests comparten la base y no la limpian
+    """
+    return f"{prefijo}{next(_secuencia)}"
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app.main import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def db():
+    sesion = SessionLocal()
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+
+
+@pytest.fixture
+def engine_aislado(tmp_path):
+    """
+    Base SQLite vacía y propia del test, para probar esquema y datos desde cero
+    """
+    motor = create_engine(f"sqlite:///{tmp_path / 'aislada.db'}")
+    yield motor
+    motor.dispose()
+
+
+@pytest.fixture(scope="session")
+def crear_usuario(client):
+    """
+    Registra un usuario y devuelve (id, email, headers con su token)
+    """
+    def crear(rol: str = "cliente", password: str = PASSWORD):
+        email = f"{unico('usuario')}@biblioteca.com"
+        respuesta = client.post("/auth/register", json={"nombre": "Usuario", "email": email, "password": password, "rol": rol})
+        assert respuesta.status_code == 201, respuesta.text
+        respuesta = client.post("/auth/login", json={"email": email, "password": password})
+        assert respuesta.status_code == 200, respuesta.text
+        token = respuesta.json()["access_token"]
+        return respuesta.json()["user"]["id"], email, {"Authorization": f"Bearer {token}"}
+    return crear
+
+
+@pytest.fixture(scope="session")
+def bibliotecario(crear_usuario):
+    return crear_usuario("bibliotecario")[2]
+
+
+@pytest.fixture(scope="session")
+def cliente(crear_usuario):
+    return crear_usuario("cliente")[2]
+
+
+@pytest.fixture(scope="session")
+def crear_categoria(client, bibliotecario):
+    def crear(nombre: str = None) -> int:
+        respuesta = client.post("/categorias/", json={"nombre": nombre or unico("Categoria ")}, headers=bibliotecario)
+        assert respuesta.status_code == 201, respuesta.text
+        return respuesta.json()["id"]
+    return crear
+
+
+@pytest.fixture(scope="session")
+def crear_libro(client, bibliotecario, crear_categoria):
+    def crear(categoria_id: int = None, **campos) -> dict:
+        datos = {
+            "titulo": unico("Libro "),
+            "autor": "Autor",
+            "isbn": str(1000000000 + next(_secuencia)),
+            "editorial": "Editorial",
+            "categoria_id": categoria_id or crear_categoria(),
+        }
+        datos.update(campos)
+        respuesta = client.post("/libros/", json=datos, headers=bibliotecario)
+        assert respuesta.status_code == 201, respuesta.text
+        return respuesta.json()
+    return crear
+
+
+@pytest.fixture
+def consultas():
+    """
+    Sentencias SQL ejecutadas mientras dura el test (se puede vaciar con clear())
+    """
+    sentencias = []
+
+    def registrar(conn, cursor, sentencia, parametros, contexto, executemany):
+        sentencias.append(sentencia)
+
+    engines = [engine]
+    from app.config.database import async_engine
+    if async_engine is not None:
+        engines.append(async_engine.sync_engine)
+    for motor in engines:
+        event.listen(motor, "before_cursor_execute", registrar)
+    yield sentencias
+    for motor in engines:
+        event.remove(motor, "before_cursor_execute", registrar)
@@ -0,0 +1,62 @@
+from passlib.context import CryptContext
+from sqlalchemy import update
+
+from app.config.settings import settings
+from app.models.usuario import Usuario
+from app.security import hashing
+from tests.conftest import PASSWORD
+
+
+def _guardar_hash(db, email: str, hashed_password: str) -> None:
+    db.execute(update(Usuario).where(Usuario.email == email).values(password=hashed_password))
+    db.commit()
+
+
+def _hash_guardado(db, email: str) -> str:
+    db.expire_all()
+    return db.query(Usuario.password).filter(Usuario.email == email).scalar()
+
+
+def _login(client, email: str, password: str = PASSWORD):
+    return client.post("/auth/login", json={"email": email, "password": password})
+
+
+def test_login_rehashea_con_el_costo_actual(client, crear_usuario, db):
+    _, email, _ = crear_usuario()
+    _guardar_hash(db, email, CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash(PASSWORD))
+
+    assert _login(client, email).status_code == 200
+    nuevo = _hash_guardado(db, email)
+    assert nuevo.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+
+    assert _login(client, email).status_code == 200
+    assert _hash_guardado(db, email) == nuevo
+
+
+def test_login_migra_esquemas_viejos(client, crear_usuario, db, monkeypatch):
+    _, email, _ = crear_usuario()
+    monkeypatch.setattr(settings, "PASSWORD_SCHEMES", ["bcrypt", "pbkdf2_sha256"])
+    monkeypatch.setattr(hashing, "_contexto", hashing.crear_contexto(settings.BCRYPT_ROUNDS))
+    _guardar_hash(db, email, CryptContext(schemes=["pbkdf2_sha256"]).hash(PASSWORD))
+
+    assert _login(client, email).status_code == 200
+    assert _hash_guardado(db, email).startswith("$2b$")
+
+
+def test_password_incorrecta_no_toca_el_hash(client, crear_usuario, db):
+    _, email, _ = crear_usuario()
+    viejo = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash(PASSWORD)
+    _guardar_hash(db, email, viejo)
+
+    assert _login(client, email, "incorrecta").status_code == 401
+    assert _hash_guardado(db, email) == viejo
+
+
+def test_registro_hashea_con_el_costo_configurado(crear_usuario, db):
+    _, email, _ = crear_usuario()
+    assert _hash_guardado(db, email).startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+
+
+def test_calibracion_respeta_los_limites():
+    assert hashing.calibrar_rondas(0.001) == hashing.RONDAS_MIN
+    assert hashing.calibrar_rondas(1e9) == hashing.RONDAS_MAX
@@ -0,0 +1,52 @@
+from jose import jwt
+
+from app.config.settings import settings
+from app.security.security import create_access_token
+from tests.conftest import PASSWORD, unico
+
+
+def _sentencias_de_usuarios(consultas) -> list:
+    return [sentencia for sentencia in consultas if "usuarios" in sentencia]
+
+
+def test_rol_se_autoriza_con_los_claims_sin_leer_el_usuario(client, bibliotecario, cliente, consultas):
+    # Primer request de cada token: su versión puede no estar en cache todavía
+    client.post("/categorias/", json={"nombre": unico("Claims ")}, headers=bibliotecario)
+    client.post("/categorias/", json={"nombre": unico("Claims ")}, headers=cliente)
+    consultas.clear()
+
+    assert client.post("/categorias/", json={"nombre": unico("Claims ")}, headers=bibliotecario).status_code == 201
+    assert client.post("/categorias/", json={"nombre": unico("Claims ")}, headers=cliente).status_code == 403
+    assert _sentencias_de_usuarios(consultas) == []
+
+
+def test_cambio_de_rol_revoca_los_tokens_anteriores(client, bibliotecario, crear_usuario):
+    usuario_id, email, headers = crear_usuario()
+    respuesta = client.put(f"/usuarios/{usuario_id}", json={"rol": "bibliotecario"}, headers=bibliotecario)
+    assert respuesta.status_code == 200, respuesta.text
+
+    assert client.get("/libros/", headers=headers).status_code == 401
+
+    token = client.post("/auth/login", json={"email": email, "password": PASSWORD}).json()["access_token"]
+    nuevos = {"Authorization": f"Bearer {token}"}
+    assert client.post("/categorias/", json={"nombre": unico("Ascendido ")}, headers=nuevos).status_code == 201
+
+
+def test_usuario_eliminado_pierde_el_acceso(client, bibliotecario, crear_usuario):
+    usuario_id, _, headers = crear_usuario()
+    assert client.delete(f"/usuarios/{usuario_id}", headers=bibliotecario).status_code == 204
+    assert client.get("/libros/", headers=headers).status_code == 401
+
+
+def test_tokens_sin_uid_ni_version_se_rechazan(client, crear_usuario):
+    _, email, _ = crear_usuario()
+    token = create_access_token({"sub": email, "role": "bibliotecario"})
+    assert client.get("/libros/", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_claims_con_otra_firma_se_rechazan(client, crear_usuario):
+    usuario_id, email, _ = crear_usuario()
+    claims = {"sub": email, "uid": usuario_id, "role": "bibliotecario", "ver": 0}
+    token = jwt.encode(claims, settings.SECRET_KEY + "-falsa", algorithm=settings.ALGORITHM)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/categorias/", json={"nombre": unico("Falsa ")}, headers=headers).status_code == 401
@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy.dialects import mysql
+
+from app.search.base import MotorBusqueda
+from app.search.mysql import FullTextMySQL
+from app.search.normalizacion import terminos_busqueda
+from app.services.paginacion import NEXT_CURSOR_HEADER
+from tests.conftest import unico
+
+
+def buscar(client, headers, consulta: str, tipo: str = "todos", **params) -> list:
+    respuesta = client.post("/libros/buscar", json={"query": consulta, "tipo": tipo}, params=params, headers=headers)
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta
+
+
+def ids(respuesta) -> set:
+    return {libro["id"] for libro in respuesta.json()}
+
+
+def test_terminos_normalizados_sin_repetir_ni_cortos():
+    assert terminos_busqueda("El CANCIÓN de la canción, Ñandú y 1984") == ["cancion", "nandu", "1984"]
+
+
+def test_motor_busqueda_es_abstracto():
+    with pytest.raises(TypeError):
+        MotorBusqueda()
+
+
+def test_ignora_acentos_y_mayusculas(client, cliente, crear_libro):
+    marca = unico("marca")
+    libro = crear_libro(titulo=f"Canción del Ñandú {marca}")
+
+    assert ids(buscar(client, cliente, f"CANCION nandu {marca}")) == {libro["id"]}
+    assert ids(buscar(client, cliente, f"canc {marca}")) == {libro["id"]}
+
+
+def test_terminos_en_distintos_campos(client, cliente, crear_categoria, crear_libro):
+    marca = unico("marca")
+    categoria_id = crear_categoria(f"Poesía {marca}")
+    libro = crear_libro(categoria_id, titulo=f"Astronomía {marca}", autor="Carl Sagan")
+
+    assert ids(buscar(client, cliente, f"astronomia sagan {marca}")) == {libro["id"]}
+    assert ids(buscar(client, cliente, f"poesia astronomia {marca}")) == {libro["id"]}
+    # Cada término debe aparecer en alguno de los campos del tipo pedido
+    assert ids(buscar(client, cliente, f"sagan {marca}", tipo="titulo")) == set()
+    assert ids(buscar(client, cliente, f"poesia sagan {marca}", tipo="autor")) == set()
+
+
+def test_terminos_cortos_no_restringen(client, cliente, crear_libro):
+    marca = unico("marca")
+    libro = crear_libro(titulo=f"Historia {marca}")
+
+    assert ids(buscar(client, cliente, f"la de {marca} historia")) == {libro["id"]}
+    assert buscar(client, cliente, "la de").json() == []
+
+
+def test_paginas_por_relevancia(client, cliente, crear_libro):
+    marca = unico("marca")
+    creados = {crear_libro(titulo=f"Tomo {marca}")["id"] for _ in range(5)}
+
+    vistos, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        respuesta = buscar(client, cliente, marca, **params)
+        vistos.extend(libro["id"] for libro in respuesta.json())
+        cursor = respuesta.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+
+    assert len(vistos) == len(set(vistos))
+    assert set(vistos) == creados
+
+
+class _SesionQueCaptura:
+    def __init__(self):
+        self.sentencias = []
+
+    def execute(self, sentencia):
+        self.sentencias.append(sentencia)
+        return self
+
+    def all(self):
+        return []
+
+
+def test_mysql_busca_cada_termino_por_separado():
+    db = _SesionQueCaptura()
+    FullTextMySQL().buscar(db, "Canción de Sagan", "todos", None, 10)
+
+    sql = str(db.sentencias[0].compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+    # Dos términos (de es corto), cada uno contra titulo+autor y contra categoría;
+    # MATCH aparece en el score y en el filtro de cada rama
+    assert sql.count("MATCH") == 2 * 2 * 2
+    assert "'+cancion*'" in sql and "'+sagan*'" in sql
+    assert "HAVING count(DISTINCT" in sql
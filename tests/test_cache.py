@@ -0,0 +1,121 @@
+import os
+import pickle
+import time
+
+import pytest
+from sqlalchemy import update
+
+from app.cache.backends import ArchivoBackend, BackendCache, MemoriaBackend, RedisBackend
+from app.cache import etag
+from app.cache.etag import versiones_cache
+from app.config.database import engine
+from app.models.estadisticas import Estadistica
+from app.models.libros import Libro
+from app.services.categoria_services import CategoriaService
+from app.services.estadisticas_service import VERSION_LIBROS
+
+
+class RedisFalso:
+    """
+    Lo mínimo de redis-py que usa RedisBackend
+    """
+    def __init__(self):
+        self.datos = {}
+
+    def get(self, clave):
+        valor, expira = self.datos.get(clave, (None, 0))
+        return valor if expira > time.monotonic() else None
+
+    def set(self, clave, valor, px):
+        self.datos[clave] = (valor, time.monotonic() + px / 1000)
+
+
+def test_backend_cache_es_abstracto():
+    with pytest.raises(TypeError):
+        BackendCache()
+
+
+@pytest.mark.parametrize("crear", [
+    lambda tmp_path: MemoriaBackend(16, 60),
+    lambda tmp_path: ArchivoBackend(str(tmp_path), 60),
+    lambda tmp_path: RedisBackend(RedisFalso()),
+], ids=["memoria", "archivo", "redis"])
+def test_backends_guardan_y_vencen(tmp_path, crear):
+    backend = crear(tmp_path)
+    valor = {"id": 1, "items": [1, 2]}
+
+    assert backend.get("clave", "nada") == "nada"
+    backend.set("clave", valor, 60)
+    assert backend.get("clave") == valor
+    backend.set("efimera", valor, 0.01)
+    time.sleep(0.02)
+    assert backend.get("efimera", "nada") == "nada"
+
+
+def test_archivo_purga_entradas_vencidas(tmp_path):
+    backend = ArchivoBackend(str(tmp_path), 0.01)
+    backend.set("vieja", 1, 0.01)
+    time.sleep(0.02)
+    backend._purgar()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_archivo_crea_el_directorio_privado(tmp_path):
+    directorio = tmp_path / "cache"
+    ArchivoBackend(str(directorio), 60)
+    assert os.stat(directorio).st_mode & 0o777 == 0o700
+
+
+def test_archivo_rechaza_directorio_accesible_por_otros(tmp_path):
+    directorio = tmp_path / "compartido"
+    directorio.mkdir()
+    directorio.chmod(0o777)
+    with pytest.raises(RuntimeError):
+        ArchivoBackend(str(directorio), 60)
+
+
+def test_cacheado_lee_las_versiones_por_la_sesion(db, monkeypatch):
+    class EngineProhibido:
+        def connect(self):
+            raise AssertionError("la versión se leyó fuera de la sesión")
+
+    monkeypatch.setattr(etag, "engine", EngineProhibido())
+    versiones_cache.clear()
+    assert CategoriaService.get_categorias(db, limit=1).items is not None
+
+
+def test_redis_guarda_pickle_con_prefijo():
+    cliente = RedisFalso()
+    RedisBackend(cliente).set("clave", [1], 5)
+    assert pickle.loads(cliente.get("biblioteca:cache:clave")) == [1]
+
+
+def test_escritura_local_invalida_en_el_acto(client, bibliotecario, cliente, crear_libro):
+    libro = crear_libro()
+    assert client.get(f"/libros/{libro['id']}", headers=cliente).json()["titulo"] == libro["titulo"]
+
+    respuesta = client.put(f"/libros/{libro['id']}", json={"titulo": "Titulo nuevo"}, headers=bibliotecario)
+    assert respuesta.status_code == 200, respuesta.text
+    assert client.get(f"/libros/{libro['id']}", headers=cliente).json()["titulo"] == "Titulo nuevo"
+
+
+def test_escritura_de_otro_worker_cambia_cuerpo_y_etag_juntos(client, cliente, crear_libro):
+    libro = crear_libro()
+    ruta = f"/libros/{libro['id']}"
+    antes = client.get(ruta, headers=cliente)
+
+    # Otro worker: cambia la fila y la versión sin pasar por los hooks de este proceso
+    with engine.begin() as conn:
+        conn.execute(update(Libro).where(Libro.id == libro["id"]).values(titulo="Cambiado en otro worker"))
+        conn.execute(update(Estadistica).where(Estadistica.clave == VERSION_LIBROS).values(valor=Estadistica.valor + 1))
+
+    # Mientras este worker no relea la versión, cuerpo y ETag siguen siendo los anteriores
+    mientras = client.get(ruta, headers=cliente)
+    assert mientras.json()["titulo"] == libro["titulo"]
+    assert mientras.headers["etag"] == antes.headers["etag"]
+
+    versiones_cache.clear()  # vence ETAG_VERSION_TTL_SECONDS
+    despues = client.get(ruta, headers=cliente)
+    assert despues.json()["titulo"] == "Cambiado en otro worker"
+    assert despues.headers["etag"] != antes.headers["etag"]
+    assert client.get(ruta, headers={**cliente, "If-None-Match": antes.headers["etag"]}).status_code == 200
@@ -0,0 +1,60 @@
+import pytest
+
+#Consultas máximas por endpoint con su grafo completo (PERFIL_*_RESPONSE). Sin contar
+#la lectura de versiones de los ETag, que depende del TTL de su cache y no de los datos.
+MAXIMO_CONSULTAS = {
+    "/libros/": 1,
+    "/libros/disponibles": 1,
+    "/libros/categoria/{categoria_id}": 2,
+    "/libros/{libro_id}": 1,
+    "/prestamos/activos": 1,
+    "/prestamos/mis-prestamos/activos": 1,
+    "/prestamos/mis-prestamos/historial": 1,
+    "/prestamos/{prestamo_id}": 1,
+}
+
+
+@pytest.fixture
+def contar_consultas(client, consultas):
+    """
+    Hace el GET y devuelve cuántas sentencias ejecutó el endpoint
+    """
+    def contar(ruta: str, headers: dict) -> int:
+        consultas.clear()
+        respuesta = client.get(ruta, headers=headers)
+        assert respuesta.status_code == 200, respuesta.text
+        return sum(1 for sentencia in consultas if "FROM estadisticas" not in sentencia)
+    return contar
+
+
+def _prestar(client, headers, libros):
+    ids = []
+    for libro in libros:
+        respuesta = client.post("/prestamos/", json={"libro_id": libro["id"]}, headers=headers)
+        assert respuesta.status_code == 201, respuesta.text
+        ids.append(respuesta.json()["id"])
+    return ids
+
+
+@pytest.mark.parametrize("plantilla", list(MAXIMO_CONSULTAS))
+def test_consultas_por_endpoint_no_crecen_con_las_filas(
+    plantilla, client, crear_usuario, crear_categoria, crear_libro, bibliotecario, contar_consultas
+):
+    _, _, headers = crear_usuario()
+    categoria_id = crear_categoria()
+    libros = [crear_libro(categoria_id) for _ in range(2)]
+    prestamos = _prestar(client, headers, libros[:1])
+    ruta = plantilla.format(categoria_id=categoria_id, libro_id=libros[0]["id"], prestamo_id=prestamos[0])
+    autorizacion = bibliotecario if plantilla == "/prestamos/activos" else headers
+
+    # Primer request: caches de usuario y de servicios calientes
+    contar_consultas(ruta, autorizacion)
+    pocas = contar_consultas(ruta, autorizacion)
+
+    mas_libros = [crear_libro(categoria_id) for _ in range(4)]
+    _prestar(client, headers, mas_libros[:3])
+    contar_consultas(ruta, autorizacion)
+    muchas = contar_consultas(ruta, autorizacion)
+
+    assert pocas <= MAXIMO_CONSULTAS[plantilla]
+    assert muchas == pocas
@@ -0,0 +1,64 @@
+from sqlalchemy import update
+
+from app.models.libros import Libro
+from app.services.libro_service import LibroService
+
+
+def _puntero(db, libro_id: int):
+    db.expire_all()
+    return db.get(Libro, libro_id).prestamo_activo_id
+
+
+def _disponible(client, headers, libro_id: int) -> bool:
+    respuesta = client.get(f"/libros/{libro_id}/disponibilidad", headers=headers)
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()["disponible"]
+
+
+def test_prestamo_y_devolucion_mantienen_el_puntero(client, crear_usuario, crear_libro, db):
+    _, _, headers = crear_usuario()
+    libro_id = crear_libro()["id"]
+    assert _puntero(db, libro_id) is None
+
+    prestamo_id = client.post("/prestamos/", json={"libro_id": libro_id}, headers=headers).json()["id"]
+    assert _puntero(db, libro_id) == prestamo_id
+    assert _disponible(client, headers, libro_id) is False
+
+    assert client.patch(f"/prestamos/{prestamo_id}/devolver", headers=headers).status_code == 200
+    assert _puntero(db, libro_id) is None
+    assert _disponible(client, headers, libro_id) is True
+
+
+def test_operaciones_en_lote_mantienen_el_puntero(client, crear_usuario, crear_libro, db):
+    _, _, headers = crear_usuario()
+    libros = [crear_libro()["id"] for _ in range(3)]
+
+    resultado = client.post("/prestamos/bulk", json={"libro_ids": libros}, headers=headers).json()
+    prestamos = {item["libro_id"]: item["prestamo_id"] for item in resultado["resultados"]}
+    assert {libro_id: _puntero(db, libro_id) for libro_id in libros} == prestamos
+
+    respuesta = client.post("/prestamos/devolver/bulk", json={"prestamo_ids": list(prestamos.values())}, headers=headers)
+    assert respuesta.json()["exitosos"] == 3
+    assert [_puntero(db, libro_id) for libro_id in libros] == [None, None, None]
+
+
+def test_disponibles_filtra_sin_recorrer_prestamos(client, cliente, consultas):
+    consultas.clear()
+    assert client.get("/libros/disponibles", params={"limit": 5}, headers=cliente).status_code == 200
+    listado = [s for s in consultas if "FROM libros" in s]
+    assert listado and not any("prestamos" in s for s in listado)
+
+
+def test_reparar_disponibilidad_corrige_los_desvios(client, crear_usuario, crear_libro, db):
+    _, _, headers = crear_usuario()
+    prestado, libre = crear_libro()["id"], crear_libro()["id"]
+    prestamo_id = client.post("/prestamos/", json={"libro_id": prestado}, headers=headers).json()["id"]
+    # Desvíos: el prestado figura libre y el libre apunta a un préstamo ajeno
+    db.execute(update(Libro).where(Libro.id == prestado).values(prestamo_activo_id=None))
+    db.execute(update(Libro).where(Libro.id == libre).values(prestamo_activo_id=prestamo_id))
+    db.commit()
+
+    assert LibroService.reparar_disponibilidad(db) >= 2
+    assert _puntero(db, prestado) == prestamo_id
+    assert _puntero(db, libre) is None
+    assert LibroService.reparar_disponibilidad(db) == 0
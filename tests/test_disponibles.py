@@ -0,0 +1,34 @@
+import json
+
+from tests.test_paginacion import recorrer_paginas
+
+
+def _ndjson(client, headers: dict, **extra):
+    return client.get("/libros/disponibles", params={"formato": "ndjson"}, headers={**headers, **extra})
+
+
+def test_ndjson_y_paginas_devuelven_los_mismos_libros(client, cliente, crear_usuario, crear_libro):
+    libros = [crear_libro()["id"] for _ in range(4)]
+    _, _, headers = crear_usuario()
+    assert client.post("/prestamos/", json={"libro_id": libros[0]}, headers=headers).status_code == 201
+
+    respuesta = _ndjson(client, cliente)
+    filas = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    paginados = recorrer_paginas(client, "/libros/disponibles", cliente, limit=5)
+
+    assert respuesta.headers["content-type"].startswith("application/x-ndjson")
+    assert [fila["id"] for fila in filas] == paginados
+    assert libros[0] not in paginados
+    assert set(libros[1:]) <= set(paginados)
+    assert all(fila["disponible"] for fila in filas)
+
+
+def test_ndjson_conserva_etag_y_cache_control(client, cliente):
+    paginada = client.get("/libros/disponibles", headers=cliente)
+    respuesta = _ndjson(client, cliente)
+
+    # La URL forma parte del ETag: cada formato tiene el suyo
+    assert respuesta.headers["etag"].startswith('"')
+    assert respuesta.headers["etag"] != paginada.headers["etag"]
+    assert respuesta.headers["cache-control"] == paginada.headers["cache-control"]
+    assert _ndjson(client, cliente, **{"If-None-Match": respuesta.headers["etag"]}).status_code == 304
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.middleware.error_handler import ErrorHandlerMiddleware
+
+
+def _llamar(aplicacion, scope=None):
+    """
+    Ejecuta la app ASGI con un request GET vacío y devuelve los mensajes enviados
+    """
+    enviados = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensaje):
+        enviados.append(mensaje)
+
+    asyncio.run(aplicacion(scope or {"type": "http", "method": "GET", "path": "/", "headers": []}, receive, send))
+    return enviados
+
+
+def test_excepcion_antes_de_responder_es_500_json():
+    async def falla(scope, receive, send):
+        raise RuntimeError("se cayó")
+
+    inicio, cuerpo = _llamar(ErrorHandlerMiddleware(falla))
+
+    assert inicio["status"] == 500
+    assert (b"content-type", b"application/json") in inicio["headers"]
+    assert cuerpo["body"] == b'{"detail":"se cay\xc3\xb3","message":"Ha ocurrido un error"}'
+
+
+def test_excepcion_con_respuesta_iniciada_se_propaga():
+    async def falla_a_mitad(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"parcial", "more_body": True})
+        raise RuntimeError("se cortó")
+
+    with pytest.raises(RuntimeError):
+        _llamar(ErrorHandlerMiddleware(falla_a_mitad))
+
+
+def test_streaming_pasa_sin_buffer():
+    recibido = asyncio.Event()
+    enviados = []
+
+    async def transmite(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"uno", "more_body": True})
+        # Si el middleware acumulara el cuerpo, el primer trozo no llegaría nunca
+        await asyncio.wait_for(recibido.wait(), timeout=1)
+        await send({"type": "http.response.body", "body": b"dos", "more_body": False})
+
+    async def send(mensaje):
+        enviados.append(mensaje)
+        if mensaje.get("body") == b"uno":
+            recibido.set()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    asyncio.run(ErrorHandlerMiddleware(transmite)({"type": "http", "method": "GET", "path": "/", "headers": []}, receive, send))
+
+    assert [m.get("body") for m in enviados] == [None, b"uno", b"dos"]
+
+
+def test_lifespan_pasa_directo():
+    llamadas = []
+
+    async def aplicacion(scope, receive, send):
+        llamadas.append(scope["type"])
+
+    asyncio.run(ErrorHandlerMiddleware(aplicacion)({"type": "lifespan"}, None, None))
+    assert llamadas == ["lifespan"]
+
+
+def test_endpoint_que_falla_responde_contrato_json():
+    aplicacion = create_app()
+
+    @aplicacion.get("/prueba-error")
+    def fallar():
+        raise ValueError("dato inválido")
+
+    respuesta = TestClient(aplicacion).get("/prueba-error")
+    assert respuesta.status_code == 500
+    assert respuesta.json() == {"detail": "dato inválido", "message": "Ha ocurrido un error"}
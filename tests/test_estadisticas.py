@@ -0,0 +1,132 @@
+import sqlite3
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.config.database import Base
+from app.models.categoria import Categoria
+from app.models.estadisticas import Estadistica, EstadisticaCategoria
+from app.models.libros import Libro
+from app.models.prestamo import Prestamo
+from app.models.usuario import Usuario
+from app.services.estadisticas_service import CONTADORES, EstadisticasService, _upsert
+
+
+def _base_con_datos(engine):
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    categoria = Categoria(nombre="Novela")
+    usuario = Usuario(nombre="Ana", email="ana@biblioteca.com", password="x")
+    libros = [Libro(titulo=f"Libro {i}", autor="Autor", isbn=f"isbn-{i}", editorial="Ed", categoria=categoria) for i in range(3)]
+    db.add_all([categoria, usuario, *libros])
+    db.flush()
+    db.add(Prestamo(libro_id=libros[0].id, usuario_id=usuario.id, fecha_prestamo=datetime.utcnow()))
+    db.commit()
+    return db
+
+
+def test_lectura_sin_materializar_no_escribe(engine_aislado):
+    db = _base_con_datos(engine_aislado)
+    escrituras = []
+
+    @event.listens_for(engine_aislado, "before_cursor_execute")
+    def registrar(conn, cursor, sentencia, parametros, contexto, executemany):
+        if not sentencia.lstrip().upper().startswith("SELECT"):
+            escrituras.append(sentencia)
+
+    estadisticas = EstadisticasService.get_estadisticas(db)
+
+    assert escrituras == []
+    assert db.query(Estadistica).count() == 0
+    assert estadisticas["total_libros"] == 3
+    assert estadisticas["prestamos_activos"] == 1
+    assert estadisticas["total_usuarios"] == 1
+    assert estadisticas["categoria_mas_popular"] == {"nombre": "Novela", "prestamos": 1}
+    db.close()
+
+
+def test_sembrar_materializa_una_sola_vez(engine_aislado):
+    db = _base_con_datos(engine_aislado)
+    calculadas = EstadisticasService.get_estadisticas(db)
+
+    assert EstadisticasService.sembrar(db) is True
+    assert db.query(Estadistica).filter(Estadistica.clave.in_(CONTADORES)).count() == len(CONTADORES)
+    assert EstadisticasService.get_estadisticas(db) == calculadas
+    assert EstadisticasService.sembrar(db) is False
+    db.close()
+
+
+def test_contadores_incrementales_coinciden_con_reconciliar(client, bibliotecario, crear_usuario, crear_libro, db):
+    _, _, headers = crear_usuario()
+    libros = [crear_libro() for _ in range(3)]
+    prestamos = [client.post("/prestamos/", json={"libro_id": libro["id"]}, headers=headers).json()["id"] for libro in libros]
+    assert client.patch(f"/prestamos/{prestamos[0]}/devolver", headers=headers).status_code == 200
+    assert client.delete(f"/libros/{crear_libro()['id']}", headers=bibliotecario).status_code == 204
+
+    materializadas = client.get("/dashboard/estadisticas", headers=bibliotecario).json()["estadisticas"]
+    contadores, _ = EstadisticasService._calcular(db)
+
+    assert materializadas["total_libros"] == contadores["total_libros"]
+    assert materializadas["prestamos_activos"] == contadores["prestamos_activos"]
+    assert materializadas["total_usuarios"] == contadores["total_usuarios"]
+
+
+def test_reconciliar_bloquea_y_actualiza_en_su_lugar(engine_aislado):
+    db = _base_con_datos(engine_aislado)
+    EstadisticasService.sembrar(db)
+    categoria_id = db.query(Categoria.id).scalar()
+    # Desvíos: un contador inflado y una categoría sin préstamos con conteo viejo
+    db.query(EstadisticaCategoria).filter_by(categoria_id=categoria_id).update({"prestamos": 40})
+    otra = Categoria(nombre="Vacía")
+    db.add(otra)
+    db.flush()
+    db.add(EstadisticaCategoria(categoria_id=otra.id, prestamos=7))
+    db.commit()
+    sentencias = []
+
+    @event.listens_for(engine_aislado, "before_cursor_execute")
+    def registrar(conn, cursor, sentencia, parametros, contexto, executemany):
+        sentencias.append(sentencia)
+
+    EstadisticasService.reconciliar(db)
+
+    assert not any(s.startswith("DELETE") for s in sentencias)
+    # Las filas de contadores se leen (FOR UPDATE en MySQL) antes de contar las tablas base
+    primera_cuenta = next(i for i, s in enumerate(sentencias) if "count(" in s.lower())
+    assert any("FROM estadisticas_categoria" in s for s in sentencias[:primera_cuenta])
+    assert dict(db.query(EstadisticaCategoria.categoria_id, EstadisticaCategoria.prestamos)) == {
+        categoria_id: 1, otra.id: 0
+    }
+    db.close()
+
+
+def test_incrementar_crea_la_fila_que_falta_sin_chocar(engine_aislado):
+    db = _base_con_datos(engine_aislado)
+    # Dos writers que no encontraron la fila: el segundo INSERT suma en vez de fallar
+    _upsert(db, Estadistica, {"clave": "nueva"}, {"valor": 1}, {"valor": Estadistica.valor + 1})
+    _upsert(db, Estadistica, {"clave": "nueva"}, {"valor": 1}, {"valor": Estadistica.valor + 1})
+    EstadisticasService.incrementar(db, "otra", 3)
+    EstadisticasService.incrementar_categoria(db, db.query(Categoria.id).scalar(), 2)
+    db.commit()
+
+    assert db.get(Estadistica, "nueva").valor == 2
+    assert db.get(Estadistica, "otra").valor == 3
+    db.close()
+
+
+def test_error_de_contadores_no_se_informa_como_isbn_duplicado(client, bibliotecario, crear_categoria, monkeypatch):
+    categoria_id = crear_categoria()
+
+    def incrementar(db, clave, delta=1):
+        raise IntegrityError("INSERT INTO estadisticas", {}, sqlite3.IntegrityError("UNIQUE constraint failed: estadisticas.clave"))
+
+    monkeypatch.setattr(EstadisticasService, "incrementar", staticmethod(incrementar))
+    respuesta = client.post("/libros/", json={
+        "titulo": "Sin contador", "autor": "Autor", "isbn": "9781111111111",
+        "editorial": "Ed", "categoria_id": categoria_id
+    }, headers=bibliotecario)
+
+    assert respuesta.status_code == 500
+    assert "estadisticas" in respuesta.json()["detail"]
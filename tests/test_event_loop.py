@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.security import hashing
+from tests.conftest import PASSWORD
+
+#Duración simulada de cada verificación de contraseña (un bcrypt caro)
+VERIFICACION_SEGUNDOS = 0.5
+
+
+def test_logins_lentos_no_frenan_los_listados(client, crear_usuario, cliente, monkeypatch):
+    """
+    Con bcrypt en el event loop, cada listado esperaría a que terminen los logins en curso
+    """
+    _, email, _ = crear_usuario()
+    original = hashing.verificar_y_actualizar
+
+    def verificacion_lenta(password, hashed_password):
+        time.sleep(VERIFICACION_SEGUNDOS)
+        return original(password, hashed_password)
+
+    monkeypatch.setattr(hashing, "verificar_y_actualizar", verificacion_lenta)
+
+    def login() -> float:
+        respuesta = client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        assert respuesta.status_code == 200, respuesta.text
+        return time.perf_counter()
+
+    def listado() -> float:
+        respuesta = client.get("/libros/", params={"limit": 20}, headers=cliente)
+        assert respuesta.status_code == 200, respuesta.text
+        return time.perf_counter()
+
+    with ThreadPoolExecutor(16) as pool:
+        logins = [pool.submit(login) for _ in range(4)]
+        time.sleep(0.05)
+        inicio = time.perf_counter()
+        listados = [pool.submit(listado) for _ in range(8)]
+        fin_listados = max(f.result() for f in listados)
+        fin_logins = min(f.result() for f in logins)
+
+    assert fin_listados < fin_logins
+    assert fin_listados - inicio < VERIFICACION_SEGUNDOS
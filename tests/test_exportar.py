@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from app.config.settings import settings
+from app.models.libros import Libro
+from app.models.usuario import Usuario
+
+
+def _ndjson(respuesta) -> list:
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(linea) for linea in respuesta.text.splitlines()]
+
+
+def test_exportar_libros_ndjson(client, bibliotecario, crear_usuario, crear_libro, db):
+    libro = crear_libro()
+    _, _, headers = crear_usuario()
+    client.post("/prestamos/", json={"libro_id": libro["id"]}, headers=headers)
+
+    filas = _ndjson(client.get("/exportar/libros", headers=bibliotecario))
+
+    assert len(filas) == db.query(Libro).count()
+    assert [fila["id"] for fila in filas] == sorted(fila["id"] for fila in filas)
+    exportado = next(fila for fila in filas if fila["id"] == libro["id"])
+    assert exportado == {
+        "id": libro["id"], "titulo": libro["titulo"], "autor": libro["autor"], "isbn": libro["isbn"],
+        "editorial": libro["editorial"], "categoria_id": libro["categoria_id"],
+        "categoria": libro["categoria"]["nombre"], "disponible": False,
+    }
+
+
+def test_exportar_libros_csv(client, bibliotecario, crear_libro):
+    libro = crear_libro()
+    respuesta = client.get("/exportar/libros", params={"formato": "csv"}, headers=bibliotecario)
+
+    assert respuesta.headers["content-type"] == "text/csv; charset=utf-8"
+    assert respuesta.headers["content-disposition"] == 'attachment; filename="libros.csv"'
+    filas = list(csv.DictReader(io.StringIO(respuesta.text)))
+    assert next(fila for fila in filas if fila["id"] == str(libro["id"]))["isbn"] == libro["isbn"]
+
+
+def test_exportar_usuarios_sin_contrasenas(client, bibliotecario, crear_usuario, db):
+    _, email, _ = crear_usuario()
+    filas = _ndjson(client.get("/exportar/usuarios", headers=bibliotecario))
+
+    assert len(filas) == db.query(Usuario).count()
+    assert all(set(fila) == {"id", "nombre", "email", "rol"} for fila in filas)
+    assert next(fila for fila in filas if fila["email"] == email)["rol"] == "cliente"
+
+
+def test_exportar_prestamos_activos(client, bibliotecario, crear_usuario, crear_libro):
+    _, email, headers = crear_usuario()
+    devuelto, activo = [
+        client.post("/prestamos/", json={"libro_id": crear_libro()["id"]}, headers=headers).json()["id"]
+        for _ in range(2)
+    ]
+    client.patch(f"/prestamos/{devuelto}/devolver", headers=headers)
+
+    todos = {fila["id"]: fila for fila in _ndjson(client.get("/exportar/prestamos", headers=bibliotecario))}
+    respuesta = client.get("/exportar/prestamos", params={"activos": True}, headers=bibliotecario)
+    activos = {fila["id"] for fila in _ndjson(respuesta)}
+
+    assert respuesta.headers["content-disposition"] == 'attachment; filename="prestamos_activos.ndjson"'
+    assert {devuelto, activo} <= set(todos)
+    assert activo in activos and devuelto not in activos
+    assert todos[activo]["usuario_email"] == email
+    datetime.fromisoformat(todos[devuelto]["fecha_devolucion"])
+
+
+def test_exportar_en_lotes_con_una_sola_consulta(client, bibliotecario, crear_libro, consultas, monkeypatch):
+    for _ in range(5):
+        crear_libro()
+    monkeypatch.setattr(settings, "STREAM_BATCH_SIZE", 2)
+    consultas.clear()
+
+    filas = _ndjson(client.get("/exportar/libros", headers=bibliotecario))
+
+    assert len(filas) >= 5
+    assert len([s for s in consultas if "FROM libros" in s]) == 1
+
+
+def test_exportar_solo_bibliotecarios(client, cliente):
+    assert client.get("/exportar/libros", headers=cliente).status_code == 403
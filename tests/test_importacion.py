@@ -0,0 +1,79 @@
+import itertools
+
+from app.models.estadisticas import Estadistica
+from app.models.libros import Libro
+from app.services.estadisticas_service import TOTAL_LIBROS
+
+_isbns = itertools.count(9791000000000)
+
+
+def _fila(categoria_id: int, **campos) -> dict:
+    isbn = str(next(_isbns))
+    return {"titulo": f"Importado {isbn}", "autor": "Autor", "isbn": isbn, "editorial": "Ed",
+            "categoria_id": categoria_id, **campos}
+
+
+def _total_libros(db) -> int:
+    db.expire_all()
+    return db.query(Estadistica.valor).filter(Estadistica.clave == TOTAL_LIBROS).scalar()
+
+
+def test_importar_json_informa_cada_fila(client, bibliotecario, crear_categoria, crear_libro, db):
+    categoria_id = crear_categoria()
+    existente = crear_libro(categoria_id)
+    nuevo, repetido = _fila(categoria_id), _fila(categoria_id)
+    filas = [
+        nuevo,
+        _fila(categoria_id, isbn=existente["isbn"]),
+        repetido,
+        dict(repetido, titulo="Otra edición"),
+        _fila(10 ** 9),
+        {"titulo": "Sin autor"},
+    ]
+    total_antes = _total_libros(db)
+
+    respuesta = client.post("/libros/bulk", json=filas, headers=bibliotecario)
+
+    assert respuesta.status_code == 200, respuesta.text
+    reporte = respuesta.json()
+    assert (reporte["creados"], reporte["duplicados"], reporte["errores"]) == (2, 2, 2)
+    estados = [resultado["estado"] for resultado in reporte["resultados"]]
+    assert estados == ["creado", "duplicado", "creado", "duplicado", "error", "error"]
+    assert [resultado["fila"] for resultado in reporte["resultados"]] == list(range(len(filas)))
+    assert reporte["resultados"][4]["error"] == "Categoría no encontrada"
+    creado = db.get(Libro, reporte["resultados"][0]["id"])
+    assert creado.isbn == nuevo["isbn"]
+    assert _total_libros(db) == total_antes + 2
+
+
+def test_importar_csv(client, bibliotecario, crear_categoria):
+    categoria_id = crear_categoria()
+    filas = [_fila(categoria_id) for _ in range(2)]
+    csv = "titulo,autor,isbn,editorial,categoria_id\n" + "".join(
+        f"{f['titulo']},{f['autor']},{f['isbn']},{f['editorial']},{f['categoria_id']}\n" for f in filas
+    )
+
+    respuesta = client.post("/libros/bulk", content=csv.encode(), headers={**bibliotecario, "Content-Type": "text/csv"})
+
+    assert respuesta.status_code == 200, respuesta.text
+    assert [r["isbn"] for r in respuesta.json()["resultados"]] == [f["isbn"] for f in filas]
+    assert respuesta.json()["creados"] == 2
+
+
+def test_importar_con_consultas_constantes(client, bibliotecario, crear_categoria, consultas):
+    categoria_id = crear_categoria()
+
+    def contar(cantidad: int) -> int:
+        consultas.clear()
+        respuesta = client.post("/libros/bulk", json=[_fila(categoria_id) for _ in range(cantidad)], headers=bibliotecario)
+        assert respuesta.json()["creados"] == cantidad
+        return len(consultas)
+
+    assert contar(3) == contar(30)
+
+
+def test_importar_rechaza_archivos_invalidos(client, bibliotecario, cliente):
+    assert client.post("/libros/bulk", json={"titulo": "x"}, headers=bibliotecario).status_code == 400
+    sin_encabezado = {**bibliotecario, "Content-Type": "text/csv"}
+    assert client.post("/libros/bulk", content=b"", headers=sin_encabezado).status_code == 400
+    assert client.post("/libros/bulk", json=[], headers=cliente).status_code == 403
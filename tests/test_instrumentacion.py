@@ -0,0 +1,80 @@
+import os
+import re
+import subprocess
+import sys
+
+from app.config.settings import settings
+from app.instrumentacion.perfilador import PROFILE_ID_HEADER
+
+SERVER_TIMING = re.compile(r'db;dur=[\d.]+;desc="(\d+) consultas", db-max;dur=[\d.]+, app;dur=[\d.]+')
+
+
+def _en_proceso_nuevo(codigo: str, tmp_path, **entorno) -> subprocess.CompletedProcess:
+    """
+    Ejecuta código con una configuración propia (settings y engines se crean al importar)
+    """
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'nueva.db'}", **entorno}
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.run([sys.executable, "-c", codigo], cwd=raiz, env=env, capture_output=True, text=True, timeout=60)
+
+
+def test_server_timing_por_request(client, cliente, crear_libro):
+    crear_libro()
+    respuesta = client.get("/libros/", headers=cliente)
+
+    coincidencia = SERVER_TIMING.fullmatch(respuesta.headers["server-timing"])
+    assert coincidencia, respuesta.headers["server-timing"]
+    assert int(coincidencia.group(1)) >= 1
+
+
+def test_metrics_en_formato_prometheus(client, cliente):
+    client.get("/libros/", headers=cliente)
+    respuesta = client.get("/metrics")
+
+    assert respuesta.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    assert "# TYPE biblioteca_http_requests_total counter" in respuesta.text
+    assert re.search(r'biblioteca_http_requests_total\{metodo="GET",ruta="/libros/",estado="200"\} \d+', respuesta.text)
+    assert re.search(r"biblioteca_db_queries_total \d+", respuesta.text)
+
+
+def test_perfil_solo_con_el_token(client, cliente, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "token-perfil")
+
+    assert PROFILE_ID_HEADER not in client.get("/libros/", headers={**cliente, "X-Profile": "otro"}).headers
+    respuesta = client.get("/libros/", headers={**cliente, "X-Profile": "token-perfil"})
+
+    perfil = respuesta.headers[PROFILE_ID_HEADER]
+    assert os.path.exists(os.path.join(settings.PROFILING_DIR, f"{perfil}.prof"))
+
+
+def test_importar_la_app_no_toca_la_base(tmp_path):
+    resultado = _en_proceso_nuevo("import app.main", tmp_path)
+
+    assert resultado.returncode == 0, resultado.stderr
+    assert not (tmp_path / "nueva.db").exists()
+
+
+def test_sin_auto_migrate_un_esquema_viejo_detiene_el_arranque(tmp_path):
+    codigo = (
+        "from fastapi.testclient import TestClient\n"
+        "from app.main import app\n"
+        "with TestClient(app):\n"
+        "    pass\n"
+    )
+    resultado = _en_proceso_nuevo(codigo, tmp_path, DATABASE_AUTO_MIGRATE="false")
+
+    assert resultado.returncode != 0
+    assert "python -m app.cli migrate" in resultado.stderr
+
+
+def test_arranca_aunque_la_base_no_responda(tmp_path):
+    codigo = (
+        "from fastapi.testclient import TestClient\n"
+        "from app.main import app\n"
+        "with TestClient(app) as cliente:\n"
+        "    assert cliente.get('/').status_code == 200\n"
+    )
+    resultado = _en_proceso_nuevo(codigo, tmp_path, DATABASE_URL=f"sqlite:///{tmp_path / 'no-existe' / 'x.db'}")
+
+    assert resultado.returncode == 0, resultado.stderr
+    assert "Base de datos no disponible al arrancar" in resultado.stderr
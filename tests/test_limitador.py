@@ -0,0 +1,213 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from app.config.settings import settings
+from app.security import limitador
+from app.security.limitador import BackendLimitador, LimitadorLogin, MemoriaLimitador, RedisLimitador
+from tests.conftest import PASSWORD
+
+VENTANA = 60.0
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.ahora
+
+    def avanzar(self, segundos: float) -> None:
+        self.ahora += segundos
+
+
+class RedisAsyncFalso:
+    """
+    Lo mínimo de redis.asyncio que usa RedisLimitador; los vencimientos siguen al reloj del test
+    """
+    def __init__(self, reloj: Reloj):
+        self.reloj = reloj
+        self.datos = {}
+        self.vence = {}
+
+    def _vigente(self, clave):
+        if clave in self.vence and self.vence[clave] <= self.reloj():
+            self.datos.pop(clave, None)
+            self.vence.pop(clave, None)
+        return self.datos.get(clave)
+
+    def pipeline(self):
+        return _PipelineFalso(self)
+
+    async def get(self, clave):
+        valor = self._vigente(clave)
+        return None if valor is None else valor.encode()
+
+    async def set(self, clave, valor, px):
+        self.datos[clave] = valor
+        self.vence[clave] = self.reloj() + px / 1000
+
+    async def delete(self, *claves):
+        for clave in claves:
+            self.datos.pop(clave, None)
+            self.vence.pop(clave, None)
+
+
+class _PipelineFalso:
+    def __init__(self, redis: RedisAsyncFalso):
+        self.redis = redis
+        self.operaciones = []
+
+    def zremrangebyscore(self, clave, minimo, maximo):
+        def operar():
+            conjunto = self.redis._vigente(clave) or {}
+            for miembro in [m for m, puntaje in conjunto.items() if minimo <= puntaje <= maximo]:
+                del conjunto[miembro]
+            return 0
+        self.operaciones.append(operar)
+
+    def zadd(self, clave, miembros):
+        def operar():
+            self.redis.datos.setdefault(clave, {}).update(miembros)
+            return len(miembros)
+        self.operaciones.append(operar)
+
+    def zcard(self, clave):
+        self.operaciones.append(lambda: len(self.redis._vigente(clave) or {}))
+
+    def pexpire(self, clave, milisegundos):
+        def operar():
+            self.redis.vence[clave] = self.redis.reloj() + milisegundos / 1000
+            return True
+        self.operaciones.append(operar)
+
+    async def execute(self):
+        return [operar() for operar in self.operaciones]
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(limitador.time, "time", reloj)
+    monkeypatch.setattr(settings, "LOGIN_WINDOW_SECONDS", VENTANA)
+    monkeypatch.setattr(settings, "LOGIN_MAX_ATTEMPTS_IP", 4)
+    monkeypatch.setattr(settings, "LOGIN_MAX_FAILURES_EMAIL", 3)
+    monkeypatch.setattr(settings, "LOGIN_BACKOFF_BASE_SECONDS", 1.0)
+    monkeypatch.setattr(settings, "LOGIN_BACKOFF_MAX_SECONDS", 8.0)
+    return reloj
+
+
+@pytest.fixture(params=["memoria", "redis"])
+def limitador_login(request, reloj):
+    if request.param == "memoria":
+        return LimitadorLogin(MemoriaLimitador(1000, VENTANA))
+    return LimitadorLogin(RedisLimitador(RedisAsyncFalso(reloj)))
+
+
+def _espera_429(limitador_login, ip, email) -> int:
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(limitador_login.admitir(ip, email))
+    assert exc.value.status_code == 429
+    return int(exc.value.headers["Retry-After"])
+
+
+def _fallar(limitador_login, email, veces: int = 1) -> None:
+    # Un intento admitido cuenta como fallido mientras no llegue registrar_exito
+    for _ in range(veces):
+        asyncio.run(limitador_login.admitir(None, email))
+
+
+def test_backend_limitador_es_abstracto():
+    with pytest.raises(TypeError):
+        BackendLimitador()
+
+
+def test_bloqueo_por_email_con_backoff_exponencial(limitador_login, reloj):
+    _fallar(limitador_login, "ana@biblioteca.com", 3)
+    assert _espera_429(limitador_login, None, "ana@biblioteca.com") == 1
+
+    esperas = []
+    for _ in range(5):
+        reloj.avanzar(esperas[-1] if esperas else 1)
+        _fallar(limitador_login, "ana@biblioteca.com")
+        esperas.append(_espera_429(limitador_login, None, "ANA@biblioteca.com "))
+    # Se duplica con cada fallo de más y se corta en LOGIN_BACKOFF_MAX_SECONDS
+    assert esperas == [2, 4, 8, 8, 8]
+
+
+def test_fallos_fuera_de_la_ventana_no_cuentan(limitador_login, reloj):
+    _fallar(limitador_login, "beto@biblioteca.com", 2)
+    reloj.avanzar(VENTANA + 1)
+    _fallar(limitador_login, "beto@biblioteca.com", 2)
+    asyncio.run(limitador_login.admitir(None, "beto@biblioteca.com"))
+
+
+def test_login_correcto_limpia_los_fallos(limitador_login, reloj):
+    _fallar(limitador_login, "caro@biblioteca.com", 2)
+    asyncio.run(limitador_login.registrar_exito("caro@biblioteca.com"))
+    _fallar(limitador_login, "caro@biblioteca.com", 2)
+    asyncio.run(limitador_login.admitir(None, "caro@biblioteca.com"))
+
+
+def test_intentos_rechazados_no_extienden_el_bloqueo(limitador_login, reloj):
+    _fallar(limitador_login, "dani@biblioteca.com", 3)
+    for _ in range(20):
+        _espera_429(limitador_login, None, "dani@biblioteca.com")
+    reloj.avanzar(1)
+    _fallar(limitador_login, "dani@biblioteca.com")
+    assert _espera_429(limitador_login, None, "dani@biblioteca.com") == 2
+
+
+def test_rafaga_simultanea_contra_un_email(limitador_login, reloj):
+    async def intento():
+        try:
+            await limitador_login.admitir(None, "eva@biblioteca.com")
+        except HTTPException as exc:
+            return exc.status_code
+        await asyncio.sleep(0.01)  # bcrypt: ningún intento falló todavía cuando llegan los demás
+        return 401
+
+    async def rafaga():
+        return await asyncio.gather(*(intento() for _ in range(20)))
+
+    resultados = asyncio.run(rafaga())
+    assert resultados.count(401) == settings.LOGIN_MAX_FAILURES_EMAIL
+    assert resultados.count(429) == 20 - settings.LOGIN_MAX_FAILURES_EMAIL
+
+
+def test_limite_por_ip(limitador_login, reloj):
+    for i in range(4):
+        asyncio.run(limitador_login.admitir("10.0.0.1", f"u{i}@biblioteca.com"))
+    assert _espera_429(limitador_login, "10.0.0.1", "otro@biblioteca.com") == 1
+    # Otra IP no se ve afectada
+    asyncio.run(limitador_login.admitir("10.0.0.2", "otro@biblioteca.com"))
+    reloj.avanzar(VENTANA + 1)
+    asyncio.run(limitador_login.admitir("10.0.0.1", "otro@biblioteca.com"))
+
+
+def test_endpoint_responde_429_sin_consultar_la_base(client, crear_usuario, consultas):
+    _, email, _ = crear_usuario()
+    for _ in range(settings.LOGIN_MAX_FAILURES_EMAIL):
+        assert client.post("/auth/login", json={"email": email, "password": "incorrecta"}).status_code == 401
+
+    consultas.clear()
+    respuesta = client.post("/auth/login", json={"email": email, "password": PASSWORD})
+
+    assert respuesta.status_code == 429
+    assert int(respuesta.headers["Retry-After"]) >= 1
+    assert consultas == []
+
+
+def test_endpoint_rafaga_simultanea_contra_un_email(client, crear_usuario):
+    _, email, _ = crear_usuario()
+
+    def intentar(_):
+        return client.post("/auth/login", json={"email": email, "password": "incorrecta"}).status_code
+
+    with ThreadPoolExecutor(16) as pool:
+        codigos = list(pool.map(intentar, range(32)))
+
+    assert codigos.count(401) == settings.LOGIN_MAX_FAILURES_EMAIL
+    assert codigos.count(429) == 32 - settings.LOGIN_MAX_FAILURES_EMAIL
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app.migrations import MIGRACIONES, migrar, schema_version, version_actual
+from app.config.database import Base
+from app.services.libro_service import LibroService
+from app.services.prestamos_services import PrestamoService
+
+ULTIMA = MIGRACIONES[-1].version
+
+
+def _indices(engine, tabla: str) -> set:
+    return {i["name"] for i in inspect(engine).get_indexes(tabla)}
+
+
+def test_base_vacia_queda_al_dia(engine_aislado):
+    assert migrar(engine_aislado) == [m.version for m in MIGRACIONES]
+    assert version_actual(engine_aislado) == ULTIMA
+    assert migrar(engine_aislado) == []
+    assert {"ix_prestamos_usuario_fecha", "ux_prestamos_libro_activo"} <= _indices(engine_aislado, "prestamos")
+
+
+def test_base_sin_registro_aplica_todo_sin_duplicar(engine_aislado):
+    # Base creada con create_all antes de que existieran las migraciones
+    Base.metadata.create_all(bind=engine_aislado)
+
+    assert migrar(engine_aislado) == [m.version for m in MIGRACIONES]
+    assert version_actual(engine_aislado) == ULTIMA
+
+
+def test_base_antigua_recupera_columnas_e_indices(engine_aislado):
+    Base.metadata.create_all(bind=engine_aislado)
+    with engine_aislado.begin() as conn:
+        conn.execute(text("DROP INDEX ix_prestamos_usuario_fecha"))
+        conn.execute(text("DROP INDEX ix_libros_disponibles"))
+        conn.execute(text("ALTER TABLE usuarios DROP COLUMN token_version"))
+
+    migrar(engine_aislado)
+
+    columnas = {c["name"] for c in inspect(engine_aislado).get_columns("usuarios")}
+    assert "token_version" in columnas
+    assert "ix_prestamos_usuario_fecha" in _indices(engine_aislado, "prestamos")
+    assert "ix_libros_disponibles" in _indices(engine_aislado, "libros")
+
+
+def test_migracion_interrumpida_se_completa_al_repetir(engine_aislado):
+    migrar(engine_aislado)
+    # Como tras un fallo a mitad en MySQL: el DDL ya está aplicado pero no quedó registrado
+    with engine_aislado.begin() as conn:
+        conn.execute(schema_version.delete().where(schema_version.c.version >= 4))
+
+    assert migrar(engine_aislado) == [m.version for m in MIGRACIONES if m.version >= 4]
+    assert version_actual(engine_aislado) == ULTIMA
+
+
+@pytest.mark.parametrize("migracion", MIGRACIONES, ids=lambda m: str(m.version))
+def test_cada_migracion_es_idempotente(engine_aislado, migracion):
+    migrar(engine_aislado)
+    with engine_aislado.begin() as conn:
+        migracion.aplicar(conn)
+        migracion.aplicar(conn)
+
+
+@pytest.mark.parametrize("consulta, indice", [
+    (lambda db: LibroService.get_libros_disponibles(db), "ix_libros_disponibles"),
+    (lambda db: PrestamoService.get_prestamos_activos_usuario(db, 1), "ix_prestamos_usuario_devolucion"),
+    (lambda db: PrestamoService.get_historial_prestamos_usuario(db, 1), "ix_prestamos_usuario_fecha"),
+])
+def test_consultas_de_servicio_usan_los_indices(engine_aislado, consulta, indice):
+    migrar(engine_aislado)
+    sentencias = []
+
+    @event.listens_for(engine_aislado, "before_cursor_execute")
+    def registrar(conn, cursor, sentencia, parametros, contexto, executemany):
+        if sentencia.lstrip().upper().startswith("SELECT"):
+            sentencias.append((sentencia, parametros))
+
+    db = sessionmaker(bind=engine_aislado)()
+    try:
+        consulta(db)
+    finally:
+        db.close()
+    event.remove(engine_aislado, "before_cursor_execute", registrar)
+
+    sentencia, parametros = sentencias[0]
+    with engine_aislado.connect() as conn:
+        plan = " ".join(fila[-1] for fila in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sentencia}", parametros))
+    assert indice in plan, plan
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.prestamo import Prestamo
+from app.services.paginacion import NEXT_CURSOR_HEADER, codificar_cursor, decodificar_cursor
+
+
+def recorrer_paginas(client, ruta: str, headers: dict, limit: int) -> list:
+    """
+    Sigue X-Next-Cursor hasta la última página y devuelve los ids en orden
+    """
+    ids, cursor, paginas = [], None, 0
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        respuesta = client.get(ruta, params=params, headers=headers)
+        assert respuesta.status_code == 200, respuesta.text
+        assert len(respuesta.json()) <= limit
+        ids.extend(item["id"] for item in respuesta.json())
+        paginas += 1
+        cursor = respuesta.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+        assert paginas < 100
+
+
+def test_cursor_conserva_fechas():
+    fecha = datetime(2024, 3, 1, 10, 30, 15, 123456)
+    cursor = codificar_cursor([fecha, 42])
+    assert decodificar_cursor(cursor, [Prestamo.fecha_prestamo, Prestamo.id]) == [fecha, 42]
+
+
+def test_recorrer_libros_de_una_categoria(client, cliente, crear_categoria, crear_libro):
+    categoria_id = crear_categoria()
+    creados = [crear_libro(categoria_id)["id"] for _ in range(7)]
+
+    ids = recorrer_paginas(client, f"/libros/categoria/{categoria_id}", cliente, limit=3)
+
+    assert ids == sorted(creados)
+
+
+def test_recorrer_historial_descendente_con_fechas_repetidas(client, crear_usuario, crear_libro):
+    _, _, headers = crear_usuario()
+    # El préstamo en lote usa la misma fecha para todos: desempata el id
+    libros = [crear_libro()["id"] for _ in range(5)]
+    respuesta = client.post("/prestamos/bulk", json={"libro_ids": libros}, headers=headers)
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json()["exitosos"] == 5
+
+    completo = [p["id"] for p in client.get("/prestamos/mis-prestamos/historial", headers=headers).json()]
+    ids = recorrer_paginas(client, "/prestamos/mis-prestamos/historial", headers, limit=2)
+
+    assert ids == completo
+    assert ids == sorted(ids, reverse=True)
+
+
+@pytest.mark.parametrize("cursor", ["no-es-base64!", codificar_cursor([1, 2, 3]), codificar_cursor(["a"])])
+def test_cursor_invalido(client, cliente, cursor):
+    respuesta = client.get("/libros/", params={"cursor": cursor}, headers=cliente)
+    assert respuesta.status_code == 400
@@ -0,0 +1,107 @@
+import re
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app import arranque
+from app.config.database import opciones_pool
+from app.config.settings import settings
+from app.instrumentacion.pool import PoolInstrumentado, _pools, ping_si_ociosa, pool_pings, registrar_pool
+
+
+def _valor(texto: str, nombre: str, engine: str, **etiquetas) -> float:
+    extra = "".join(f',{clave}="{valor}"' for clave, valor in etiquetas.items())
+    coincidencia = re.search(rf'^{nombre}\{{engine="{engine}"{extra}\}} ([\d.]+)$', texto, re.M)
+    return float(coincidencia.group(1)) if coincidencia else 0.0
+
+
+@pytest.fixture
+def engine_pool(tmp_path):
+    """
+    Engine con el pool instrumentado de producción (SQLite usa el suyo si no se indica)
+    """
+    motor = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=PoolInstrumentado,
+        pool_size=2, max_overflow=1, pool_timeout=0.05,
+    )
+    registrar_pool(motor, "test-pool")
+    yield motor
+    _pools.pop("test-pool", None)
+    motor.dispose()
+
+
+def test_opciones_pool_desde_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 3)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 1.5)
+    monkeypatch.setattr(settings, "DB_POOL_RECYCLE", 120)
+    monkeypatch.setattr(settings, "DB_POOL_PRE_PING", "ociosa")
+
+    assert opciones_pool("mysql+pymysql://u:p@db/biblioteca", PoolInstrumentado) == {
+        "pool_pre_ping": False, "pool_recycle": 120, "poolclass": PoolInstrumentado,
+        "pool_size": 7, "max_overflow": 3, "pool_timeout": 1.5,
+    }
+    # SQLite conserva su pool
+    assert opciones_pool("sqlite:///x.db", PoolInstrumentado) == {"pool_pre_ping": False, "pool_recycle": 120}
+
+    monkeypatch.setattr(settings, "DB_POOL_PRE_PING", "siempre")
+    assert opciones_pool("sqlite:///x.db", PoolInstrumentado)["pool_pre_ping"] is True
+
+
+def test_metricas_del_pool_en_metrics(client, engine_pool):
+    abiertas = [engine_pool.connect() for _ in range(3)]
+    with pytest.raises(exc.TimeoutError):
+        engine_pool.connect()
+    try:
+        texto = client.get("/metrics").text
+    finally:
+        for conexion in abiertas:
+            conexion.close()
+
+    assert _valor(texto, "biblioteca_db_pool_size", "test-pool") == 2
+    assert _valor(texto, "biblioteca_db_pool_checked_out", "test-pool") == 3
+    assert _valor(texto, "biblioteca_db_pool_overflow", "test-pool") == 1
+    assert _valor(texto, "biblioteca_db_pool_timeouts_total", "test-pool") >= 1
+    assert _valor(texto, "biblioteca_db_pool_checkout_seconds_count", "test-pool") >= 4
+
+    despues = client.get("/metrics").text
+    assert _valor(despues, "biblioteca_db_pool_checked_out", "test-pool") == 0
+    assert _valor(despues, "biblioteca_db_pool_checked_in", "test-pool") == 2
+
+
+def _pings(resultado: str) -> float:
+    return _valor("\n".join(pool_pings.exportar()), "biblioteca_db_pool_pings_total", "test-pool", resultado=resultado)
+
+
+def test_ping_solo_de_conexiones_ociosas(engine_pool):
+    ping_si_ociosa(engine_pool, 3600)
+    for _ in range(3):
+        with engine_pool.connect() as conexion:
+            conexion.execute(text("SELECT 1"))
+    assert _pings("ok") == 0
+
+
+def test_ping_descarta_la_conexion_caida(engine_pool, monkeypatch):
+    ping_si_ociosa(engine_pool, 0)
+    with engine_pool.connect() as conexion:
+        conexion.execute(text("SELECT 1"))
+    with engine_pool.connect() as conexion:
+        conexion.execute(text("SELECT 1"))
+    assert _pings("ok") == 1
+
+    monkeypatch.setattr(engine_pool.dialect, "do_ping", lambda conexion_dbapi: False)
+    with engine_pool.connect() as conexion:
+        # El pool reemplazó la conexión sin que el request vea el error
+        assert conexion.execute(text("SELECT 1")).scalar() == 1
+    assert _pings("caida") == 1
+
+
+@pytest.mark.parametrize("warmup, esperadas", [(1, 1), (2, 2), (10, 2)])
+def test_precalentar_abre_conexiones_sin_overflow(engine_pool, monkeypatch, warmup, esperadas):
+    monkeypatch.setattr(arranque, "engine", engine_pool)
+    monkeypatch.setattr(settings, "DB_POOL_WARMUP", warmup)
+
+    arranque.precalentar_pool()
+
+    assert engine_pool.pool.checkedin() == esperadas
+    assert engine_pool.pool.checkedout() == 0
@@ -0,0 +1,159 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app.config.database import SessionLocal, async_engine, engine
+from app.config.settings import settings
+from app.models.estadisticas import Estadistica
+from app.models.libros import Libro
+from app.models.prestamo import Prestamo
+from app.schemas.prestamo import PrestamoCreate
+from app.services.estadisticas_service import EstadisticasService, PRESTAMOS_ACTIVOS
+from app.services.prestamos_services import PrestamoService
+
+HILOS = 8
+
+
+def _prestamos_activos(db) -> int:
+    db.expire_all()
+    return db.query(Estadistica.valor).filter(Estadistica.clave == PRESTAMOS_ACTIVOS).scalar()
+
+
+def test_prestamos_simultaneos_del_mismo_libro(crear_usuario, crear_libro, db, monkeypatch):
+    # SQLite no tiene bloqueos por fila: los choques llegan como "database is locked"
+    monkeypatch.setattr(settings, "LOAN_MAX_RETRIES", 20)
+    usuarios = [crear_usuario()[0] for _ in range(HILOS)]
+    libro_id = crear_libro()["id"]
+    activos_antes = _prestamos_activos(db)
+    barrera = threading.Barrier(HILOS)
+
+    def prestar(usuario_id: int):
+        sesion = SessionLocal()
+        try:
+            barrera.wait()
+            return PrestamoService.create_prestamo(sesion, PrestamoCreate(libro_id=libro_id), usuario_id).id
+        except HTTPException as exc:
+            return exc.status_code
+        finally:
+            sesion.close()
+
+    with ThreadPoolExecutor(HILOS) as pool:
+        resultados = list(pool.map(prestar, usuarios))
+
+    assert sorted(resultados).count(409) == HILOS - 1
+    prestamo_id = next(r for r in resultados if r != 409)
+    activos = db.query(Prestamo).filter(Prestamo.libro_id == libro_id, Prestamo.fecha_devolucion.is_(None)).all()
+    assert [p.id for p in activos] == [prestamo_id]
+    assert db.get(Libro, libro_id).prestamo_activo_id == prestamo_id
+    assert _prestamos_activos(db) == activos_antes + 1
+
+
+def test_segundo_prestamo_activo_responde_409(client, crear_usuario, crear_libro):
+    libro_id = crear_libro()["id"]
+    primero, segundo = crear_usuario()[2], crear_usuario()[2]
+
+    assert client.post("/prestamos/", json={"libro_id": libro_id}, headers=primero).status_code == 201
+    respuesta = client.post("/prestamos/", json={"libro_id": libro_id}, headers=segundo)
+    assert respuesta.status_code == 409
+
+
+def test_prestamo_en_lote_actualiza_categorias_en_orden(client, crear_usuario, crear_categoria, crear_libro):
+    _, _, headers = crear_usuario()
+    categorias = [crear_categoria() for _ in range(3)]
+    # Pedido en orden inverso de categoría
+    libros = [crear_libro(categoria_id)["id"] for categoria_id in reversed(categorias)]
+    actualizadas = []
+
+    def registrar(conn, cursor, sentencia, parametros, contexto, executemany):
+        if sentencia.startswith("UPDATE estadisticas_categoria"):
+            actualizadas.append(parametros[-1])
+
+    motores = [engine] if async_engine is None else [engine, async_engine.sync_engine]
+    for motor in motores:
+        event.listen(motor, "before_cursor_execute", registrar)
+    try:
+        respuesta = client.post("/prestamos/bulk", json={"libro_ids": libros}, headers=headers)
+    finally:
+        for motor in motores:
+            event.remove(motor, "before_cursor_execute", registrar)
+
+    assert respuesta.json()["exitosos"] == 3
+    assert actualizadas == sorted(categorias)
+
+
+@pytest.fixture
+def bloqueo_transitorio(monkeypatch):
+    """
+    La primera escritura de contadores falla como un deadlock; las siguientes funcionan
+    """
+    original = EstadisticasService.incrementar
+    fallas = []
+
+    def incrementar(db, clave, delta=1):
+        if not fallas:
+            fallas.append(clave)
+            raise OperationalError("UPDATE estadisticas", {}, sqlite3.OperationalError("database is locked"))
+        return original(db, clave, delta)
+
+    monkeypatch.setattr(EstadisticasService, "incrementar", staticmethod(incrementar))
+    return fallas
+
+
+@pytest.mark.parametrize("operacion", ["libro", "usuario", "devolucion", "devolucion_bulk", "baja_prestamo"])
+def test_escrituras_de_contadores_se_reintentan(
+    operacion, client, bibliotecario, crear_usuario, crear_categoria, crear_libro, bloqueo_transitorio
+):
+    _, _, headers = crear_usuario()
+    prestamo_id = None
+    if operacion.startswith("devolucion") or operacion == "baja_prestamo":
+        libro_id = crear_libro()["id"]
+        # Los préstamos también cuentan: el primero consume la falla y se reintenta
+        prestamo_id = client.post("/prestamos/", json={"libro_id": libro_id}, headers=headers).json()["id"]
+        assert bloqueo_transitorio
+
+    if operacion == "libro":
+        respuesta = client.post("/libros/", json={
+            "titulo": "Reintento", "autor": "Autor", "isbn": str(9780000000000 + len(operacion)),
+            "editorial": "Ed", "categoria_id": crear_categoria()
+        }, headers=bibliotecario)
+    elif operacion == "usuario":
+        respuesta = client.post("/auth/register", json={
+            "nombre": "Reintento", "email": "reintento@biblioteca.com", "password": "secret1"
+        })
+    elif operacion == "devolucion":
+        respuesta = client.patch(f"/prestamos/{prestamo_id}/devolver", headers=headers)
+    elif operacion == "devolucion_bulk":
+        respuesta = client.post("/prestamos/devolver/bulk", json={"prestamo_ids": [prestamo_id]}, headers=headers)
+    else:
+        respuesta = client.delete(f"/prestamos/{prestamo_id}", headers=bibliotecario)
+
+    assert bloqueo_transitorio
+    assert respuesta.status_code < 300, respuesta.text
+
+
+def test_circulacion_en_lote_con_consultas_constantes(client, crear_usuario, crear_categoria, crear_libro, consultas):
+    _, _, headers = crear_usuario()
+    categoria_id = crear_categoria()
+
+    def contar(cantidad: int) -> tuple:
+        libros = [crear_libro(categoria_id)["id"] for _ in range(cantidad)]
+        consultas.clear()
+        prestados = client.post("/prestamos/bulk", json={"libro_ids": libros}, headers=headers).json()
+        al_prestar = len(consultas)
+        assert prestados["exitosos"] == cantidad
+        prestamo_ids = [resultado["prestamo_id"] for resultado in prestados["resultados"]]
+        assert all(prestamo_ids)
+
+        consultas.clear()
+        devueltos = client.post("/prestamos/devolver/bulk", json={"prestamo_ids": prestamo_ids}, headers=headers).json()
+        assert devueltos["exitosos"] == cantidad
+        return al_prestar, len(consultas)
+
+    # La primera vuelta crea la fila de la categoría y valida el token del usuario
+    contar(1)
+    assert contar(5) == contar(20)
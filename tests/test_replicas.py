@@ -0,0 +1,146 @@
+import shutil
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.cache.etag import versiones_actuales, versiones_cache
+from app.config.database import Base, get_db
+from app.config.replicas import Replicas, RoutingSession, _escrituras_recientes, en_replica, fijar_primaria, usuario_actual
+from app.config.settings import settings
+from app.models.categoria import Categoria
+from app.models.estadisticas import Estadistica
+from app.models.libros import Libro
+from app.services.estadisticas_service import VERSION_LIBROS
+
+
+@pytest.fixture
+def replica_atrasada(tmp_path):
+    """
+    Primaria y réplica en dos archivos SQLite: la réplica es una copia que todavía
+    no aplicó el último cambio de título ni la versión que lo acompaña
+    """
+    ruta_primaria, ruta_replica = tmp_path / "primaria.db", tmp_path / "replica.db"
+    primaria = create_engine(f"sqlite:///{ruta_primaria}")
+    Base.metadata.create_all(bind=primaria)
+    with sessionmaker(bind=primaria)() as db:
+        libro = Libro(titulo="Viejo", autor="Autor", isbn="9781111111111", editorial="Ed", categoria=Categoria(nombre="Novela"))
+        db.add_all([libro, Estadistica(clave=VERSION_LIBROS, valor=1)])
+        db.commit()
+        libro_id = libro.id
+    shutil.copy(ruta_primaria, ruta_replica)
+    replica = create_engine(f"sqlite:///{ruta_replica}")
+    with primaria.begin() as conn:
+        conn.execute(update(Libro).values(titulo="Nuevo"))
+        conn.execute(update(Estadistica).where(Estadistica.clave == VERSION_LIBROS).values(valor=2))
+
+    def ponerse_al_dia():
+        replica.dispose()
+        shutil.copy(ruta_primaria, ruta_replica)
+
+    replicas = Replicas([replica])
+    versiones_cache.clear()
+    yield SimpleNamespace(
+        primaria=primaria, replica=replica, replicas=replicas, libro_id=libro_id, ponerse_al_dia=ponerse_al_dia,
+        sesion=sessionmaker(bind=primaria, class_=RoutingSession, replicas=replicas),
+    )
+    versiones_cache.clear()
+    primaria.dispose()
+    replica.dispose()
+
+
+def _titulo(db) -> str:
+    return db.scalar(select(Libro.titulo))
+
+
+def test_solo_lectura_va_a_la_replica(replica_atrasada):
+    with replica_atrasada.sesion() as db:
+        assert en_replica(_titulo)(db) == "Viejo"
+        assert _titulo(db) == "Nuevo"
+        assert en_replica(lambda s: s.scalar(select(Libro.titulo).with_for_update()))(db) == "Nuevo"
+
+        def escribir_y_leer(s):
+            s.execute(update(Libro).values(editorial="Otra"))
+            return _titulo(s)
+        # Después de escribir, la misma sesión lee de la primaria
+        assert en_replica(escribir_y_leer)(db) == "Nuevo"
+        db.rollback()
+
+
+def test_una_replica_por_sesion(replica_atrasada, tmp_path):
+    otra = create_engine(f"sqlite:///{tmp_path / 'otra.db'}")
+    replicas = Replicas([replica_atrasada.replica, otra])
+    elegidas = set()
+    for _ in range(10):
+        db = RoutingSession(bind=replica_atrasada.primaria, replicas=replicas)
+        primera = en_replica(lambda s: s.replica_de_lectura())(db)
+        assert all(en_replica(lambda s: s.replica_de_lectura())(db) is primera for _ in range(10))
+        elegidas.add(replicas.indice(primera))
+        db.close()
+    assert elegidas <= {0, 1}
+    otra.dispose()
+
+
+def test_lectura_de_lo_propio_escrito(replica_atrasada):
+    token = usuario_actual.set(-1)
+    try:
+        with replica_atrasada.sesion() as db:
+            db.execute(update(Libro).values(editorial="Propia"))
+            db.commit()
+        # El commit fija la primaria para el usuario durante REPLICA_STICKY_SECONDS
+        with replica_atrasada.sesion() as db:
+            assert en_replica(_titulo)(db) == "Nuevo"
+
+        usuario_actual.set(-2)
+        with replica_atrasada.sesion() as db:
+            assert en_replica(_titulo)(db) == "Viejo"
+        fijar_primaria(-2)
+        with replica_atrasada.sesion() as db:
+            assert en_replica(_titulo)(db) == "Nuevo"
+    finally:
+        usuario_actual.reset(token)
+        _escrituras_recientes.delete(-1)
+        _escrituras_recientes.delete(-2)
+
+
+def test_versiones_de_la_misma_copia_que_el_cuerpo(replica_atrasada):
+    with replica_atrasada.sesion() as db:
+        assert en_replica(lambda s: versiones_actuales([VERSION_LIBROS], s))(db) == {VERSION_LIBROS: 1}
+        assert versiones_actuales([VERSION_LIBROS], db) == {VERSION_LIBROS: 2}
+    assert versiones_cache.get((0, VERSION_LIBROS)) == 1
+    assert versiones_cache.get((None, VERSION_LIBROS)) == 2
+
+
+def test_etag_no_se_adelanta_a_la_replica(app, client, crear_usuario, replica_atrasada, monkeypatch):
+    # Autorización solo por claims: el usuario no existe en estas bases
+    monkeypatch.setattr(settings, "TOKEN_VERSION_CHECK", False)
+    _, _, headers = crear_usuario()
+
+    def sesion_de_prueba():
+        with replica_atrasada.sesion() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = sesion_de_prueba
+    try:
+        atrasada = client.get("/libros/", headers=headers)
+        assert [libro["titulo"] for libro in atrasada.json()] == ["Viejo"]
+
+        # La primaria ya tiene otra versión, pero mientras se lea de la réplica el ETag es el suyo
+        versiones_cache.clear()
+        assert client.get("/libros/", headers={**headers, "If-None-Match": atrasada.headers["etag"]}).status_code == 304
+
+        replica_atrasada.replicas._sanas = []
+        primaria = client.get("/libros/", headers=headers)
+        assert [libro["titulo"] for libro in primaria.json()] == ["Nuevo"]
+        assert primaria.headers["etag"] != atrasada.headers["etag"]
+
+        replica_atrasada.replicas._sanas = [0]
+        replica_atrasada.ponerse_al_dia()
+        versiones_cache.clear()
+        al_dia = client.get("/libros/", headers={**headers, "If-None-Match": atrasada.headers["etag"]})
+        assert al_dia.status_code == 200
+        assert [libro["titulo"] for libro in al_dia.json()] == ["Nuevo"]
+        assert al_dia.headers["etag"] == primaria.headers["etag"]
+    finally:
+        app.dependency_overrides.pop(get_db, None)
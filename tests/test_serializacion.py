@@ -0,0 +1,32 @@
+import json
+
+from app.models.libros import Libro
+from app.schemas.libros import LibroResponse
+from app.services.libro_service import LibroService
+from app.services.serializacion import libro_a_dict, libro_json, libros_json
+
+
+def test_detalle_y_listados_usan_la_misma_forma(client, cliente, crear_categoria, crear_libro):
+    categoria_id = crear_categoria()
+    libro = crear_libro(categoria_id)
+
+    detalle = client.get(f"/libros/{libro['id']}", headers=cliente)
+    listado = client.get(f"/libros/categoria/{categoria_id}", headers=cliente)
+
+    assert detalle.text == json.dumps(listado.json()[0], ensure_ascii=False, separators=(",", ":"))
+    assert list(detalle.json()) == list(LibroResponse.model_fields)
+
+
+def test_serializador_equivale_a_libro_response(db, crear_libro):
+    libro = db.get(Libro, crear_libro()["id"])
+    esperado = LibroResponse.model_validate(libro, from_attributes=True).model_dump(mode="json")
+
+    assert libro_a_dict(libro) == esperado
+    assert list(libro_a_dict(libro)) == list(esperado)
+    assert json.loads(libro_json(libro)) == esperado
+    assert json.loads(libros_json([libro, libro])) == [esperado, esperado]
+
+
+def test_get_libro_response_es_libro_a_dict(db, crear_libro):
+    libro_id = crear_libro()["id"]
+    assert LibroService.get_libro_response(db, libro_id) == libro_a_dict(db.get(Libro, libro_id))